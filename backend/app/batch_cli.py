@@ -0,0 +1,109 @@
+"""Replay a JSONL file of chat messages through the pipeline, in-process.
+
+    python -m app.batch_cli transcripts.jsonl -o results.jsonl
+
+Each input line is an object with ``message`` (or ``title``/``body``) and
+optionally ``session_id`` and ``id``/``request_id``; lines without a
+session id each get their own session. Results are written as JSONL in
+completion order as soon as they are ready, and a summary is printed to
+stderr at the end.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from typing import Any, Dict, List, Optional, TextIO
+
+from config.settings import settings
+from models.database import init_db
+from services.chat_service import ChatService
+from utils.inference import inference_executor
+from utils.model_registry import model_registry
+from utils.write_behind import conversation_writer
+
+logger = logging.getLogger(__name__)
+
+
+def message_from_record(record: Dict[str, Any]) -> Optional[str]:
+    if record.get("message"):
+        return record["message"]
+    text = ". ".join(part for part in (record.get("title"), record.get("body")) if part)
+    return text or None
+
+
+def read_items(source: TextIO) -> List[Dict[str, Any]]:
+    items = []
+    for line_number, line in enumerate(source, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        record = json.loads(line)
+        record_id = record.get("id") or record.get("request_id") or str(line_number)
+        items.append({
+            "id": record_id,
+            "message": message_from_record(record) or "",
+            "session_id": record.get("session_id") or f"batch-{record_id}",
+        })
+    return items
+
+
+async def run(items: List[Dict[str, Any]], output: TextIO, concurrency: int) -> Dict[str, Any]:
+    await init_db()
+    await conversation_writer.start()
+    chat_service = ChatService()
+    # Offline runs want model answers, not the warm-up fallbacks
+    await model_registry.warm_up(settings.MODEL_WARMUP_ORDER)
+
+    completed = failed = 0
+    start = time.perf_counter()
+    try:
+        async for result in chat_service.iter_batch(items, max_concurrency=concurrency):
+            result["id"] = items[result["index"]]["id"]
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+            if "error" in result:
+                failed += 1
+            else:
+                completed += 1
+    finally:
+        await conversation_writer.stop()
+        if chat_service.llm_client:
+            await chat_service.llm_client.close()
+        inference_executor.shutdown()
+
+    elapsed = time.perf_counter() - start
+    return {
+        "items": len(items),
+        "completed": completed,
+        "failed": failed,
+        "elapsed_seconds": elapsed,
+        "items_per_second": len(items) / elapsed if elapsed else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", help="JSONL input file, or - for stdin")
+    parser.add_argument("-o", "--output", help="JSONL output file (defaults to stdout)")
+    parser.add_argument("--concurrency", type=int, default=settings.CHAT_BATCH_CONCURRENCY,
+                        help="Sessions processed in parallel")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    source = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8")
+    with source:
+        items = read_items(source)
+
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        summary = asyncio.run(run(items, output, args.concurrency))
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(json.dumps(summary), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Multi-worker launcher: load the models once, then fork uvicorn workers.
+
+    python -m app.launcher --workers 4 --port 8000
+
+The parent process imports the app and loads every model before forking,
+so the workers share the weights copy-on-write instead of each holding
+its own copy. All workers accept connections from one listening socket.
+
+Any worker may serve any session, so per-session state has to live in
+Redis (SESSION_BACKEND=redis). Analytics are already merged across
+workers through Redis. A WebSocket connection stays on the worker that
+accepted it for its whole lifetime, and a reconnect may land on another
+worker and continue the same session from the shared store.
+
+The request scheduler is per worker: client rate and concurrency limits
+apply to each worker separately, and one session's turns are only kept
+in order when they reach the same worker.
+"""
+import argparse
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict
+
+import uvicorn
+from uvicorn.importer import import_from_string
+
+from config.settings import settings
+from utils.faq_index import ensure_index
+from utils.model_registry import model_registry
+
+logger = logging.getLogger(__name__)
+
+
+def preload_models():
+    start_time = time.time()
+    order = settings.MODEL_WARMUP_ORDER
+    for name in order + [name for name in model_registry.get_status() if name not in order]:
+        model_registry.get(name)
+    logger.info(f"Preloaded models in {time.time() - start_time:.2f}s: "
+                f"{ {name: status['state'] for name, status in model_registry.get_status().items()} }")
+
+
+def prepare_faq_index():
+    # Built once here, so the workers only map it instead of racing to build it
+    if not settings.FAQ_ENABLED or not os.path.exists(settings.FAQ_CATALOG_PATH):
+        return
+    try:
+        if ensure_index(settings.FAQ_CATALOG_PATH, settings.FAQ_INDEX_PATH) is not None:
+            logger.info(f"Built FAQ index at {settings.FAQ_INDEX_PATH}")
+    except Exception as e:
+        logger.warning(f"Could not build FAQ index: {str(e)}")
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app_path: str, sock: socket.socket, log_level: str):
+    config = uvicorn.Config(app_path, log_level=log_level)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+class Launcher:
+    def __init__(self, app_path: str, workers: int, host: str, port: int, log_level: str):
+        self.app_path = app_path
+        self.workers = workers
+        self.log_level = log_level
+        self.sock = bind_socket(host, port)
+        self.children: Dict[int, int] = {}
+        self.stopping = False
+
+    def spawn(self, slot: int):
+        pid = os.fork()
+        if pid == 0:
+            # Worker: default signal handling, uvicorn installs its own
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            try:
+                run_worker(self.app_path, self.sock, self.log_level)
+            finally:
+                os._exit(0)
+        self.children[pid] = slot
+        logger.info(f"Started worker {slot} (pid {pid})")
+
+    def stop(self, signum, frame):
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for slot in range(self.workers):
+            self.spawn(slot)
+
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            slot = self.children.pop(pid, None)
+            if slot is None or self.stopping:
+                continue
+            # Replacements are forked from the parent, so they still share the models
+            logger.warning(f"Worker {slot} (pid {pid}) exited with status {status}, restarting")
+            time.sleep(1)
+            self.spawn(slot)
+        self.sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--app", default="app.main:app")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--allow-local-sessions", action="store_true",
+                        help="Run several workers with in-memory sessions (conversations "
+                             "lose context when turns land on different workers)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.workers > 1 and settings.SESSION_BACKEND != "redis" and not args.allow_local_sessions:
+        sys.exit("Multiple workers need shared session state: set SESSION_BACKEND=redis "
+                 "(or pass --allow-local-sessions)")
+
+    # Split the cores between workers instead of every worker using all of them
+    if not settings.INFERENCE_THREADS:
+        settings.INFERENCE_THREADS = max(1, (os.cpu_count() or 1) // args.workers)
+
+    if args.workers > 1:
+        logger.info(f"Scheduler limits are per worker: a client may get up to {args.workers}x "
+                    f"SCHEDULER_CLIENT_RATE and SCHEDULER_CLIENT_MAX_CONCURRENCY, and session "
+                    f"ordering holds only within a worker")
+
+    import_from_string(args.app)
+    prepare_faq_index()
+    preload_models()
+    Launcher(args.app, args.workers, args.host, args.port, args.log_level).run()
+
+
+if __name__ == "__main__":
+    main()
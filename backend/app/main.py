@@ -1,18 +1,30 @@
-from fastapi import FastAPI, WebSocket, HTTPException
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from contextlib import asynccontextmanager
 import uvicorn
+import asyncio
+import json
 import logging
+import math
+import resource
+import time
 import redis.asyncio as redis
 from datetime import datetime
+from typing import Optional
 
 from config.settings import settings
 from services.chat_service import ChatService
 from services.analytics_service import AnalyticsService
-from services.sentiment_service import SentimentService
+from services.whatsapp_service import WhatsAppBusyError, WhatsAppService
 from models.database import init_db
 from utils.cache import get_redis_pool
+from utils.batching import get_batching_stats
+from utils.inference import InferenceBusyError, inference_executor
+from utils.model_registry import model_registry
+from utils.request_scheduler import RequestRejectedError
+from utils.tracing import register_collector, render_prometheus
+from utils.write_behind import conversation_writer
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -21,15 +33,46 @@ logger = logging.getLogger(__name__)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
+    start_time = time.time()
     await init_db()
+    await conversation_writer.start()
     app.state.redis = await get_redis_pool()
     app.state.chat_service = ChatService()
     app.state.analytics_service = AnalyticsService()
-    app.state.sentiment_service = SentimentService()
-    logger.info("Application started successfully")
+    await app.state.analytics_service.start()
+    # Share the chat pipeline's sentiment service instead of loading a second model
+    app.state.sentiment_service = app.state.chat_service.sentiment_service
+    await app.state.sentiment_service.aggregator.start()
+    app.state.whatsapp_service = None
+    if settings.WHATSAPP_ACCESS_TOKEN:
+        app.state.whatsapp_service = WhatsAppService(
+            app.state.chat_service, app.state.analytics_service
+        )
+        await app.state.whatsapp_service.start()
+    app.state.warmup = None
+    if settings.STARTUP_MODE == "eager":
+        await model_registry.warm_up(settings.MODEL_WARMUP_ORDER)
+    elif settings.STARTUP_MODE == "background":
+        # Bind now; requests use rule-based fallbacks until each model is ready
+        model_registry.load_on_demand = False
+        app.state.warmup = asyncio.create_task(model_registry.warm_up(settings.MODEL_WARMUP_ORDER))
+    # ru_maxrss is reported in kilobytes on Linux
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    logger.info(f"Application started successfully in {time.time() - start_time:.2f}s "
+                f"(peak RSS {peak_rss_mb:.0f} MB)")
     yield
     # Shutdown
+    if app.state.warmup:
+        app.state.warmup.cancel()
+    if app.state.whatsapp_service:
+        await app.state.whatsapp_service.stop()
+    await app.state.analytics_service.stop()
+    await app.state.sentiment_service.aggregator.stop()
+    await conversation_writer.stop()
     await app.state.redis.close()
+    if app.state.chat_service.llm_client:
+        await app.state.chat_service.llm_client.close()
+    inference_executor.shutdown()
     logger.info("Application shutdown")
 
 app = FastAPI(
@@ -56,8 +99,51 @@ async def root():
 async def health_check():
     return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
 
+@app.get("/ready")
+async def readiness_check():
+    # Unlike /health, reports whether the models have finished warming up
+    models = model_registry.get_status()
+    ready = settings.STARTUP_MODE == "lazy" or model_registry.is_ready()
+    if not ready:
+        status = "warming_up"
+    elif any(model["state"] == "failed" for model in models.values()):
+        status = "degraded"
+    else:
+        status = "ready"
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": status,
+            "startup_mode": settings.STARTUP_MODE,
+            "models": models,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+    )
+
+def _client_id(connection) -> str:
+    # Rate limits apply per client: an explicit id if the caller sends one, else the peer address
+    client_id = connection.headers.get("x-client-id")
+    if client_id:
+        return client_id
+    return connection.client.host if connection.client else "unknown"
+
+def _timeout_ms(request: Request, body: dict) -> Optional[float]:
+    # Time budget for the reply: X-Request-Timeout-Ms header or "timeout_ms" in the body
+    value = request.headers.get("x-request-timeout-ms") or body.get("timeout_ms")
+    try:
+        return float(value) if value else None
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="timeout_ms must be a number")
+
+def _rejected(e: RequestRejectedError) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail="Too many requests, please retry shortly",
+        headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))}
+    )
+
 @app.post("/api/chat")
-async def chat_endpoint(message: dict):
+async def chat_endpoint(message: dict, request: Request):
     try:
         user_message = message.get("message", "")
         session_id = message.get("session_id", "default")
@@ -66,7 +152,11 @@ async def chat_endpoint(message: dict):
             raise HTTPException(status_code=400, detail="Message is required")
         
         chat_service = app.state.chat_service
-        response = await chat_service.process_message(user_message, session_id)
+        # X-Debug-Timings: 1 adds a per-stage latency breakdown to the response
+        debug = request.headers.get("x-debug-timings") == "1"
+        response = await chat_service.process_message(user_message, session_id, debug=debug,
+                                                      client_id=_client_id(request),
+                                                      timeout_ms=_timeout_ms(request, message))
         
         # Track analytics
         await app.state.analytics_service.track_interaction(
@@ -75,10 +165,114 @@ async def chat_endpoint(message: dict):
         
         return JSONResponse(content=response)
     
+    except HTTPException:
+        raise
+    except RequestRejectedError as e:
+        raise _rejected(e)
+    except InferenceBusyError as e:
+        logger.warning(f"Chat endpoint saturated: {str(e)}")
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy, please retry shortly",
+            headers={"Retry-After": "1"}
+        )
     except Exception as e:
         logger.error(f"Error in chat endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+def _format_sse(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+async def _track_streamed_response(session_id: str, user_message: str, event: dict):
+    analytics_service = app.state.analytics_service
+    await analytics_service.track_interaction(session_id, user_message, event)
+    await analytics_service.track_first_token(session_id, event["time_to_first_token"])
+
+@app.post("/api/chat/stream")
+async def chat_stream_endpoint(message: dict, request: Request):
+    user_message = message.get("message", "")
+    session_id = message.get("session_id", "default")
+    
+    if not user_message:
+        raise HTTPException(status_code=400, detail="Message is required")
+    
+    chat_service = app.state.chat_service
+    events = chat_service.stream_message(user_message, session_id, client_id=_client_id(request),
+                                         timeout_ms=_timeout_ms(request, message))
+    try:
+        # Admission happens before the first event, so a rejection can still be a 429
+        first_event = await events.__anext__()
+    except RequestRejectedError as e:
+        raise _rejected(e)
+    except InferenceBusyError:
+        first_event = {"type": "busy", "detail": "Server is busy, please retry shortly"}
+    
+    async def with_first_event():
+        yield first_event
+        if first_event["type"] != "busy":
+            async for event in events:
+                yield event
+    
+    async def event_stream():
+        try:
+            async for event in with_first_event():
+                if event["type"] == "done":
+                    await _track_streamed_response(session_id, user_message, event)
+                yield _format_sse(event)
+        except InferenceBusyError as e:
+            logger.warning(f"Chat stream saturated: {str(e)}")
+            yield _format_sse({"type": "busy", "detail": "Server is busy, please retry shortly"})
+        except Exception as e:
+            logger.error(f"Error in chat stream: {str(e)}")
+            yield _format_sse({"type": "error", "detail": "Internal server error"})
+        finally:
+            # Frees the session's scheduler slot even if the client went away early
+            await events.aclose()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        # Disable proxy buffering so tokens reach the client as they are produced
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/api/chat/batch")
+async def chat_batch_endpoint(payload: dict):
+    items = payload.get("items")
+    if not isinstance(items, list) or not items:
+        raise HTTPException(status_code=400, detail="items must be a non-empty list")
+    if len(items) > settings.CHAT_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413,
+                            detail=f"At most {settings.CHAT_BATCH_MAX_ITEMS} items per batch")
+    if not all(isinstance(item, dict) for item in items):
+        raise HTTPException(status_code=400, detail="Each item must be an object")
+    
+    chat_service = app.state.chat_service
+    analytics_service = app.state.analytics_service
+    
+    async def tracked_results():
+        async for result in chat_service.iter_batch(items):
+            if "error" not in result:
+                await analytics_service.track_interaction(
+                    result["session_id"], items[result["index"]]["message"], result
+                )
+            yield result
+    
+    if payload.get("stream"):
+        # One JSON result per line, in completion order
+        return StreamingResponse(
+            (json.dumps(result) + "\n" async for result in tracked_results()),
+            media_type="application/x-ndjson"
+        )
+    
+    results = sorted([result async for result in tracked_results()],
+                     key=lambda result: result["index"])
+    return JSONResponse(content={
+        "results": results,
+        "total": len(results),
+        "failed": sum(1 for result in results if "error" in result)
+    })
+
 @app.websocket("/ws/chat")
 async def websocket_chat(websocket: WebSocket):
     await websocket.accept()
@@ -91,17 +285,93 @@ async def websocket_chat(websocket: WebSocket):
             session_id = data.get("session_id", "default")
             
             if user_message:
-                response = await chat_service.process_message(user_message, session_id)
+                try:
+                    if data.get("stream"):
+                        # Incremental frames: metadata, token..., done
+                        events = chat_service.stream_message(
+                            user_message, session_id, client_id=_client_id(websocket),
+                            timeout_ms=data.get("timeout_ms")
+                        )
+                        try:
+                            async for event in events:
+                                if event["type"] == "done":
+                                    await _track_streamed_response(session_id, user_message, event)
+                                await websocket.send_json(event)
+                        finally:
+                            await events.aclose()
+                        continue
+                    response = await chat_service.process_message(
+                        user_message, session_id, client_id=_client_id(websocket),
+                        timeout_ms=data.get("timeout_ms")
+                    )
+                except InferenceBusyError:
+                    await websocket.send_json({
+                        "type": "busy",
+                        "detail": "Server is busy, please retry shortly",
+                        "session_id": session_id
+                    })
+                    continue
+                except WebSocketDisconnect:
+                    raise
+                except Exception as e:
+                    # One failed message shouldn't cost the client its connection
+                    logger.error(f"Error in WebSocket chat: {str(e)}")
+                    await websocket.send_json({
+                        "type": "error",
+                        "detail": "Internal server error",
+                        "session_id": session_id
+                    })
+                    if data.get("stream"):
+                        # Streaming clients read until done
+                        await websocket.send_json({
+                            "type": "done",
+                            "error": True,
+                            "session_id": session_id
+                        })
+                    continue
                 await websocket.send_json(response)
     
+    except WebSocketDisconnect:
+        pass
     except Exception as e:
         logger.error(f"WebSocket error: {str(e)}")
         await websocket.close()
 
+def _get_whatsapp_service() -> WhatsAppService:
+    if app.state.whatsapp_service is None:
+        raise HTTPException(status_code=404, detail="WhatsApp channel is not configured")
+    return app.state.whatsapp_service
+
+@app.get("/webhook/whatsapp")
+async def whatsapp_verify(request: Request):
+    whatsapp_service = _get_whatsapp_service()
+    params = request.query_params
+    challenge = whatsapp_service.verify_webhook(
+        params.get("hub.mode"), params.get("hub.verify_token"), params.get("hub.challenge")
+    )
+    if challenge is None:
+        raise HTTPException(status_code=403, detail="Verification failed")
+    return PlainTextResponse(challenge)
+
+@app.post("/webhook/whatsapp")
+async def whatsapp_webhook(payload: dict):
+    # Acknowledge right away; replies are produced by the service's workers.
+    # Anything but a 2xx makes the provider redeliver, so refuse when queues are full
+    try:
+        queued = await _get_whatsapp_service().handle_webhook(payload)
+    except WhatsAppBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    return {"status": "accepted", "queued": queued}
+
 @app.get("/api/analytics/conversations")
 async def get_conversation_analytics():
     analytics_service = app.state.analytics_service
     analytics = await analytics_service.get_conversation_analytics()
+    analytics["cache"] = app.state.chat_service.response_cache.get_stats()
+    analytics["sessions"] = app.state.chat_service.session_store.get_stats()
+    analytics["persistence"] = conversation_writer.get_stats()
+    if app.state.whatsapp_service:
+        analytics["whatsapp"] = app.state.whatsapp_service.get_stats()
     return JSONResponse(content=analytics)
 
 @app.get("/api/analytics/sentiment")
@@ -110,6 +380,95 @@ async def get_sentiment_analytics():
     analytics = await sentiment_service.get_sentiment_trends()
     return JSONResponse(content=analytics)
 
+@app.get("/api/analytics/llm")
+async def get_llm_analytics():
+    llm_client = app.state.chat_service.llm_client
+    return JSONResponse(content={
+        "enabled": llm_client is not None,
+        "client": llm_client.get_stats() if llm_client else None,
+        "timestamp": datetime.utcnow().isoformat()
+    })
+
+@app.get("/api/analytics/generation")
+async def get_generation_analytics():
+    return JSONResponse(content={
+        **app.state.chat_service.router.get_stats(),
+        "faq": app.state.chat_service.faq_service.get_stats(),
+        "timestamp": datetime.utcnow().isoformat()
+    })
+
+@app.get("/api/analytics/batching")
+async def get_batching_analytics():
+    return JSONResponse(content={
+        "schedulers": get_batching_stats(),
+        "inference": inference_executor.get_stats(),
+        "entities": app.state.chat_service.entity_service.get_stats(),
+        "scheduler": app.state.chat_service.scheduler.get_stats(),
+        "timestamp": datetime.utcnow().isoformat()
+    })
+
+def _collect_component_metrics():
+    families = []
+    batching = get_batching_stats()
+    families.append(("chatbot_batch_queue_depth", "gauge", "Items waiting in each batch queue",
+                     [({"scheduler": name}, stats["queue_depth"]) for name, stats in batching.items()]))
+    families.append(("chatbot_batch_fill_ratio", "gauge", "Average batch size over max batch size",
+                     [({"scheduler": name}, stats["average_fill_ratio"]) for name, stats in batching.items()]))
+    families.append(("chatbot_batch_wait_ms", "gauge", "Average time items wait for their batch",
+                     [({"scheduler": name}, stats["average_wait_ms"]) for name, stats in batching.items()]))
+    
+    inference = inference_executor.get_stats()["models"]
+    families.append(("chatbot_inference_pending", "gauge", "Inference calls running or waiting per model",
+                     [({"model": name}, stats["pending"]) for name, stats in inference.items()]))
+    families.append(("chatbot_inference_rejected_total", "counter", "Inference calls rejected by backpressure",
+                     [({"model": name}, stats["rejected"]) for name, stats in inference.items()]))
+    
+    if not hasattr(app.state, "chat_service"):
+        return families
+    chat_service = app.state.chat_service
+    
+    cache = chat_service.response_cache.get_stats()
+    for kind in ("hits", "misses"):
+        families.append((f"chatbot_cache_{kind}_total", "counter", f"Response cache {kind} per tier",
+                         [({"tier": tier}, cache[tier][kind]) for tier in ("local", "redis")]))
+    
+    scheduler = chat_service.scheduler.get_stats()
+    families.append(("chatbot_scheduler_running", "gauge", "Chat requests running",
+                     [({}, scheduler["running"])]))
+    families.append(("chatbot_scheduler_waiting", "gauge", "Chat requests queued behind their session or the concurrency limit",
+                     [({}, scheduler["waiting"])]))
+    families.append(("chatbot_scheduler_rejected_total", "counter", "Chat requests rejected with 429",
+                     [({"reason": "rate_limited"}, scheduler["rate_limited"]),
+                      ({"reason": "overloaded"}, scheduler["rejected"])]))
+
+    backends = chat_service.router.get_stats()["backends"]
+    families.append(("chatbot_generation_expected_latency_seconds", "gauge",
+                     "Expected generation latency per backend, as used for routing",
+                     [({"backend": name}, stats["expected_latency"]) for name, stats in backends.items()]))
+    families.append(("chatbot_generation_error_rate", "gauge", "Recent error rate per generation backend",
+                     [({"backend": name}, stats["error_rate"]) for name, stats in backends.items()]))
+
+    persistence = conversation_writer.get_stats()
+    families.append(("chatbot_persistence_queue_depth", "gauge", "Conversation rows waiting to be written",
+                     [({}, persistence["queue_depth"])]))
+    families.append(("chatbot_persistence_dropped_total", "counter", "Conversation rows dropped",
+                     [({}, persistence["dropped"])]))
+    
+    if chat_service.llm_client:
+        llm = chat_service.llm_client.get_stats()
+        families.append(("chatbot_llm_requests_total", "counter", "LLM provider requests by outcome",
+                         [({"outcome": outcome}, llm[outcome])
+                          for outcome in ("successes", "failures", "timeouts", "retries")]))
+        families.append(("chatbot_llm_circuit_open", "gauge", "1 while the LLM circuit breaker is open",
+                         [({}, 1 if llm["circuit_state"] == "open" else 0)]))
+    return families
+
+register_collector(_collect_component_metrics)
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     uvicorn.run(
         "main:app",
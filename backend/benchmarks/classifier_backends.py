@@ -0,0 +1,143 @@
+"""Accuracy-vs-latency comparison of the CPU inference backends.
+
+Loads the intent (zero-shot) or sentiment classifier once per backend,
+replays a labelled JSONL dataset (``{"text": ..., "label": ...}`` per line) and
+reports accuracy, agreement with the stock PyTorch pipeline, latency
+percentiles and throughput as JSON:
+
+    python -m benchmarks.classifier_backends --model sentiment \\
+        --backends pytorch quantized onnx --batch-sizes 1 8 --dataset sst.jsonl
+
+Needs the real model dependencies (torch, transformers, onnxruntime).
+"""
+import argparse
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+from benchmarks.micro import _git_revision, percentiles
+from config.settings import settings
+from utils.classifier_backends import BACKENDS, load_text_classifier
+from utils.semantic_index import load_catalog
+
+MODELS = {
+    "intent": ("zero-shot-classification", settings.INTENT_MODEL_NAME,
+               settings.INTENT_MODEL_PATH),
+    "sentiment": ("sentiment-analysis", settings.SENTIMENT_MODEL_NAME,
+                  settings.SENTIMENT_MODEL_PATH),
+}
+
+DEFAULT_SENTIMENT_DATASET = [
+    {"text": "I love how quickly you answered, thank you!", "label": "positive"},
+    {"text": "This is the best support I have had in years", "label": "positive"},
+    {"text": "Great, the refund arrived this morning", "label": "positive"},
+    {"text": "My order arrived broken and nobody replies", "label": "negative"},
+    {"text": "This is terrible, I have been waiting for two weeks", "label": "negative"},
+    {"text": "I'm really angry about the hidden fees", "label": "negative"},
+    {"text": "What time do you open on Saturdays?", "label": "neutral"},
+    {"text": "Please send the invoice to my work email", "label": "neutral"},
+    {"text": "I ordered the blue one, not the red one", "label": "neutral"},
+]
+
+
+def load_dataset(path: Optional[str]) -> List[Dict[str, Optional[str]]]:
+    if not path:
+        return DEFAULT_SENTIMENT_DATASET
+    examples = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                examples.append({"text": record["text"], "label": record.get("label")})
+    return examples
+
+
+def predict(classifier: Any, batch: List[str], candidate_labels: Optional[List[str]]) -> List[str]:
+    if candidate_labels is None:
+        return [result["label"] for result in classifier(batch, batch_size=len(batch))]
+    results = classifier(batch, candidate_labels=candidate_labels, batch_size=len(batch))
+    if isinstance(results, dict):
+        results = [results]
+    return [result["labels"][0] for result in results]
+
+
+def evaluate(classifier: Any, texts: List[str], batch_size: int, repeat: int,
+             candidate_labels: Optional[List[str]]) -> Dict[str, Any]:
+    samples = []
+    predictions: List[str] = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        predictions = []
+        for offset in range(0, len(texts), batch_size):
+            batch = texts[offset:offset + batch_size]
+            call_start = time.perf_counter()
+            predictions.extend(predict(classifier, batch, candidate_labels))
+            samples.append(time.perf_counter() - call_start)
+    elapsed = time.perf_counter() - start
+    return {
+        "predictions": predictions,
+        "batch_size": batch_size,
+        "messages_per_second": len(texts) * repeat / elapsed if elapsed else None,
+        "latency_per_batch": percentiles(samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", choices=sorted(MODELS), default="sentiment")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 8])
+    parser.add_argument("--dataset", help="Labelled JSONL dataset (defaults to a built-in sentiment set)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    task, model_name, artifact_path = MODELS[args.model]
+    if args.model == "intent" and not args.dataset:
+        parser.error("--dataset is required for the intent model")
+    examples = load_dataset(args.dataset)
+    # The intent model is zero-shot over the catalog's intents
+    candidate_labels = (list(load_catalog(settings.INTENT_CATALOG_PATH))
+                        if args.model == "intent" else None)
+    texts = [example["text"] for example in examples]
+    labels = [example["label"] for example in examples]
+
+    reference: Optional[List[str]] = None
+    report = []
+    for backend in args.backends:
+        start = time.perf_counter()
+        classifier = load_text_classifier(task, model_name, artifact_path, backend=backend)
+        load_seconds = time.perf_counter() - start
+        predict(classifier, texts[:1], candidate_labels)  # first call pays one-off allocation costs
+
+        runs = [evaluate(classifier, texts, batch_size, args.repeat, candidate_labels)
+                for batch_size in args.batch_sizes]
+        predictions = runs[0].pop("predictions")
+        for run in runs[1:]:
+            run.pop("predictions")
+        if reference is None:
+            reference = predictions
+
+        labelled = [(p, l) for p, l in zip(predictions, labels) if l is not None]
+        report.append({
+            "backend": backend,
+            "load_seconds": load_seconds,
+            "accuracy": (sum(p.lower() == l.lower() for p, l in labelled) / len(labelled)
+                         if labelled else None),
+            f"agreement_with_{args.backends[0]}": (
+                sum(p == r for p, r in zip(predictions, reference)) / len(reference)
+            ),
+            "runs": runs,
+        })
+
+    print(json.dumps({
+        "benchmark": "classifier_backends",
+        "revision": _git_revision(),
+        "model": model_name,
+        "examples": len(texts),
+        "inference_threads": settings.INFERENCE_THREADS,
+        "results": report,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
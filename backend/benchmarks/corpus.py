@@ -0,0 +1,49 @@
+"""Replayable message corpora for the benchmarks.
+
+A corpus is a JSONL file with one message per line. Lines may carry a
+``message`` (and optionally ``session_id``) field, or ``title``/``body``
+fields as in a request backlog; plain-text lines are used as-is.
+"""
+import json
+from typing import Dict, List, Optional
+
+from app.batch_cli import message_from_record
+
+DEFAULT_MESSAGES = [
+    "Hello there!",
+    "Hi, can you help me with my order?",
+    "What's the weather forecast for tomorrow?",
+    "What time is it in London right now?",
+    "Thanks, that was a great answer",
+    "My email is jane.doe@example.com and my phone is 555-123-4567",
+    "I ordered on 12/03/2024 and it still hasn't arrived, this is terrible",
+    "Can you tell me about https://example.com/pricing please?",
+    "Alice and Bob are meeting in Paris next week",
+    "I am really happy with the support I got today",
+    "Why does my account keep logging me out?",
+    "Goodbye, see you later",
+]
+
+
+def load_corpus(path: Optional[str] = None) -> List[Dict[str, Optional[str]]]:
+    if not path:
+        return [{"message": message, "session_id": None} for message in DEFAULT_MESSAGES]
+
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                record = {"message": line}
+            if not isinstance(record, dict):
+                record = {"message": str(record)}
+            message = message_from_record(record)
+            if message:
+                entries.append({"message": message, "session_id": record.get("session_id")})
+    if not entries:
+        raise ValueError(f"No messages found in corpus {path}")
+    return entries
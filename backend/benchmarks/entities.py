@@ -0,0 +1,161 @@
+"""Entity extraction: the single-scan extractor against the original one.
+
+Replays a corpus through both and reports whether the outputs agree,
+along with per-message latency for each:
+
+- ``legacy``: four ``re.findall`` passes, then spaCy on every message.
+- ``current``: ``EntityService`` (prefiltered compiled patterns, the NER gate,
+  NER-only spaCy over ``nlp.pipe`` batches).
+
+By default spaCy is the CPU-burning stub from ``benchmarks.stubs``. With
+``--spacy`` it is the installed ``en_core_web_sm``, so the legacy path runs
+the full pipeline and the current one runs NER only:
+
+    python -m benchmarks.entities --iterations 2000
+    python -m benchmarks.entities --spacy --corpus requests.jsonl
+
+The legacy extractor is timed one call at a time. The current one is timed
+in micro-batches of ``--batch-size``, the way concurrent requests reach it.
+
+Agreement is checked with the gate off, since the gate intentionally
+skips NER. The report says how many messages the gate would skip.
+"""
+import argparse
+import asyncio
+import json
+import re
+import time
+from typing import Any, Callable, Dict, List
+
+from benchmarks.corpus import load_corpus
+from benchmarks.micro import _git_revision, percentiles
+from benchmarks.stubs import install_stub_models
+from config.settings import settings
+
+# Extra messages that exercise every pattern, including repeats and overlaps
+PATTERN_MESSAGES = [
+    "Call +1-555-123-4567 or (555) 987-6543, or mail ops@example.org",
+    "Dates: 01/02/2023, 2024-12-31 and 5-6-07",
+    "Links http://a.example.com and https://b.example.com/x%20y",
+    "Reach 5551234567@sms.example.com before 2023/1/9",
+    "see https://example.com/5551234567 for details",
+    "no entities here at all",
+]
+
+
+class LegacyEntityExtractor:
+    """The extractor as it was: uncompiled patterns and a spaCy call per message."""
+
+    def __init__(self, patterns: Dict[str, str], nlp):
+        self.patterns = patterns
+        self.nlp = nlp
+
+    def extract(self, text: str) -> Dict[str, Any]:
+        entities = {}
+        for entity_type, pattern in self.patterns.items():
+            matches = re.findall(pattern, text)
+            if matches:
+                entities[entity_type] = matches[0] if len(matches) == 1 else matches
+        if self.nlp is not None:
+            for ent in self.nlp(text).ents:
+                entities.setdefault(ent.label_, []).append(ent.text)
+        return entities
+
+
+def _time(fn: Callable[[str], Any], messages: List[str], iterations: int) -> Dict[str, Any]:
+    samples = []
+    start = time.perf_counter()
+    for i in range(iterations):
+        call_start = time.perf_counter()
+        fn(messages[i % len(messages)])
+        samples.append(time.perf_counter() - call_start)
+    elapsed = time.perf_counter() - start
+    return {"ops_per_second": iterations / elapsed if elapsed else None, **percentiles(samples)}
+
+
+def _time_batches(fn: Callable[[List[str]], Any], messages: List[str], iterations: int,
+                  batch_size: int) -> Dict[str, Any]:
+    # Batched callers only have a per-batch time; report it per message
+    samples = []
+    start = time.perf_counter()
+    for offset in range(0, iterations, batch_size):
+        batch = [messages[i % len(messages)]
+                 for i in range(offset, min(offset + batch_size, iterations))]
+        call_start = time.perf_counter()
+        fn(batch)
+        samples.extend([(time.perf_counter() - call_start) / len(batch)] * len(batch))
+    elapsed = time.perf_counter() - start
+    return {"ops_per_second": iterations / elapsed if elapsed else None, **percentiles(samples)}
+
+
+async def run(args) -> Dict[str, Any]:
+    if args.spacy:
+        import spacy
+
+        full_nlp = spacy.load("en_core_web_sm")
+    else:
+        full_nlp = install_stub_models(scale=args.model_scale)["spacy"]
+
+    from services.analysis_context import AnalysisContext
+    from services.entity_service import EntityService
+    from utils.model_registry import model_registry
+
+    service = EntityService()
+    legacy = LegacyEntityExtractor(service.patterns, full_nlp)
+    messages = [entry["message"] for entry in load_corpus(args.corpus)] + PATTERN_MESSAGES
+    model_registry.get("spacy")
+
+    settings.NER_GATE_ENABLED = False
+    expected = [legacy.extract(message) for message in messages]
+    actual = [await service.extract_entities(message) for message in messages]
+    mismatches = [{"message": message, "legacy": want, "current": got}
+                  for message, want, got in zip(messages, expected, actual) if want != got]
+    regex_mismatches = sum(1 for message in messages
+                           if LegacyEntityExtractor(service.patterns, None).extract(message)
+                           != service.match_patterns(message))
+    settings.NER_GATE_ENABLED = True
+    gated = sum(1 for message in messages if not service.needs_ner(message))
+
+    def current(batch: List[str]):
+        # What the service does for one micro-batch, without the event loop hop
+        for text in batch:
+            service.match_patterns(text)
+        service._run_ner([AnalysisContext(text) for text in batch if service.needs_ner(text)])
+
+    regex_legacy = LegacyEntityExtractor(service.patterns, None)
+    results = [
+        {"name": "regex.legacy", **_time(regex_legacy.extract, messages, args.iterations)},
+        {"name": "regex.current", **_time(service.match_patterns, messages, args.iterations)},
+        {"name": "extract.legacy", **_time(legacy.extract, messages, args.iterations)},
+        {"name": "extract.current", "batch_size": args.batch_size,
+         **_time_batches(current, messages, args.iterations, args.batch_size)},
+    ]
+
+    return {
+        "suite": "entities",
+        "revision": _git_revision(),
+        "spacy": "en_core_web_sm" if args.spacy else "stub",
+        "messages": len(messages),
+        "gated_messages": gated,
+        "mismatches": mismatches,
+        "regex_mismatches": regex_mismatches,
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--corpus", help="JSONL corpus (defaults to a built-in sample)")
+    parser.add_argument("--batch-size", type=int, default=settings.BATCH_MAX_SIZE,
+                        help="Messages per NER batch (nlp.pipe) for the current extractor")
+    parser.add_argument("--spacy", action="store_true",
+                        help="Use the installed en_core_web_sm instead of the stub")
+    parser.add_argument("--model-scale", type=float, default=1.0,
+                        help="Multiplier on the stub model CPU cost")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""FAQ retrieval: index build, startup and lookup latency at catalog scale.
+
+Builds a synthetic catalog of ``--entries`` support questions (or indexes
+``--catalog``), writes the on-disk index, and reports:
+
+- ``build``: tokenizing the catalog and writing the postings.
+- ``load``: opening the memory-mapped index, which is what a worker pays at startup.
+- ``search``: per-lookup latency for queries built from indexed questions
+  (hits) and from unrelated chat messages (misses).
+- ``add``: one journal write plus replay, the incremental update path.
+
+    python -m benchmarks.faq --entries 50000 --iterations 5000
+"""
+import argparse
+import json
+import random
+import shutil
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from benchmarks.corpus import DEFAULT_MESSAGES
+from benchmarks.micro import _git_revision, percentiles
+from utils.faq_index import FAQIndex, build_index, load_catalog
+
+SUBJECTS = ["password", "order", "refund", "invoice", "account", "subscription", "delivery",
+            "coupon", "warranty", "address", "payment", "profile", "device", "plan", "ticket"]
+ACTIONS = ["reset", "cancel", "change", "track", "update", "renew", "download", "verify",
+           "transfer", "upgrade", "pause", "restore", "share", "report", "export"]
+QUALIFIERS = ["abroad", "online", "twice", "today", "mobile", "business", "family", "student",
+              "gift", "annual", "monthly", "premium", "shared", "old", "new"]
+
+
+def synthetic_catalog(size: int, seed: int = 7) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    entries = []
+    for index in range(size):
+        subject, action, qualifier = rng.choice(SUBJECTS), rng.choice(ACTIONS), rng.choice(QUALIFIERS)
+        # A unique product code per entry keeps the vocabulary growing with the catalog
+        code = f"sku{index}"
+        entries.append({
+            "id": f"faq-{index}",
+            "question": f"How do I {action} my {qualifier} {subject} for {code}?",
+            "alternatives": [f"{action} {subject} {code}", f"problem with {qualifier} {subject} {code}"],
+            "answer": f"To {action} your {subject}, open Settings and choose {action.title()}.",
+        })
+    return entries
+
+
+def _time(fn, queries: List[str], iterations: int) -> Dict[str, Any]:
+    for query in queries[:100]:
+        fn(query)
+    samples = []
+    start = time.perf_counter()
+    for i in range(iterations):
+        call_start = time.perf_counter()
+        fn(queries[i % len(queries)])
+        samples.append(time.perf_counter() - call_start)
+    elapsed = time.perf_counter() - start
+    return {"ops_per_second": iterations / elapsed if elapsed else None, **percentiles(samples)}
+
+
+def run(args) -> Dict[str, Any]:
+    workdir = tempfile.mkdtemp(prefix="faq-bench-")
+    try:
+        if args.catalog:
+            catalog_path = args.catalog
+            entries = load_catalog(catalog_path)
+        else:
+            entries = synthetic_catalog(args.entries)
+            catalog_path = f"{workdir}/catalog.json"
+            with open(catalog_path, "w", encoding="utf-8") as f:
+                json.dump(entries, f)
+        index_path = f"{workdir}/index"
+
+        start = time.perf_counter()
+        build_index(catalog_path, index_path)
+        build_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        index = FAQIndex(index_path, reload_interval=3600.0)
+        load_seconds = time.perf_counter() - start
+
+        rng = random.Random(11)
+        hits = [entry["question"] for entry in rng.sample(entries, min(1000, len(entries)))]
+        correct = sum(1 for entry in entries[:200]
+                      if (index.search(entry["question"]) or {}).get("id") == entry["id"])
+
+        results = [
+            {"name": "search.hit", **_time(index.search, hits, args.iterations)},
+            {"name": "search.miss", **_time(index.search, DEFAULT_MESSAGES, args.iterations)},
+        ]
+
+        add_samples = []
+        for i in range(args.adds):
+            start = time.perf_counter()
+            index.add([{"id": f"added-{i}", "question": f"Can I {rng.choice(ACTIONS)} a new item {i}?",
+                        "answer": "Yes."}])
+            add_samples.append(time.perf_counter() - start)
+        results.append({"name": "add", **percentiles(add_samples)})
+        results.append({"name": "search.after_adds", **_time(index.search, hits, args.iterations)})
+
+        return {
+            "suite": "faq",
+            "revision": _git_revision(),
+            "entries": len(entries),
+            "stats": index.get_stats(),
+            "build_seconds": build_seconds,
+            "load_seconds": load_seconds,
+            "top1_correct": f"{correct}/{min(200, len(entries))}",
+            "results": results,
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=20000, help="Synthetic catalog size")
+    parser.add_argument("--catalog", help="Index this FAQ catalog instead of a synthetic one")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--adds", type=int, default=50, help="Incremental additions to time")
+    args = parser.parse_args()
+    print(json.dumps(run(args), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Compare the compiled KeywordMatcher against the legacy substring loop.
+
+Run from the backend directory:
+
+    python -m benchmarks.keyword_matcher --patterns 5000 --messages 2000
+"""
+import argparse
+import json
+import random
+import string
+import time
+from typing import Dict, List
+
+from utils.keyword_matcher import KeywordMatcher
+
+
+def build_patterns(count: int, labels: int, rng: random.Random) -> Dict[str, List[str]]:
+    patterns: Dict[str, List[str]] = {f"intent_{i}": [] for i in range(labels)}
+    for i in range(count):
+        words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9)))
+                 for _ in range(rng.randint(1, 3))]
+        patterns[f"intent_{i % labels}"].append(" ".join(words))
+    return patterns
+
+
+def build_messages(count: int, patterns: Dict[str, List[str]],
+                   rng: random.Random) -> List[str]:
+    vocabulary = [p for plist in patterns.values() for p in plist]
+    filler = ["the", "please", "could", "you", "tell", "me", "about", "my", "order"]
+    messages = []
+    for _ in range(count):
+        words = rng.choices(filler, k=rng.randint(4, 16))
+        # Roughly half the messages contain a known pattern
+        if rng.random() < 0.5:
+            words.insert(rng.randint(0, len(words)), rng.choice(vocabulary))
+        messages.append(" ".join(words))
+    return messages
+
+
+def legacy_detect(patterns: Dict[str, List[str]], text: str):
+    text_lower = text.lower()
+    for intent, plist in patterns.items():
+        if any(pattern in text_lower for pattern in plist):
+            return intent
+    return None
+
+
+def time_per_message(fn, messages: List[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for message in messages:
+            fn(message)
+        best = min(best, time.perf_counter() - start)
+    return best / len(messages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--patterns", type=int, default=5000)
+    parser.add_argument("--labels", type=int, default=50)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=13)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    patterns = build_patterns(args.patterns, args.labels, rng)
+    messages = build_messages(args.messages, patterns, rng)
+
+    start = time.perf_counter()
+    matcher = KeywordMatcher()
+    matcher.add_patterns(patterns)
+    matcher.compile()
+    compile_time = time.perf_counter() - start
+
+    legacy = time_per_message(lambda m: legacy_detect(patterns, m), messages, args.repeat)
+    compiled = time_per_message(matcher.best, messages, args.repeat)
+
+    print(json.dumps({
+        "benchmark": "keyword_matcher",
+        "patterns": len(matcher),
+        "messages": len(messages),
+        "compile_ms": compile_time * 1000.0,
+        "legacy_us_per_message": legacy * 1e6,
+        "compiled_us_per_message": compiled * 1e6,
+        "speedup": legacy / compiled if compiled else None,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""Load generator for /api/chat and /ws/chat.
+
+Replays a corpus across many concurrent sessions against a running server
+and prints throughput, latency percentiles and error counts as JSON:
+
+    uvicorn benchmarks.stub_app:app --port 8000 &
+    python -m benchmarks.load --url http://localhost:8000 --sessions 50 \\
+        --turns 20 --corpus ../requests.jsonl > load.json
+
+Each session sends its turns sequentially (like a real user), so
+``--sessions`` is the concurrency level.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from collections import Counter
+from typing import Any, Dict, List
+
+import httpx
+
+from benchmarks.corpus import load_corpus
+from benchmarks.micro import _git_revision, percentiles
+
+
+class LoadResult:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.first_tokens: List[float] = []
+        self.errors: Counter = Counter()
+        self.intents: Counter = Counter()
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        completed = len(self.latencies)
+        result = {
+            "requests": completed + sum(self.errors.values()),
+            "completed": completed,
+            "errors": dict(self.errors),
+            "throughput_per_second": completed / elapsed if elapsed else None,
+            "latency": percentiles(self.latencies),
+            "intents": dict(self.intents.most_common(10)),
+        }
+        if self.first_tokens:
+            result["time_to_first_token"] = percentiles(self.first_tokens)
+        return result
+
+
+async def http_session(client: httpx.AsyncClient, url: str, session_id: str,
+                       messages: List[str], result: LoadResult):
+    for message in messages:
+        start = time.perf_counter()
+        try:
+            response = await client.post(f"{url}/api/chat",
+                                         json={"message": message, "session_id": session_id})
+        except httpx.HTTPError as e:
+            result.errors[type(e).__name__] += 1
+            continue
+        if response.status_code != 200:
+            result.errors[f"http_{response.status_code}"] += 1
+            continue
+        result.latencies.append(time.perf_counter() - start)
+        result.intents[response.json().get("intent", {}).get("intent", "unknown")] += 1
+
+
+async def ws_session(url: str, session_id: str, messages: List[str], stream: bool,
+                     result: LoadResult):
+    import websockets
+
+    ws_url = url.replace("http://", "ws://").replace("https://", "wss://") + "/ws/chat"
+    try:
+        async with websockets.connect(ws_url) as websocket:
+            for message in messages:
+                start = time.perf_counter()
+                await websocket.send(json.dumps({
+                    "message": message, "session_id": session_id, "stream": stream
+                }))
+                first_token = None
+                failed = False
+                while True:
+                    event = json.loads(await websocket.recv())
+                    event_type = event.get("type")
+                    if event_type == "token" and first_token is None:
+                        first_token = time.perf_counter() - start
+                    if event_type == "error":
+                        failed = True
+                        if stream:
+                            # A streamed error is followed by a done frame
+                            continue
+                    if event_type in ("token", "metadata"):
+                        continue
+                    break
+                if event.get("type") == "busy":
+                    result.errors["busy"] += 1
+                    continue
+                if failed:
+                    result.errors["error"] += 1
+                    continue
+                result.latencies.append(time.perf_counter() - start)
+                if first_token is not None:
+                    result.first_tokens.append(first_token)
+                intent = event.get("intent", {}).get("intent", "unknown") if not stream else "streamed"
+                result.intents[intent] += 1
+    except Exception as e:
+        result.errors[type(e).__name__] += 1
+
+
+def plan_sessions(corpus: List[Dict[str, Any]], sessions: int, turns: int,
+                  seed: int) -> Dict[str, List[str]]:
+    # Corpus entries with a session_id are replayed as recorded; the rest are
+    # dealt round-robin so every run sends the same messages in the same order
+    rng = random.Random(seed)
+    recorded: Dict[str, List[str]] = {}
+    loose: List[str] = []
+    for entry in corpus:
+        if entry.get("session_id"):
+            recorded.setdefault(entry["session_id"], []).append(entry["message"])
+        else:
+            loose.append(entry["message"])
+    if recorded:
+        return recorded
+
+    plan = {}
+    offset = 0
+    for _ in range(sessions):
+        session_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        plan[session_id] = [loose[(offset + i) % len(loose)] for i in range(turns)]
+        offset += turns
+    return plan
+
+
+async def run(args) -> Dict[str, Any]:
+    plan = plan_sessions(load_corpus(args.corpus), args.sessions, args.turns, args.seed)
+    result = LoadResult()
+    limits = httpx.Limits(max_connections=len(plan), max_keepalive_connections=len(plan))
+
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        start = time.perf_counter()
+        if args.transport == "http":
+            await asyncio.gather(*(http_session(client, args.url, session_id, messages, result)
+                                   for session_id, messages in plan.items()))
+        else:
+            await asyncio.gather(*(ws_session(args.url, session_id, messages,
+                                              args.transport == "ws-stream", result)
+                                   for session_id, messages in plan.items()))
+        elapsed = time.perf_counter() - start
+
+        server_metrics = None
+        if args.collect_server_metrics:
+            try:
+                server_metrics = (await client.get(f"{args.url}/api/analytics/conversations")).json()
+            except httpx.HTTPError:
+                pass
+
+    return {
+        "suite": "load",
+        "revision": _git_revision(),
+        "transport": args.transport,
+        "sessions": len(plan),
+        "elapsed_seconds": elapsed,
+        **result.summary(elapsed),
+        "server": server_metrics,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--transport", choices=["http", "ws", "ws-stream"], default="http")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--corpus", help="JSONL corpus to replay (defaults to built-in messages)")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--collect-server-metrics", action="store_true",
+                        help="Include /api/analytics/conversations in the output")
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Throughput scaling of the multi-worker launcher with the worker count.
+
+Starts ``app.launcher`` on the stub-model app once per worker count, drives
+it with the load generator and prints one JSON report:
+
+    python -m benchmarks.scaling --workers 1 2 4 8 --sessions 64 --turns 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks import load
+from benchmarks.micro import _git_revision
+
+
+def wait_until_ready(url: str, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{url}/ready", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not become ready within {timeout:.0f}s")
+
+
+def run_once(workers: int, args) -> dict:
+    url = f"http://127.0.0.1:{args.port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "app.launcher", "--app", "benchmarks.stub_app:app",
+         "--workers", str(workers), "--host", "127.0.0.1", "--port", str(args.port),
+         "--log-level", "warning", "--allow-local-sessions"],
+        env={**os.environ, "BENCH_MODEL_SCALE": str(args.model_scale)},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_until_ready(url, args.startup_timeout)
+        load_args = argparse.Namespace(
+            url=url, transport=args.transport, sessions=args.sessions, turns=args.turns,
+            corpus=args.corpus, timeout=60.0, seed=13, collect_server_metrics=False
+        )
+        result = asyncio.run(load.run(load_args))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return {
+        "workers": workers,
+        "throughput_per_second": result["throughput_per_second"],
+        "latency": result["latency"],
+        "errors": result["errors"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, 2, 4])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--transport", choices=["http", "ws"], default="http")
+    parser.add_argument("--sessions", type=int, default=64)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--corpus")
+    parser.add_argument("--model-scale", type=float, default=1.0)
+    parser.add_argument("--startup-timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    runs = [run_once(workers, args) for workers in args.workers]
+    baseline = runs[0]["throughput_per_second"] / runs[0]["workers"]
+    for run in runs:
+        run["speedup_vs_linear"] = run["throughput_per_second"] / (baseline * run["workers"])
+
+    print(json.dumps({
+        "benchmark": "scaling",
+        "revision": _git_revision(),
+        "cpu_count": os.cpu_count(),
+        "transport": args.transport,
+        "sessions": args.sessions,
+        "turns": args.turns,
+        "runs": runs,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
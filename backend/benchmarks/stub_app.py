@@ -0,0 +1,39 @@
+"""The FastAPI app wired to stub models, for load tests on any CPU box.
+
+    uvicorn benchmarks.stub_app:app --port 8000
+
+Redis-backed tiers are switched off and conversations go to a throwaway
+SQLite file unless the corresponding settings are set explicitly.
+"""
+import os
+import tempfile
+import time
+from typing import Callable, List, Optional
+
+os.environ.setdefault("DATABASE_URL",
+                      f"sqlite:///{os.path.join(tempfile.gettempdir(), 'chatbot-bench.db')}")
+os.environ.setdefault("RESPONSE_CACHE_USE_REDIS", "false")
+os.environ.setdefault("ANALYTICS_REDIS_MERGE", "false")
+os.environ.setdefault("SESSION_BACKEND", "memory")
+os.environ.setdefault("OPENAI_API_KEY", "")
+
+from benchmarks.stubs import install_stub_models
+from services.chat_service import ChatService
+
+install_stub_models(scale=float(os.environ.get("BENCH_MODEL_SCALE", "1.0")))
+
+
+def _stub_generate_stream(self, prompt_ids: List[int], deadline: Optional[float],
+                          on_token: Callable[[str], None], should_stop: Callable[[], bool]):
+    # Same pacing as the stub generator, delivered word by word
+    for word in "That is interesting, tell me more.".split():
+        if should_stop() or (deadline is not None and time.time() >= deadline):
+            break
+        time.sleep(0.005)
+        on_token(word + " ")
+
+
+# The real implementation drives a transformers TextStreamer
+ChatService._generate_stream = _stub_generate_stream
+
+from app.main import app  # noqa: E402
@@ -0,0 +1,175 @@
+"""Tiny stand-in models so benchmarks run on CPU without downloading weights.
+
+``install_stub_models()`` replaces every entry in the model registry with a
+stub that mimics the output shape of the real pipeline and burns a
+configurable amount of CPU per call, so batching and concurrency effects
+stay visible without torch, transformers or spaCy models installed.
+"""
+import hashlib
+import re
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+from utils.model_registry import model_registry
+
+STUB_INTENTS = ["question", "complaint", "order_status", "account", "small_talk"]
+STUB_SENTIMENTS = ["positive", "negative", "neutral"]
+
+
+def _burn(seconds: float):
+    # Busy-wait (not sleep) so stubs hold the CPU like a real forward pass
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def _pick(text: str, choices: List[str]) -> str:
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=2).digest()
+    return choices[int.from_bytes(digest, "little") % len(choices)]
+
+
+class StubClassifier:
+    def __init__(self, labels: List[str], batch_ms: float, item_ms: float):
+        self.labels = labels
+        self.batch_cost = batch_ms / 1000.0
+        self.item_cost = item_ms / 1000.0
+
+    def __call__(self, texts, batch_size: int = 1, **kwargs):
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        _burn(self.batch_cost + self.item_cost * len(texts))
+        results = [{"label": _pick(text, self.labels), "score": 0.9} for text in texts]
+        return results[0] if single else results
+
+
+class StubZeroShotClassifier(StubClassifier):
+    def __call__(self, texts, candidate_labels: List[str] = None, batch_size: int = 1, **kwargs):
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        labels = candidate_labels or self.labels
+        # Zero-shot cost grows with the number of candidate labels (one NLI pass each)
+        _burn(self.batch_cost + self.item_cost * len(texts) * len(labels))
+        results = []
+        for text in texts:
+            best = _pick(text, labels)
+            rest = [label for label in labels if label != best]
+            results.append({"sequence": text, "labels": [best] + rest,
+                            "scores": [0.9] + [0.1 / max(len(rest), 1)] * len(rest)})
+        return results[0] if single else results
+
+
+class StubEncoder:
+    """Hashed bag-of-words embeddings: similar wording gives similar vectors."""
+
+    def __init__(self, item_ms: float, dimensions: int = 256):
+        self.item_cost = item_ms / 1000.0
+        self.dimensions = dimensions
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        _burn(self.item_cost * len(texts))
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in re.findall(r"\w+", text.lower()):
+                digest = hashlib.blake2b(word.encode("utf-8"), digest_size=4).digest()
+                vectors[row, int.from_bytes(digest, "little") % self.dimensions] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+class StubTokenizer:
+    """Word-level tokenizer with just enough of the transformers API for generation."""
+
+    eos_token = "<|endoftext|>"
+    eos_token_id = 0
+    pad_token = eos_token
+    padding_side = "left"
+
+    def __init__(self):
+        self.vocab: Dict[str, int] = {self.eos_token: self.eos_token_id}
+        self.words: Dict[int, str] = {self.eos_token_id: self.eos_token}
+
+    def encode(self, text: str) -> List[int]:
+        ids = []
+        for word in text.split():
+            if word not in self.vocab:
+                self.vocab[word] = len(self.vocab)
+                self.words[self.vocab[word]] = word
+            ids.append(self.vocab[word])
+        return ids
+
+    def decode(self, ids: List[int], skip_special_tokens: bool = False) -> str:
+        return " ".join(self.words[i] for i in ids
+                        if not (skip_special_tokens and i == self.eos_token_id))
+
+    def pad(self, encoded: Dict[str, List[List[int]]], return_tensors: str = None):
+        prompts = encoded["input_ids"]
+        width = max(len(prompt) for prompt in prompts)
+        return {
+            "input_ids": np.array([[self.eos_token_id] * (width - len(p)) + p for p in prompts]),
+            "attention_mask": np.array([[0] * (width - len(p)) + [1] * len(p) for p in prompts]),
+        }
+
+
+class StubCausalLM:
+    def __init__(self, tokenizer: StubTokenizer, batch_ms: float, item_ms: float):
+        self.tokenizer = tokenizer
+        self.batch_cost = batch_ms / 1000.0
+        self.item_cost = item_ms / 1000.0
+
+    def generate(self, input_ids, max_new_tokens: int = 20, **kwargs):
+        _burn(self.batch_cost + self.item_cost * len(input_ids))
+        reply = self.tokenizer.encode("That is interesting, tell me more.")[:max_new_tokens - 1]
+        reply.append(self.tokenizer.eos_token_id)
+        return np.hstack([input_ids, np.tile(reply, (len(input_ids), 1))])
+
+
+class StubGenerator:
+    """Stands in for the text-generation pipeline (its .model and .tokenizer)."""
+
+    def __init__(self, batch_ms: float, item_ms: float):
+        self.tokenizer = StubTokenizer()
+        self.model = StubCausalLM(self.tokenizer, batch_ms, item_ms)
+
+
+class StubSpan:
+    def __init__(self, text: str, label: str):
+        self.text = text
+        self.label_ = label
+
+
+class StubDoc:
+    def __init__(self, text: str):
+        self.text = text
+        # Capitalized words after the first one stand in for named entities
+        words = text.split()
+        self.ents = [StubSpan(word.strip(".,!?"), "PERSON")
+                     for word in words[1:] if word[:1].isupper()]
+
+
+class StubNLP:
+    def __init__(self, item_ms: float):
+        self.item_cost = item_ms / 1000.0
+
+    def __call__(self, text: str) -> StubDoc:
+        _burn(self.item_cost)
+        return StubDoc(text)
+
+    def pipe(self, texts, **kwargs):
+        for text in texts:
+            yield self(text)
+
+
+def install_stub_models(scale: float = 1.0) -> Dict[str, Any]:
+    # Relative costs loosely follow the real models: generation >> intent > sentiment > NER
+    stubs = {
+        "spacy": StubNLP(item_ms=0.5 * scale),
+        "embedding": StubEncoder(item_ms=0.3 * scale),
+        "intent": StubZeroShotClassifier(STUB_INTENTS, batch_ms=4.0 * scale, item_ms=0.2 * scale),
+        "sentiment": StubClassifier(STUB_SENTIMENTS, batch_ms=2.0 * scale, item_ms=0.5 * scale),
+        "generation": StubGenerator(batch_ms=20.0 * scale, item_ms=5.0 * scale),
+    }
+    for name, stub in stubs.items():
+        model_registry.register(name, lambda stub=stub: stub)
+    return stubs
@@ -1,20 +1,58 @@
 import os
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, List, Optional
 
 class Settings(BaseSettings):
     # Database
     DATABASE_URL: str = "sqlite:///./chatbot.db"
     
+    # Write-behind conversation persistence
+    PERSISTENCE_QUEUE_SIZE: int = 10000
+    PERSISTENCE_BATCH_SIZE: int = 200
+    PERSISTENCE_FLUSH_INTERVAL_MS: float = 500.0
+    PERSISTENCE_MAX_RETRIES: int = 3
+    PERSISTENCE_RETRY_DELAY_MS: float = 200.0
+    
     # Redis
     REDIS_URL: str = "redis://localhost:6379"
     
-    # OpenAI
+    # OpenAI (any OpenAI-compatible chat completions endpoint)
     OPENAI_API_KEY: Optional[str] = None
+    OPENAI_BASE_URL: str = "https://api.openai.com/v1"
+    OPENAI_MODEL: str = "gpt-3.5-turbo"
+    
+    # LLM client pooling, timeouts, retries and circuit breaking
+    LLM_TIMEOUT_SECONDS: float = 10.0
+    LLM_CONNECT_TIMEOUT_SECONDS: float = 2.0
+    LLM_MAX_CONNECTIONS: int = 32
+    LLM_MAX_CONCURRENCY: int = 16
+    LLM_MAX_RETRIES: int = 2
+    LLM_RETRY_BASE_DELAY_SECONDS: float = 0.2
+    LLM_CIRCUIT_FAILURE_THRESHOLD: int = 5
+    LLM_CIRCUIT_RESET_SECONDS: float = 30.0
+    LLM_HEDGE_ENABLED: bool = False
+    LLM_HEDGE_DELAY_MS: float = 500.0
     
     # Hugging Face
     HUGGINGFACE_API_KEY: Optional[str] = None
     
+    # WhatsApp Cloud API channel (enabled when an access token is set)
+    WHATSAPP_ACCESS_TOKEN: Optional[str] = None
+    WHATSAPP_VERIFY_TOKEN: Optional[str] = None
+    WHATSAPP_PHONE_NUMBER_ID: str = ""
+    WHATSAPP_API_URL: str = "https://graph.facebook.com/v17.0"
+    WHATSAPP_TIMEOUT_SECONDS: float = 10.0
+    WHATSAPP_MAX_CONNECTIONS: int = 10
+    WHATSAPP_WORKERS: int = 8
+    WHATSAPP_QUEUE_SIZE: int = 1000
+    WHATSAPP_SEND_RATE: float = 20.0
+    WHATSAPP_SEND_BURST: float = 40.0
+    WHATSAPP_SEND_RETRIES: int = 2
+    WHATSAPP_BUSY_RETRIES: int = 5
+    WHATSAPP_DEDUPE_TTL: float = 86400.0
+    WHATSAPP_DEDUPE_MAX_ENTRIES: int = 100000
+    WHATSAPP_DEDUPE_USE_REDIS: bool = True
+    
     # JWT
     JWT_SECRET: str = "your-secret-key"
     JWT_ALGORITHM: str = "HS256"
@@ -22,10 +60,169 @@ class Settings(BaseSettings):
     # CORS
     ALLOWED_ORIGINS: list = ["http://localhost:3000", "http://127.0.0.1:3000"]
     
-    # Model paths
+    # Classifier models and where exported/quantized artifacts are cached
+    INTENT_MODEL_NAME: str = "joeddav/xlm-roberta-large-xnli"
+    SENTIMENT_MODEL_NAME: str = "cardiffnlp/twitter-roberta-base-sentiment-latest"
+    INTENT_MODEL_PATH: str = "models/intent/"
     SENTIMENT_MODEL_PATH: str = "models/sentiment/"
     NER_MODEL_PATH: str = "models/ner/"
     
+    # Semantic intent tier: embedding lookup against an index built offline
+    # from INTENT_CATALOG_PATH (python -m utils.semantic_index); the large
+    # zero-shot classifier only runs below INTENT_SEMANTIC_THRESHOLD
+    INTENT_CATALOG_PATH: str = "config/intent_catalog.json"
+    INTENT_INDEX_PATH: str = "models/intent_index/"
+    INTENT_EMBEDDING_MODEL_NAME: str = "sentence-transformers/all-MiniLM-L6-v2"
+    INTENT_SEMANTIC_THRESHOLD: float = 0.75
+    INTENT_SEMANTIC_TOP_K: int = 5
+    INTENT_INDEX_RELOAD_INTERVAL: float = 30.0
+    # Extra zero-shot candidate for messages that match none of the intents
+    INTENT_OUT_OF_SCOPE_LABEL: str = "general"
+    
+    # CPU inference backend for the intent and sentiment classifiers:
+    #   "pytorch"   - stock transformers pipeline
+    #   "quantized" - PyTorch dynamic int8 quantization of the Linear layers
+    #   "onnx"      - ONNX Runtime export (int8-quantized if ONNX_QUANTIZE)
+    INFERENCE_BACKEND: str = "pytorch"
+    ONNX_QUANTIZE: bool = True
+    # Intra-op threads per model call (0 keeps the library default); keep
+    # INFERENCE_THREADS * INFERENCE_MAX_WORKERS at or below the core count
+    INFERENCE_THREADS: int = 0
+    
+    # Extra keyword patterns (JSON: {"label": ["pattern", {"pattern": ..., "weight": ...}]})
+    INTENT_PATTERNS_PATH: Optional[str] = None
+    SENTIMENT_WORDS_PATH: Optional[str] = None
+    
+    # Skip spaCy NER for messages that cannot hold a named entity (no
+    # uppercase letters or digits) or whose keyword intent needs none
+    NER_GATE_ENABLED: bool = True
+    NER_SKIP_INTENTS: list = ["greeting", "farewell", "thanks"]
+    
+    # Response / analysis cache (in-process LRU in front of Redis)
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_USE_REDIS: bool = True
+    RESPONSE_CACHE_MAX_ENTRIES: int = 10000
+    RESPONSE_CACHE_TTL: int = 300
+    RESPONSE_CACHE_REDIS_RETRY_SECONDS: float = 30.0
+    ANALYSIS_CACHE_TTL: int = 3600
+    CACHE_BYPASS_INTENTS: list = ["time"]
+    
+    # Session context store ("memory" or "redis")
+    SESSION_BACKEND: str = "memory"
+    SESSION_MAX_SESSIONS: int = 10000
+    SESSION_IDLE_TTL: int = 3600
+    SESSION_MAX_MEMORY_MB: int = 64
+    SESSION_MAX_HISTORY: int = 20
+    SESSION_MAX_ENTITIES: int = 50
+    
+    # Local generation prompt: recent turns as cached token ids, under a token budget
+    GENERATION_WINDOW_TURNS: int = 10
+    GENERATION_MAX_INPUT_TOKENS: int = 256
+    GENERATION_MAX_NEW_TOKENS: int = 60
+    
+    # Generation routing: backends tried in GENERATION_TIERS order, skipped
+    # when their circuit is open, they are saturated or failing, or their
+    # expected latency does not fit the request deadline. Without a client
+    # deadline, backends over the SLO are tried last instead of skipped; a
+    # templated reply is the last tier. A slow backend's
+    # latency estimate halves every GENERATION_LATENCY_HALF_LIFE_SECONDS while
+    # it gets no traffic, so it is retried once it could fit again
+    GENERATION_TIERS: List[str] = ["gpt", "dialogpt"]
+    GENERATION_SLO_MS: float = 2000.0
+    GENERATION_RULES_MIN_CONFIDENCE: float = 0.6
+    # Intent methods whose result may pick a canned rule reply
+    GENERATION_RULES_METHODS: List[str] = ["rule_based", "semantic"]
+    GENERATION_LATENCY_EWMA_ALPHA: float = 0.2
+    GENERATION_LATENCY_HALF_LIFE_SECONDS: float = 30.0
+    GENERATION_MAX_ERROR_RATE: float = 0.5
+    GENERATION_ERROR_COOLDOWN_SECONDS: float = 10.0
+    
+    # FAQ retrieval tier: BM25 over FAQ questions, tried after the intent rules
+    # and before any model; answers when the normalized score reaches
+    # FAQ_MIN_SCORE with at least FAQ_MIN_MATCHED_TERMS query terms matched.
+    # The index is (re)built from FAQ_CATALOG_PATH when the catalog changes
+    # (python -m utils.faq_index build)
+    FAQ_ENABLED: bool = True
+    FAQ_CATALOG_PATH: str = "config/faq.json"
+    FAQ_INDEX_PATH: str = "models/faq_index/"
+    FAQ_MIN_SCORE: float = 0.65
+    FAQ_MIN_MATCHED_TERMS: int = 2
+    FAQ_BM25_K1: float = 1.2
+    FAQ_BM25_B: float = 0.75
+    FAQ_RELOAD_INTERVAL: float = 5.0
+    
+    # Analytics engine: lifetime totals are shared Redis counters (kept across
+    # restarts), rolling windows are merged from each live worker's snapshot
+    ANALYTICS_TOP_INTENTS: int = 10
+    ANALYTICS_LIFETIME_INTENTS: int = 1000
+    ANALYTICS_REDIS_MERGE: bool = True
+    ANALYTICS_PUBLISH_INTERVAL: float = 5.0
+    ANALYTICS_WORKER_TTL: int = 60
+    
+    # Sentiment trends: per-session EMA in the session context, global
+    # 5-minute/hourly rollups flushed to Redis so they survive restarts
+    SENTIMENT_EMA_ALPHA: float = 0.3
+    SENTIMENT_TREND_THRESHOLD: float = 0.1
+    SENTIMENT_ROLLUP_REDIS: bool = True
+    SENTIMENT_FLUSH_INTERVAL: float = 2.0
+    SENTIMENT_READ_CACHE_SECONDS: float = 2.0
+    
+    # Sampling profiler for slow requests (logs hot stacks)
+    PROFILER_ENABLED: bool = False
+    PROFILER_INTERVAL_MS: float = 5.0
+    PROFILER_SLOW_REQUEST_MS: float = 2000.0
+    PROFILER_MAX_CONCURRENT: int = 8
+    
+    # Model loading at startup:
+    #   "background" - serve immediately with rule-based fallbacks while models
+    #                  warm up in MODEL_WARMUP_ORDER
+    #   "eager"      - load every model before accepting requests
+    #   "lazy"       - load each model on its first request
+    STARTUP_MODE: str = "background"
+    MODEL_WARMUP_ORDER: List[str] = ["spacy", "sentiment", "embedding", "intent", "generation"]
+    
+    # Request scheduler in front of the chat pipeline: one turn at a time per
+    # session, sessions share the slots round-robin, clients are rate limited;
+    # requests over any limit get HTTP 429 instead of queueing. Every worker
+    # process applies these on its own: with N workers a client may get N
+    # times the limits, and a session is only ordered within one worker
+    SCHEDULER_MAX_CONCURRENCY: int = 64
+    SCHEDULER_MAX_QUEUED: int = 256
+    SCHEDULER_CLIENT_MAX_CONCURRENCY: int = 8
+    SCHEDULER_CLIENT_MAX_QUEUED: int = 32
+    SCHEDULER_CLIENT_RATE: float = 10.0
+    SCHEDULER_CLIENT_BURST: float = 20.0
+    SCHEDULER_MAX_CLIENTS: int = 100000
+    
+    # Bulk chat processing (/api/chat/batch and app.batch_cli)
+    CHAT_BATCH_MAX_ITEMS: int = 10000
+    CHAT_BATCH_CONCURRENCY: int = 32
+    CHAT_BATCH_BUSY_RETRIES: int = 5
+    
+    # Micro-batching of transformer pipeline calls
+    BATCH_MAX_SIZE: int = 16
+    BATCH_MAX_WAIT_MS: float = 5.0
+    BATCH_MAX_QUEUE_DEPTH: int = 1024
+    
+    # Inference execution ("thread" or "process" pool)
+    INFERENCE_EXECUTOR: str = "thread"
+    INFERENCE_MAX_WORKERS: int = 4
+    INFERENCE_MODEL_CONCURRENCY: Dict[str, int] = {
+        "intent": 2,
+        "intent_semantic": 2,
+        "sentiment": 2,
+        "ner": 2,
+        "generation": 1
+    }
+    INFERENCE_MAX_PENDING: int = 64
+    
+    # Per-analyzer deadlines for the message analysis fan-out
+    ANALYZER_TIMEOUTS_MS: Dict[str, float] = {
+        "intent": 800.0,
+        "entities": 400.0,
+        "sentiment": 800.0
+    }
+    
     class Config:
         env_file = ".env"
 
@@ -0,0 +1,63 @@
+import asyncio
+import logging
+from datetime import datetime
+
+from sqlalchemy import JSON, Column, DateTime, Float, Integer, String, Text, create_engine, event
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+Base = declarative_base()
+
+
+class Conversation(Base):
+    __tablename__ = "conversations"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    session_id = Column(String(128), index=True, nullable=False)
+    user_message = Column(Text, nullable=False)
+    bot_response = Column(Text, nullable=False)
+    intent = Column(String(64))
+    intent_confidence = Column(Float)
+    entities = Column(JSON)
+    sentiment_label = Column(String(32))
+    sentiment_score = Column(Float)
+    response_time = Column(Float)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+class UserSession(Base):
+    __tablename__ = "user_sessions"
+
+    session_id = Column(String(128), primary_key=True)
+    message_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_active = Column(DateTime, default=datetime.utcnow)
+
+
+_is_sqlite = settings.DATABASE_URL.startswith("sqlite")
+
+engine = create_engine(
+    settings.DATABASE_URL,
+    connect_args={"check_same_thread": False} if _is_sqlite else {},
+    pool_pre_ping=True
+)
+
+if _is_sqlite:
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        # WAL lets readers run alongside the batched writer; NORMAL sync is
+        # durable across application crashes and much cheaper per commit
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+SessionLocal = sessionmaker(bind=engine, expire_on_commit=False)
+
+
+async def init_db():
+    await asyncio.to_thread(Base.metadata.create_all, engine)
+    logger.info("Database initialized")
@@ -0,0 +1,47 @@
+import threading
+from typing import Any, Dict, List, Optional
+
+from utils.model_registry import model_registry
+
+
+class AnalysisContext:
+    """Per-message analysis state shared by every analyzer.
+
+    The spaCy ``Doc`` is parsed at most once, on first access, and then
+    reused by entity extraction and any other consumer of the message.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self._doc: Optional[Any] = None
+        self._lock = threading.Lock()
+
+    @property
+    def doc(self) -> Optional[Any]:
+        if self._doc is None:
+            with self._lock:
+                if self._doc is None:
+                    nlp = model_registry.get("spacy")
+                    if nlp is not None:
+                        self._doc = nlp(self.text)
+        return self._doc
+
+    @staticmethod
+    def parse_many(analyses: List["AnalysisContext"]) -> List[Optional[Any]]:
+        # One nlp.pipe call for every context that has not been parsed yet
+        pending = [analysis for analysis in analyses if analysis._doc is None]
+        nlp = model_registry.get("spacy") if pending else None
+        if nlp is not None:
+            for analysis, doc in zip(pending, nlp.pipe([a.text for a in pending],
+                                                       batch_size=len(pending))):
+                with analysis._lock:
+                    if analysis._doc is None:
+                        analysis._doc = doc
+        return [analysis._doc for analysis in analyses]
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Process-pool workers re-parse on their side; locks don't pickle
+        return {"text": self.text}
+
+    def __setstate__(self, state: Dict[str, Any]):
+        self.__init__(state["text"])
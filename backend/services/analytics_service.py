@@ -1,52 +1,239 @@
 import logging
-from typing import Dict, Any, List
+import os
+import socket
+import time
+from collections import Counter
+from typing import Dict, Any, List, Tuple
 from datetime import datetime, timedelta
 import json
 import asyncio
 
+from config.settings import settings
+from utils.cache import cache_manager
+from utils.metrics import LatencyHistogram, MetricsAggregate
+
 logger = logging.getLogger(__name__)
 
+# Live workers (a set of ids) and each one's rolling windows under its own
+# expiring key, so a dead or re-forked worker's snapshot simply expires
+WORKER_IDS_KEY = "analytics:worker_ids"
+WORKER_KEY_PREFIX = "analytics:worker:"
+# Lifetime totals as plain counters every worker adds its deltas to, so
+# they survive restarts: a hash of totals and histogram buckets, and a
+# sorted set of intent counts
+LIFETIME_KEY = "analytics:lifetime"
+LIFETIME_INTENTS_KEY = "analytics:lifetime:intents"
+HISTOGRAMS = ("latency", "first_token")
+
+
+class _LifetimeDelta:
+    """What this worker recorded since its last publish."""
+
+    def __init__(self):
+        self.total = 0
+        self.errors = 0
+        self.histograms = {name: LatencyHistogram() for name in HISTOGRAMS}
+        self.intents: Counter = Counter()
+
+    def merge(self, other: "_LifetimeDelta"):
+        self.total += other.total
+        self.errors += other.errors
+        for name, histogram in other.histograms.items():
+            self.histograms[name].merge(histogram)
+        self.intents.update(other.intents)
+
+    def is_empty(self) -> bool:
+        return not self.total and not self.histograms["first_token"].count
+
+
 class AnalyticsService:
     def __init__(self):
-        self.metrics = {
-            "total_conversations": 0,
-            "average_response_time": 0.0,
-            "user_satisfaction": 0.0,
-            "common_intents": {},
-            "error_rate": 0.0
-        }
-        
+        # Local aggregates: O(1) updates on the request path, fixed memory
+        self.aggregate = MetricsAggregate(top_k=settings.ANALYTICS_TOP_INTENTS)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._pending = _LifetimeDelta()
+        self._publisher = None
+
+    async def start(self):
+        if settings.ANALYTICS_REDIS_MERGE:
+            self._publisher = asyncio.create_task(self._publish_loop())
+
+    async def stop(self):
+        if self._publisher:
+            self._publisher.cancel()
+            try:
+                await self._publisher
+            except asyncio.CancelledError:
+                pass
+            self._publisher = None
+            # Hand in the last deltas and leave the live set right away
+            try:
+                await self._publish(final=True)
+            except Exception as e:
+                logger.warning(f"Could not publish final worker analytics: {str(e)}")
+
     async def track_interaction(self, session_id: str, user_message: str, response: Dict):
-        # Update metrics
-        self.metrics["total_conversations"] += 1
-        
         response_time = response.get("response_time", 0)
-        current_avg = self.metrics["average_response_time"]
-        total_conv = self.metrics["total_conversations"]
-        
-        # Update running average
-        self.metrics["average_response_time"] = (
-            (current_avg * (total_conv - 1) + response_time) / total_conv
-        )
-        
-        # Track common intents
         intent = response.get("intent", {}).get("intent", "unknown")
-        if intent in self.metrics["common_intents"]:
-            self.metrics["common_intents"][intent] += 1
-        else:
-            self.metrics["common_intents"][intent] = 1
-            
+
+        error = intent == "error"
+        self.aggregate.record(response_time, intent, error=error)
+        if settings.ANALYTICS_REDIS_MERGE:
+            self._pending.total += 1
+            self._pending.errors += int(error)
+            self._pending.histograms["latency"].record(response_time)
+            self._pending.intents[intent] += 1
+
         logger.info(f"Tracked interaction - Session: {session_id}, "
                    f"Intent: {intent}, Response Time: {response_time:.2f}s")
 
+    async def track_first_token(self, session_id: str, time_to_first_token: float):
+        self.aggregate.record_first_token(time_to_first_token)
+        if settings.ANALYTICS_REDIS_MERGE:
+            self._pending.histograms["first_token"].record(time_to_first_token)
+
+        logger.info(f"Tracked first token - Session: {session_id}, "
+                   f"Time to first token: {time_to_first_token:.2f}s")
+
+    async def _publish_loop(self):
+        # Each worker periodically publishes its aggregate; readers merge them all
+        while True:
+            await asyncio.sleep(settings.ANALYTICS_PUBLISH_INTERVAL)
+            try:
+                await self._publish()
+            except Exception as e:
+                logger.warning(f"Could not publish worker analytics: {str(e)}")
+
+    async def _publish(self, final: bool = False):
+        redis_client = await cache_manager.get_redis_pool()
+        now = time.time()
+        pending, self._pending = self._pending, _LifetimeDelta()
+        worker_key = f"{WORKER_KEY_PREFIX}{self.worker_id}"
+        try:
+            # One transaction, so a failed publish adds nothing and can be retried
+            async with redis_client.pipeline(transaction=True) as pipe:
+                if not pending.is_empty():
+                    self._add_lifetime(pipe, pending)
+                if final:
+                    pipe.delete(worker_key)
+                    pipe.srem(WORKER_IDS_KEY, self.worker_id)
+                else:
+                    snapshot = {
+                        "updated_at": now,
+                        "windows": {name: window.to_dict(now)
+                                    for name, window in self.aggregate.windows.items()}
+                    }
+                    pipe.set(worker_key, json.dumps(snapshot), ex=settings.ANALYTICS_WORKER_TTL)
+                    pipe.sadd(WORKER_IDS_KEY, self.worker_id)
+                await pipe.execute()
+        except Exception:
+            # Put the deltas back so a Redis blip delays the totals instead of losing them
+            pending.merge(self._pending)
+            self._pending = pending
+            raise
+
+    @staticmethod
+    def _add_lifetime(pipe, delta: _LifetimeDelta):
+        pipe.hincrby(LIFETIME_KEY, "total", delta.total)
+        pipe.hincrby(LIFETIME_KEY, "errors", delta.errors)
+        for name, histogram in delta.histograms.items():
+            if not histogram.count:
+                continue
+            pipe.hincrbyfloat(LIFETIME_KEY, f"{name}:total", histogram.total)
+            for index, count in enumerate(histogram.counts):
+                if count:
+                    pipe.hincrby(LIFETIME_KEY, f"{name}:{index}", count)
+        for intent, count in delta.intents.items():
+            pipe.zincrby(LIFETIME_INTENTS_KEY, count, intent)
+        # Only the heaviest intents are kept
+        pipe.zremrangebyrank(LIFETIME_INTENTS_KEY, 0, -settings.ANALYTICS_LIFETIME_INTENTS - 1)
+
+    async def _fleet_aggregate(self) -> Tuple[MetricsAggregate, int]:
+        if not settings.ANALYTICS_REDIS_MERGE:
+            return self.aggregate, 1
+
+        try:
+            redis_client = await cache_manager.get_redis_pool()
+            async with redis_client.pipeline(transaction=False) as pipe:
+                pipe.hgetall(LIFETIME_KEY)
+                pipe.zrevrange(LIFETIME_INTENTS_KEY, 0, settings.ANALYTICS_TOP_INTENTS - 1,
+                               withscores=True)
+                pipe.smembers(WORKER_IDS_KEY)
+                lifetime, intents, worker_ids = await pipe.execute()
+            others = sorted(worker_id for worker_id in worker_ids if worker_id != self.worker_id)
+            snapshots = (await redis_client.mget([f"{WORKER_KEY_PREFIX}{worker_id}"
+                                                  for worker_id in others])) if others else []
+        except Exception as e:
+            logger.warning(f"Could not read fleet analytics, using local only: {str(e)}")
+            return self.aggregate, 1
+
+        fleet = MetricsAggregate(top_k=settings.ANALYTICS_TOP_INTENTS)
+        # Lifetime: the shared counters plus what this worker has not published yet
+        fleet.total = int(lifetime.get("total", 0)) + self._pending.total
+        fleet.errors = int(lifetime.get("errors", 0)) + self._pending.errors
+        for name in HISTOGRAMS:
+            histogram = self._lifetime_histogram(lifetime, name)
+            histogram.merge(self._pending.histograms[name])
+            setattr(fleet, name, histogram)
+        pending_intents = Counter(self._pending.intents)
+        for intent, count in intents:
+            fleet.intents.add(intent, int(count) + pending_intents.pop(intent, 0))
+        for intent, count in pending_intents.items():
+            fleet.intents.add(intent, count)
+
+        # Rolling windows: this worker's, plus every other worker still alive
+        now = time.time()
+        for name, window in self.aggregate.windows.items():
+            fleet.windows[name].merge_dict(window.to_dict(now), now)
+        workers = 1
+        expired = []
+        for worker_id, raw in zip(others, snapshots):
+            if raw is None:
+                expired.append(worker_id)
+                continue
+            for name, window in json.loads(raw)["windows"].items():
+                if name in fleet.windows:
+                    fleet.windows[name].merge_dict(window, now)
+            workers += 1
+        if expired:
+            # Their keys expired (the worker died or was re-forked)
+            try:
+                await redis_client.srem(WORKER_IDS_KEY, *expired)
+            except Exception as e:
+                logger.warning(f"Could not prune expired analytics workers: {str(e)}")
+        return fleet, workers
+
+    @staticmethod
+    def _lifetime_histogram(fields: Dict[str, str], name: str) -> LatencyHistogram:
+        counts = {}
+        prefix = f"{name}:"
+        for field, value in fields.items():
+            if field.startswith(prefix) and field[len(prefix):].isdigit():
+                counts[int(field[len(prefix):])] = int(value)
+        return LatencyHistogram.from_counts(counts, float(fields.get(f"{name}:total", 0.0)))
+
     async def get_conversation_analytics(self) -> Dict[str, Any]:
+        aggregate, workers = await self._fleet_aggregate()
+        latency = aggregate.latency.summary()
+        first_token = aggregate.first_token.summary()
+        top_intents = dict(aggregate.intents.items())
+
         return {
-            "metrics": self.metrics,
+            "metrics": {
+                "total_conversations": aggregate.total,
+                "average_response_time": latency["mean"],
+                "user_satisfaction": 0.0,
+                "common_intents": top_intents,
+                "error_rate": aggregate.errors / aggregate.total if aggregate.total else 0.0,
+                "streamed_responses": first_token["count"],
+                "average_time_to_first_token": first_token["mean"]
+            },
+            "latency": {
+                "lifetime": latency,
+                **{name: window.summary() for name, window in aggregate.windows.items()}
+            },
+            "time_to_first_token": first_token,
+            "workers": workers,
             "timestamp": datetime.utcnow().isoformat(),
-            "top_intents": dict(sorted(
-                self.metrics["common_intents"].items(), 
-                key=lambda x: x[1], 
-                reverse=True
-            )[:5])
+            "top_intents": dict(list(top_intents.items())[:5])
         }
-        
\ No newline at end of file
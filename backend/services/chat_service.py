@@ -1,17 +1,31 @@
+import asyncio
 import logging
 import json
+import threading
 import time
-from typing import Dict, Any, List
-import openai
-from transformers import pipeline, AutoTokenizer, AutoModelForSequenceClassification
-import spacy
+import uuid
+from contextlib import nullcontext
+from functools import partial
+from typing import Dict, Any, List, AsyncIterator, Awaitable, Callable, Optional, Tuple
 import redis.asyncio as redis
 
 from config.settings import settings
-from models.database import Conversation, UserSession
 from services.intent_service import IntentService
 from services.entity_service import EntityService
+from services.faq_service import FAQService
 from services.sentiment_service import SentimentService
+from services.analysis_context import AnalysisContext
+from utils.batching import BatchScheduler
+from utils.conversation_window import ConversationWindows
+from utils.generation_router import GenerationRouter
+from utils.inference import InferenceBusyError, inference_executor
+from utils.llm_client import LLMClient
+from utils.model_registry import model_registry
+from utils.request_scheduler import RequestScheduler
+from utils.response_cache import ResponseCache
+from utils.session_store import create_session_store
+from utils.tracing import current_trace, slow_request_profiler, start_trace
+from utils.write_behind import conversation_row, conversation_writer
 
 logger = logging.getLogger(__name__)
 
@@ -20,93 +34,468 @@ class ChatService:
         self.intent_service = IntentService()
         self.entity_service = EntityService()
         self.sentiment_service = SentimentService()
-        self.context_memory = {}
-        
-        # Load NLP models
-        try:
-            self.nlp = spacy.load("en_core_web_sm")
-        except OSError:
-            logger.warning("spaCy model not found, downloading...")
-            spacy.cli.download("en_core_web_sm")
-            self.nlp = spacy.load("en_core_web_sm")
+        self.faq_service = FAQService()
+        self.session_store = create_session_store()
+        self.response_cache = ResponseCache()
         
         # Initialize GPT (fallback to local models if no API key)
         self.use_gpt = bool(settings.OPENAI_API_KEY)
-        if self.use_gpt:
-            openai.api_key = settings.OPENAI_API_KEY
-        
-        # Local response generation model
-        self.response_generator = pipeline(
-            "text-generation",
-            model="microsoft/DialoGPT-medium",
-            tokenizer="microsoft/DialoGPT-medium"
+        self.llm_client = LLMClient() if self.use_gpt else None
+        
+        # Local response generation (DialoGPT is loaded by the model registry)
+        inference_executor.register("generation", self._generate_batch)
+        # Streams run the same model, so they share generation's concurrency limit
+        inference_executor.register("generation_stream", self._generate_stream,
+                                    resource="generation")
+        self.generation_batcher = BatchScheduler(
+            "generation", partial(inference_executor.run, "generation")
         )
+        self.windows = ConversationWindows()
+        self.scheduler = RequestScheduler()
+        self.router = GenerationRouter(self.generation_batcher, self.llm_client)
 
-    async def process_message(self, message: str, session_id: str) -> Dict[str, Any]:
+    async def process_message(self, message: str, session_id: str, debug: bool = False,
+                              client_id: Optional[str] = None,
+                              timeout_ms: Optional[float] = None) -> Dict[str, Any]:
+        start_trace()
+        # The budget starts now, so time spent queued counts against it
+        deadline = self.router.deadline_for(timeout_ms)
+        try:
+            # Waits for this session's earlier turns; rejected outright when overloaded
+            async with self.scheduler.slot(session_id, client_id):
+                return await self._process_message(message, session_id, debug, deadline)
+        except InferenceBusyError:
+            # Let the caller apply backpressure (HTTP 503 / WebSocket busy frame)
+            raise
+        except Exception as e:
+            logger.error(f"Error processing message: {str(e)}")
+            return await self._get_fallback_response(message)
+
+    async def _process_message(self, message: str, session_id: str, debug: bool = False,
+                               deadline: Optional[float] = None) -> Dict[str, Any]:
         start_time = time.time()
+        trace = current_trace()
+        profiler = (slow_request_profiler.profile(f"session={session_id}")
+                    if settings.PROFILER_ENABLED else nullcontext())
         
-        try:
-            # Step 1: Analyze message
-            intent = await self.intent_service.detect_intent(message)
-            entities = await self.entity_service.extract_entities(message)
-            sentiment = await self.sentiment_service.analyze_sentiment(message)
+        with profiler:
+            # Step 1: Analyze message (intent, entities and sentiment in parallel)
+            intent, entities, sentiment, timed_out = await self._analyze_message(message)
             
             # Step 2: Get context
-            context = await self._get_context(session_id)
+            with trace.stage("context_load"):
+                context = await self._get_context(session_id)
             
-            # Step 3: Generate response
-            response = await self._generate_response(
-                message, intent, entities, sentiment, context, session_id
-            )
+            # Step 3: Generate response (reused from the cache when possible)
+            with trace.stage("generation") as labels:
+                cacheable = intent.get('intent') not in settings.CACHE_BYPASS_INTENTS
+                response = None
+                if cacheable:
+                    response_key = self.response_cache.response_key(message, context)
+                    response = await self.response_cache.get(response_key)
+                cached = response is not None
+                if cached:
+                    backend = "cache"
+                else:
+                    response, backend = await self._generate_response(
+                        message, intent, entities, sentiment, context, session_id, deadline
+                    )
+                    if cacheable and backend not in ("template", "fallback"):
+                        await self.response_cache.set(response_key, response)
+                labels["backend"] = trace.labels["backend"] = backend
             
             # Step 4: Update context
-            await self._update_context(session_id, message, response, intent, entities)
+            with trace.stage("context_update"):
+                await self._update_context(session_id, message, response, intent, entities,
+                                           sentiment, context)
             
             # Step 5: Calculate response time
             response_time = time.time() - start_time
             
             # Step 6: Store conversation
+            with trace.stage("store"):
+                await self._store_conversation(
+                    session_id, message, response, intent, entities, 
+                    sentiment, response_time
+                )
+        
+        trace.finish()
+        result = {
+            "response": response,
+            "intent": intent,
+            "entities": entities,
+            "sentiment": sentiment,
+            "response_time": response_time,
+            "session_id": session_id,
+            "timed_out": timed_out,
+            "cached": cached
+        }
+        if debug:
+            result["timings"] = trace.breakdown()
+        return result
+
+    async def stream_message(self, message: str, session_id: str,
+                             client_id: Optional[str] = None,
+                             timeout_ms: Optional[float] = None) -> AsyncIterator[Dict[str, Any]]:
+        # Same pipeline as process_message, but yields events as they become available:
+        # "metadata" (analysis), then "token" chunks, then "done" with the full result
+        trace = start_trace()
+        deadline = self.router.deadline_for(timeout_ms)
+        async with self.scheduler.slot(session_id, client_id):
+            start_time = time.time()
+            
+            intent, entities, sentiment, timed_out = await self._analyze_message(message)
+            yield {
+                "type": "metadata",
+                "intent": intent,
+                "entities": entities,
+                "sentiment": sentiment,
+                "session_id": session_id,
+                "timed_out": timed_out
+            }
+            
+            context = await self._get_context(session_id)
+            
+            cacheable = intent.get('intent') not in settings.CACHE_BYPASS_INTENTS
+            response = None
+            if cacheable:
+                response_key = self.response_cache.response_key(message, context)
+                response = await self.response_cache.get(response_key)
+            cached = response is not None
+            
+            time_to_first_token = None
+            if cached:
+                time_to_first_token = time.time() - start_time
+                yield {"type": "token", "token": response}
+            else:
+                chunks = []
+                backend = {}
+                async for token in self._stream_response(message, intent, entities, sentiment,
+                                                         context, session_id, deadline, backend):
+                    if time_to_first_token is None:
+                        time_to_first_token = time.time() - start_time
+                    chunks.append(token)
+                    yield {"type": "token", "token": token}
+                response = "".join(chunks).strip()
+                if cacheable and backend.get("name") not in ("template", "fallback"):
+                    await self.response_cache.set(response_key, response)
+            
+            await self._update_context(session_id, message, response, intent, entities,
+                                       sentiment, context)
+            response_time = time.time() - start_time
             await self._store_conversation(
-                session_id, message, response, intent, entities, 
+                session_id, message, response, intent, entities,
                 sentiment, response_time
             )
+            trace.record("first_token", time_to_first_token or response_time)
+            trace.finish()
             
-            return {
+            yield {
+                "type": "done",
                 "response": response,
                 "intent": intent,
                 "entities": entities,
                 "sentiment": sentiment,
                 "response_time": response_time,
-                "session_id": session_id
+                "time_to_first_token": time_to_first_token or response_time,
+                "session_id": session_id,
+                "timed_out": timed_out,
+                "cached": cached
             }
+
+    async def iter_batch(self, items: List[Dict[str, Any]],
+                         max_concurrency: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+        # Turns of one session run in order, so each sees the previous turn's
+        # context; sessions run concurrently so the micro-batchers can coalesce
+        # their model calls into full batches. Items without a session_id each
+        # get their own throwaway session, so unrelated messages neither share
+        # context nor queue behind one another. Results are yielded as they
+        # complete, tagged with the item's position in ``items``.
+        sessions: Dict[str, List[Tuple[int, Dict[str, Any]]]] = {}
+        for index, item in enumerate(items):
+            session_id = item.get("session_id") or f"batch-{uuid.uuid4().hex}"
+            sessions.setdefault(session_id, []).append((index, item))
+        
+        results: asyncio.Queue = asyncio.Queue()
+        semaphore = asyncio.Semaphore(max_concurrency or settings.CHAT_BATCH_CONCURRENCY)
+        
+        async def run_session(session_id: str, turns: List[Tuple[int, Dict[str, Any]]]):
+            async with semaphore:
+                for index, item in turns:
+                    await results.put(await self._process_batch_item(index, session_id, item))
+        
+        tasks = [asyncio.create_task(run_session(session_id, turns))
+                 for session_id, turns in sessions.items()]
+        try:
+            for _ in range(len(items)):
+                yield await results.get()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _process_batch_item(self, index: int, session_id: str,
+                                  item: Dict[str, Any]) -> Dict[str, Any]:
+        message = item.get("message", "")
+        if not message:
+            return {"index": index, "session_id": session_id, "error": "Message is required"}
+        
+        for attempt in range(settings.CHAT_BATCH_BUSY_RETRIES + 1):
+            try:
+                start_trace()
+                async with self.scheduler.slot(session_id):
+                    return {"index": index, **await self._process_message(message, session_id)}
+            except InferenceBusyError:
+                # Bulk work yields to interactive traffic instead of failing outright
+                if attempt < settings.CHAT_BATCH_BUSY_RETRIES:
+                    await asyncio.sleep(0.1 * 2 ** attempt)
+            except Exception as e:
+                logger.error(f"Error processing batch item {index}: {str(e)}")
+                return {"index": index, "session_id": session_id, "error": str(e)}
+        return {"index": index, "session_id": session_id, "error": "Server is busy"}
+
+    async def _analyze_message(self, message: str) -> Tuple[Dict, Dict, Dict, List[str]]:
+        timeouts = settings.ANALYZER_TIMEOUTS_MS
+        # One parse of the message, shared by every analyzer that needs a Doc
+        analysis = AnalysisContext(message)
+        analyzers = [
+            ("intent", partial(self.intent_service.detect_intent, message),
+             self._fallback_intent),
+            ("entities", partial(self.entity_service.extract_entities, message, analysis,
+                                 self.intent_service.keyword_intent(message)),
+             self._fallback_entities),
+            ("sentiment", partial(self.sentiment_service.analyze_sentiment, message),
+             partial(self.sentiment_service._rule_based_sentiment, message)),
+        ]
+        
+        results = await asyncio.gather(*[
+            self._run_analyzer(name, message, analyzer, timeouts.get(name), fallback)
+            for name, analyzer, fallback in analyzers
+        ])
+        
+        (intent, _), (entities, _), (sentiment, _) = results
+        timed_out = [name for (name, _, _), (_, missed) in zip(analyzers, results) if missed]
+        return intent, entities, sentiment, timed_out
+
+    async def _run_analyzer(self, name: str, message: str,
+                            analyzer: Callable[[], Awaitable[Dict]],
+                            timeout_ms: float,
+                            fallback: Callable[[], Awaitable[Dict]]) -> Tuple[Dict, bool]:
+        with current_trace().stage(name) as labels:
+            cache_key = self.response_cache.analysis_key(name, message)
+            cached = await self.response_cache.get(cache_key)
+            if cached is not None:
+                labels["method"] = "cache"
+                return cached, False
             
-        except Exception as e:
-            logger.error(f"Error processing message: {str(e)}")
-            return await self._get_fallback_response(message)
+            try:
+                if timeout_ms is None:
+                    result = await analyzer()
+                else:
+                    result = await asyncio.wait_for(analyzer(), timeout=timeout_ms / 1000.0)
+            except asyncio.TimeoutError:
+                logger.warning(f"Analyzer '{name}' missed its {timeout_ms:.0f}ms deadline")
+                labels["method"] = "timeout"
+                return await fallback(), True
+            
+            labels["method"] = result.get("method", "")
+            # Degraded results (and rule-based ones during warm-up) are not
+            # cached so the model gets another chance next time
+            if result.get("method") != "fallback" and not model_registry.is_warming_up():
+                await self.response_cache.set(cache_key, result, ttl=settings.ANALYSIS_CACHE_TTL)
+            return result, False
+
+    async def _fallback_intent(self) -> Dict[str, Any]:
+        return {"intent": "general", "confidence": 0.5, "method": "fallback"}
 
-    async def _generate_response(self, message: str, intent: Dict, entities: Dict, 
-                               sentiment: Dict, context: Dict, session_id: str) -> str:
+    async def _fallback_entities(self) -> Dict[str, Any]:
+        return {}
+
+    async def _generate_response(self, message: str, intent: Dict, entities: Dict,
+                               sentiment: Dict, context: Dict, session_id: str,
+                               deadline: Optional[float] = None) -> Tuple[str, str]:
+        # Returns the reply and the backend that produced it
+        # (faq/rules/gpt/dialogpt/template/fallback)
         
         # Rule-based responses for common intents
         rule_based_response = await self._get_rule_based_response(intent, entities)
         if rule_based_response:
-            return rule_based_response
+            self.router.chose("rules", "intent_rule")
+            return rule_based_response, "rules"
+        
+        # Curated FAQ answers, the last step before any model
+        faq_match = self.faq_service.find_answer(message)
+        if faq_match:
+            self.router.chose("faq", "retrieval")
+            return faq_match["answer"], "faq"
+        
+        failed = None
+        for backend, reason in self.router.plan(deadline):
+            if backend == "template":
+                return await self._get_template_response(intent, entities, failed or reason)
+            if self._expired(deadline):
+                # An earlier tier used up the budget
+                failed = failed or "deadline"
+                continue
+            start = time.monotonic()
+            try:
+                if backend == "gpt":
+                    call = self._get_gpt_response(message, context, sentiment, deadline)
+                else:
+                    call = self._get_local_response(message, context, session_id, deadline)
+                response = await self._within_deadline(call, deadline)
+            except InferenceBusyError as e:
+                # A full queue says nothing about the backend's health
+                logger.warning(f"{backend} is busy: {str(e)}")
+                failed = failed or "busy"
+                continue
+            except Exception as e:
+                self.router.record(backend, time.monotonic() - start, ok=False)
+                timed_out = isinstance(e, asyncio.TimeoutError)
+                logger.warning(f"{backend} response failed: "
+                               f"{'deadline exceeded' if timed_out else str(e)}")
+                failed = failed or ("deadline" if timed_out else "error")
+                continue
+            self.router.record(backend, time.monotonic() - start, ok=True)
+            self.router.chose(backend, failed or reason)
+            return response, backend
+
+    async def _stream_response(self, message: str, intent: Dict, entities: Dict,
+                               sentiment: Dict, context: Dict, session_id: str,
+                               deadline: Optional[float] = None,
+                               chosen: Optional[Dict[str, str]] = None) -> AsyncIterator[str]:
+        # ``chosen["name"]`` is set to the backend that produced the reply
+        chosen = chosen if chosen is not None else {}
+        rule_based_response = await self._get_rule_based_response(intent, entities)
+        if rule_based_response:
+            self.router.chose("rules", "intent_rule")
+            chosen["name"] = "rules"
+            yield rule_based_response
+            return
+        
+        faq_match = self.faq_service.find_answer(message)
+        if faq_match:
+            self.router.chose("faq", "retrieval")
+            chosen["name"] = "faq"
+            yield faq_match["answer"]
+            return
         
-        # Try GPT-based response
-        if self.use_gpt:
+        failed = None
+        for backend, reason in self.router.plan(deadline):
+            if backend == "template":
+                response, chosen["name"] = await self._get_template_response(
+                    intent, entities, failed or reason
+                )
+                yield response
+                return
+            if self._expired(deadline):
+                failed = failed or "deadline"
+                continue
+            start = time.monotonic()
+            emitted = False
+            if backend == "gpt":
+                prompt = self._build_gpt_prompt(message, context, sentiment)
+                stream = self.llm_client.stream_chat(self._gpt_messages(prompt),
+                                                     timeout=self.router.remaining(deadline))
+            else:
+                stream = self._stream_local_response(message, context, session_id, deadline)
             try:
-                return await self._get_gpt_response(message, context, sentiment)
+                async for token in stream:
+                    if not emitted:
+                        self.router.chose(backend, failed or reason)
+                        chosen["name"] = backend
+                        emitted = True
+                    yield token
+                    if self._expired(deadline):
+                        # Out of time: end the reply with what we have
+                        break
+            except InferenceBusyError as e:
+                if emitted:
+                    raise
+                logger.warning(f"{backend} is busy: {str(e)}")
+                failed = failed or "busy"
+                continue
             except Exception as e:
-                logger.warning(f"GPT response failed: {str(e)}")
+                self.router.record(backend, time.monotonic() - start, ok=False)
+                # Once tokens have been sent we cannot switch backends mid-reply
+                if emitted:
+                    raise
+                logger.warning(f"{backend} streaming failed: {str(e)}")
+                failed = failed or "error"
+                continue
+            finally:
+                await stream.aclose()
+            self.router.record(backend, time.monotonic() - start, ok=True)
+            if not emitted:
+                self.router.chose(backend, failed or reason)
+                chosen["name"] = backend
+            return
+
+    async def _stream_local_response(self, message: str, context: Dict, session_id: str,
+                                     deadline: Optional[float]) -> AsyncIterator[str]:
+        if inference_executor.mode == "process":
+            # Token callbacks cannot cross a process boundary; send the reply whole
+            yield await self._get_local_response(message, context, session_id, deadline)
+            return
+        
+        prompt_ids, message_ids = await self._build_local_input(message, context, session_id)
+        async for token in self._stream_from_thread(
+            partial(inference_executor.run, "generation_stream"), prompt_ids, deadline
+        ):
+            yield token
+        # The streamed reply is tokenized when the next turn syncs the window
+        self.windows.get(session_id).append(f"User: {message}", message_ids)
+
+    async def _within_deadline(self, awaitable: Awaitable, deadline: Optional[float]) -> Any:
+        remaining = self.router.remaining(deadline)
+        if remaining is None:
+            return await awaitable
+        return await asyncio.wait_for(awaitable, timeout=max(remaining, 0.0))
+
+    @staticmethod
+    def _expired(deadline: Optional[float]) -> bool:
+        return deadline is not None and time.time() >= deadline
+
+    async def _stream_from_thread(self, run: Callable, *args) -> AsyncIterator[str]:
+        # `run(*args, on_token, should_stop)` produces tokens on a worker thread;
+        # coroutine functions (e.g. the inference executor) are awaited directly
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+        done = object()
+        
+        def on_token(token: str):
+            loop.call_soon_threadsafe(queue.put_nowait, token)
         
-        # Fallback to local model
-        return await self._get_local_response(message, context)
+        if asyncio.iscoroutinefunction(run):
+            task = asyncio.ensure_future(run(*args, on_token, stop.is_set))
+        else:
+            task = asyncio.ensure_future(asyncio.to_thread(run, *args, on_token, stop.is_set))
+        task.add_done_callback(lambda _: queue.put_nowait(done))
+        
+        try:
+            while True:
+                token = await queue.get()
+                if token is done:
+                    break
+                if token:
+                    yield token
+            await task
+        finally:
+            # Stop generation early if the client went away
+            stop.set()
 
-    async def _get_rule_based_response(self, intent: Dict, entities: Dict) -> str:
+    async def _get_rule_based_response(self, intent: Dict, entities: Dict,
+                                       min_confidence: Optional[float] = None) -> str:
         intent_name = intent.get('intent', '')
         confidence = intent.get('confidence', 0)
         
-        if confidence < 0.6:
+        # The zero-shot classifier always names some intent, so its guesses
+        # never trigger a canned reply
+        if intent.get('method') not in settings.GENERATION_RULES_METHODS:
+            return ""
+        if min_confidence is None:
+            min_confidence = settings.GENERATION_RULES_MIN_CONFIDENCE
+        if confidence < min_confidence:
             return ""
             
         responses = {
@@ -120,36 +509,136 @@ class ChatService:
         
         return responses.get(intent_name, "")
 
-    async def _get_gpt_response(self, message: str, context: Dict, sentiment: Dict) -> str:
+    async def _get_template_response(self, intent: Dict, entities: Dict,
+                                     reason: str) -> Tuple[str, str]:
+        # Last tier: the intent's canned reply even at low confidence, else a
+        # holding message; never waits on a model
+        response = await self._get_rule_based_response(intent, entities, min_confidence=0.0)
+        if response:
+            backend = "template"
+        elif model_registry.is_warming_up() or not model_registry.is_available("generation"):
+            response, backend = self._get_unavailable_response(), "fallback"
+        else:
+            response, backend = ("Sorry, I can't give you a full answer right now. "
+                                 "Could you try again in a moment?"), "template"
+        self.router.chose(backend, reason)
+        return response, backend
+
+    def _get_unavailable_response(self) -> str:
+        # Used while the local model is still warming up (or failed to load)
+        return ("I'm still getting ready, so for now I can only help with simple requests "
+                "like greetings, the time or the weather. Please try again in a moment.")
+
+    async def _get_gpt_response(self, message: str, context: Dict, sentiment: Dict,
+                                deadline: Optional[float] = None) -> str:
         prompt = self._build_gpt_prompt(message, context, sentiment)
         
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a helpful AI assistant."},
-                {"role": "user", "content": prompt}
-            ],
+        # Fails fast with CircuitOpenError while the provider is unhealthy
+        return await self.llm_client.chat(
+            self._gpt_messages(prompt),
             max_tokens=150,
-            temperature=0.7
+            temperature=0.7,
+            timeout=self.router.remaining(deadline)
         )
-        
-        return response.choices[0].message.content.strip()
 
-    async def _get_local_response(self, message: str, context: Dict) -> str:
+    def _gpt_messages(self, prompt: str) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": "You are a helpful AI assistant."},
+            {"role": "user", "content": prompt}
+        ]
+
+    async def _get_local_response(self, message: str, context: Dict, session_id: str,
+                                  deadline: Optional[float] = None) -> str:
         # Use DialoGPT for local response generation
-        conversation_history = context.get('history', [])
-        history_text = " ".join(conversation_history[-5:])  # Last 5 messages
+        prompt_ids, message_ids = await self._build_local_input(message, context, session_id)
+        
+        response, response_ids = await self.generation_batcher.submit((prompt_ids, deadline))
+        
+        # Both turns enter the window with ids we already have, nothing is re-encoded
+        window = self.windows.get(session_id)
+        window.append(f"User: {message}", message_ids)
+        window.append(f"Bot: {response}", response_ids)
+        return response
+
+    def _generate_batch(self, items: List[Tuple[List[int], Optional[float]]]
+                        ) -> List[Tuple[str, List[int]]]:
+        response_generator = model_registry.get("generation")
+        if response_generator is None:
+            raise RuntimeError("Response generator is not available")
+        tokenizer = response_generator.tokenizer
+        eos_token_id = tokenizer.eos_token_id
+        prompts = [prompt for prompt, _ in items]
+        deadlines = [deadline for _, deadline in items]
+        
+        # One generate call serves the whole batch, so it stops at the latest
+        # deadline; callers that expire sooner have already been answered
+        generate_kwargs = {}
+        if all(deadline is not None for deadline in deadlines):
+            generate_kwargs["max_time"] = max(max(deadlines) - time.time(), 0.0)
+        
+        # Left padding (set by the loader) lines every prompt up against the new tokens
+        inputs = tokenizer.pad({"input_ids": prompts}, return_tensors="pt")
+        output_ids = response_generator.model.generate(
+            **inputs,
+            max_new_tokens=settings.GENERATION_MAX_NEW_TOKENS,
+            pad_token_id=eos_token_id,
+            **generate_kwargs
+        )
+        
+        results = []
+        for generated in output_ids[:, inputs["input_ids"].shape[1]:].tolist():
+            if eos_token_id in generated:
+                generated = generated[:generated.index(eos_token_id)]
+            text = tokenizer.decode(generated, skip_special_tokens=True).strip()
+            results.append((text, generated + [eos_token_id]))
+        return results
+
+    def _generate_stream(self, prompt_ids: List[int], deadline: Optional[float],
+                         on_token: Callable[[str], None], should_stop: Callable[[], bool]):
+        from transformers import StoppingCriteria, StoppingCriteriaList, TextStreamer
+        
+        response_generator = model_registry.get("generation")
+        if response_generator is None:
+            raise RuntimeError("Response generator is not available")
+        tokenizer = response_generator.tokenizer
+        
+        class CallbackStreamer(TextStreamer):
+            def on_finalized_text(self, text: str, stream_end: bool = False):
+                on_token(text)
         
-        input_text = f"{history_text} {message}"
+        class StopWhenRequested(StoppingCriteria):
+            def __call__(self, input_ids, scores, **kwargs) -> bool:
+                return should_stop() or (deadline is not None and time.time() >= deadline)
         
-        response = self.response_generator(
-            input_text,
-            max_length=100,
-            num_return_sequences=1,
-            pad_token_id=self.response_generator.tokenizer.eos_token_id
+        inputs = tokenizer.pad({"input_ids": [prompt_ids]}, return_tensors="pt")
+        response_generator.model.generate(
+            **inputs,
+            max_new_tokens=settings.GENERATION_MAX_NEW_TOKENS,
+            pad_token_id=tokenizer.eos_token_id,
+            streamer=CallbackStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True),
+            stopping_criteria=StoppingCriteriaList([StopWhenRequested()])
         )
+
+    async def _build_local_input(self, message: str, context: Dict,
+                                 session_id: str) -> Tuple[List[int], List[int]]:
+        # Returns the prompt ids and the new message's ids; only the new
+        # message (and turns the window has not seen yet) get tokenized
+        if model_registry.is_loaded("generation"):
+            response_generator = model_registry.get("generation")
+        else:
+            response_generator = await asyncio.to_thread(model_registry.get, "generation")
+        if response_generator is None:
+            raise RuntimeError("Response generator is not available")
+        tokenizer = response_generator.tokenizer
+        
+        def encode(text: str) -> List[int]:
+            # DialoGPT separates turns with EOS
+            return tokenizer.encode(text) + [tokenizer.eos_token_id]
         
-        return response[0]['generated_text'].replace(input_text, '').strip()
+        window = self.windows.get(session_id)
+        window.sync(context.get('history', []), encode)
+        message_ids = encode(message)
+        return window.build(message_ids, settings.GENERATION_MAX_INPUT_TOKENS), message_ids
 
     def _build_gpt_prompt(self, message: str, context: Dict, sentiment: Dict) -> str:
         prompt = f"""
@@ -162,40 +651,26 @@ class ChatService:
         return prompt
 
     async def _get_context(self, session_id: str) -> Dict:
-        return self.context_memory.get(session_id, {
-            'history': [],
-            'last_intent': '',
-            'entities': {},
-            'sentiment_trend': 'neutral'
-        })
+        return await self.session_store.get(session_id)
 
     async def _update_context(self, session_id: str, message: str, response: str, 
-                            intent: Dict, entities: Dict):
-        if session_id not in self.context_memory:
-            self.context_memory[session_id] = {
-                'history': [],
-                'last_intent': '',
-                'entities': {},
-                'sentiment_trend': 'neutral'
-            }
-        
-        context = self.context_memory[session_id]
-        context['history'].append(f"User: {message}")
-        context['history'].append(f"Bot: {response}")
-        context['last_intent'] = intent.get('intent', '')
-        context['entities'].update(entities)
-        
-        # Keep only last 10 exchanges
-        if len(context['history']) > 20:
-            context['history'] = context['history'][-20:]
+                            intent: Dict, entities: Dict, sentiment: Dict, context: Dict):
+        # The store keeps only the last SESSION_MAX_HISTORY turns and caps entities
+        fields = {'last_intent': intent.get('intent', '')}
+        fields.update(self.sentiment_service.track(sentiment, context))
+        await self.session_store.append_turn(session_id, message, response, fields, entities)
 
     async def _store_conversation(self, session_id: str, user_message: str, 
                                 bot_response: str, intent: Dict, entities: Dict,
                                 sentiment: Dict, response_time: float):
-        # This would typically save to a database
-        # For now, we'll just log it
-        logger.info(f"Conversation stored - Session: {session_id}, "
-                   f"Intent: {intent.get('intent')}, Response Time: {response_time:.2f}s")
+        # Queued for the background writer; never blocks on the database
+        if not conversation_writer.enqueue(conversation_row(
+            session_id, user_message, bot_response, intent, entities,
+            sentiment, response_time
+        )):
+            logger.warning(f"Conversation persistence queue full, dropped row for {session_id}")
+        logger.debug(f"Conversation stored - Session: {session_id}, "
+                    f"Intent: {intent.get('intent')}, Response Time: {response_time:.2f}s")
 
     async def _get_fallback_response(self, message: str) -> Dict[str, Any]:
         return {
@@ -204,5 +679,7 @@ class ChatService:
             "entities": {},
             "sentiment": {"label": "neutral", "score": 0.0},
             "response_time": 0.0,
-            "session_id": "error"
+            "session_id": "error",
+            "timed_out": [],
+            "cached": False
         }
\ No newline at end of file
@@ -1,18 +1,30 @@
 import logging
-import spacy
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 import re
+from functools import partial
+
+from config.settings import settings
+from services.analysis_context import AnalysisContext
+from utils.batching import BatchScheduler
+from utils.inference import inference_executor
+from utils.model_registry import model_registry
 
 logger = logging.getLogger(__name__)
 
+_PATTERN_GATE = re.compile(r"[@\d]|https?://")
+
+# NER only runs on messages with something that can start an entity: an
+# uppercase letter, a digit, or any non-ASCII character
+_NER_GATE = re.compile(r"[A-Z\d]|[^\x00-\x7f]")
+
+
 class EntityService:
     def __init__(self):
-        try:
-            self.nlp = spacy.load("en_core_web_sm")
-        except OSError:
-            logger.warning("spaCy model not found")
-            self.nlp = None
-        
+        # spaCy is shared through the model registry and loaded on first use;
+        # concurrent messages are parsed together with nlp.pipe
+        inference_executor.register("ner", self._run_ner)
+        self.batcher = BatchScheduler("ner", partial(inference_executor.run, "ner"))
+
         # Custom entity patterns
         self.patterns = {
             "email": r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
@@ -20,25 +32,58 @@ class EntityService:
             "url": r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+',
             "date": r'\b(\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|\d{4}[/-]\d{1,2}[/-]\d{1,2})\b'
         }
+        self._compiled = {entity_type: re.compile(pattern)
+                          for entity_type, pattern in self.patterns.items()}
+        self.stats = {"messages": 0, "ner_runs": 0, "ner_skipped": 0}
 
-    async def extract_entities(self, text: str) -> Dict[str, Any]:
+    def match_patterns(self, text: str) -> Dict[str, Any]:
+        # Every pattern needs an "@", a digit or a scheme, so most chat
+        # messages are ruled out by one scan of the prefilter
+        if not _PATTERN_GATE.search(text):
+            return {}
         entities = {}
-        
-        # Pattern-based extraction
-        for entity_type, pattern in self.patterns.items():
-            matches = re.findall(pattern, text)
+        for entity_type, compiled in self._compiled.items():
+            matches = compiled.findall(text)
             if matches:
                 entities[entity_type] = matches[0] if len(matches) == 1 else matches
-        
-        # spaCy NER if available
-        if self.nlp:
+        return entities
+
+    def needs_ner(self, text: str, intent: Optional[str] = None) -> bool:
+        if not settings.NER_GATE_ENABLED:
+            return True
+        if intent in settings.NER_SKIP_INTENTS:
+            return False
+        return _NER_GATE.search(text) is not None
+
+    async def extract_entities(self, text: str,
+                               analysis: Optional[AnalysisContext] = None,
+                               intent: Optional[str] = None) -> Dict[str, Any]:
+        self.stats["messages"] += 1
+        # Pattern-based extraction
+        entities = self.match_patterns(text)
+
+        # spaCy NER if available and the message can contain a named entity
+        if not self.needs_ner(text, intent):
+            self.stats["ner_skipped"] += 1
+        elif model_registry.is_available("spacy"):
             try:
-                doc = self.nlp(text)
-                for ent in doc.ents:
-                    if ent.label_ not in entities:
-                        entities[ent.label_] = []
-                    entities[ent.label_].append(ent.text)
+                self.stats["ner_runs"] += 1
+                analysis = analysis or AnalysisContext(text)
+                for label, ent_text in await self.batcher.submit(analysis):
+                    if label not in entities:
+                        entities[label] = []
+                    entities[label].append(ent_text)
             except Exception as e:
                 logger.error(f"spaCy NER failed: {str(e)}")
-        
-        return entities
\ No newline at end of file
+
+        return entities
+
+    def _run_ner(self, analyses: List[AnalysisContext]) -> List[List[Tuple[str, str]]]:
+        # Plain tuples so results can cross a process boundary
+        docs = AnalysisContext.parse_many(analyses)
+        if any(doc is None for doc in docs):
+            raise RuntimeError("spaCy model is not available")
+        return [[(ent.label_, ent.text) for ent in doc.ents] for doc in docs]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats)
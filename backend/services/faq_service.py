@@ -0,0 +1,44 @@
+import logging
+import time
+from typing import Dict, Any, Optional
+
+from config.settings import settings
+from utils.faq_index import FAQIndex
+from utils.metrics import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+class FAQService:
+    def __init__(self):
+        # Built from the catalog on first start, memory-mapped afterwards
+        self.index = FAQIndex(settings.FAQ_INDEX_PATH, catalog_path=settings.FAQ_CATALOG_PATH)
+        self.lookup_latency = LatencyHistogram()
+        self.stats = {"lookups": 0, "answered": 0, "errors": 0}
+
+    def find_answer(self, text: str) -> Optional[Dict[str, Any]]:
+        # Synchronous on purpose: a lookup is cheaper than an executor hop
+        if not settings.FAQ_ENABLED or not self.index.is_loaded:
+            return None
+        self.stats["lookups"] += 1
+        start = time.perf_counter()
+        try:
+            match = self.index.search(text)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"FAQ lookup failed: {str(e)}")
+            return None
+        finally:
+            self.lookup_latency.record(time.perf_counter() - start)
+
+        if match is None or match["score"] < settings.FAQ_MIN_SCORE:
+            return None
+        self.stats["answered"] += 1
+        return match
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            **self.index.get_stats(),
+            "min_score": settings.FAQ_MIN_SCORE,
+            "lookup_latency": self.lookup_latency.summary(),
+        }
@@ -1,21 +1,29 @@
 import logging
-from typing import Dict, Any
-from transformers import pipeline, AutoTokenizer, AutoModelForSequenceClassification
-import numpy as np
+from typing import Dict, Any, List, Optional
+from functools import partial
+
+from config.settings import settings
+from utils.batching import BatchScheduler
+from utils.inference import inference_executor
+from utils.keyword_matcher import KeywordMatcher
+from utils.model_registry import model_registry
+from utils.semantic_index import SemanticIntentIndex
 
 logger = logging.getLogger(__name__)
 
 class IntentService:
     def __init__(self):
-        try:
-            self.intent_classifier = pipeline(
-                "text-classification",
-                model="joeddav/xlm-roberta-large-xnli",
-                tokenizer="joeddav/xlm-roberta-large-xnli"
-            )
-        except Exception as e:
-            logger.warning(f"Could not load intent classifier: {str(e)}")
-            self.intent_classifier = None
+        # The classifier is loaded lazily by the model registry on first use
+        inference_executor.register("intent", self._classify_batch)
+        self.batcher = BatchScheduler("intent", partial(inference_executor.run, "intent"))
+        
+        # Semantic tier: nearest example utterances, much cheaper than the classifier
+        self.semantic_index = SemanticIntentIndex(settings.INTENT_INDEX_PATH,
+                                                  settings.INTENT_EMBEDDING_MODEL_NAME)
+        inference_executor.register("intent_semantic", self._semantic_batch)
+        self.semantic_batcher = BatchScheduler(
+            "intent_semantic", partial(inference_executor.run, "intent_semantic")
+        )
         
         # Define common intents and patterns
         self.intent_patterns = {
@@ -26,26 +34,50 @@ class IntentService:
             "time": ["time", "current time", "what time"],
             "help": ["help", "support", "assistance", "can you help"]
         }
+        
+        # Compiled once; intents listed first win ties between equal scores
+        self.matcher = KeywordMatcher()
+        self.matcher.add_patterns(self.intent_patterns)
+        if settings.INTENT_PATTERNS_PATH:
+            self.matcher.load_file(settings.INTENT_PATTERNS_PATH)
+        self.matcher.compile()
+
+    def keyword_intent(self, text: str) -> Optional[str]:
+        # Cheap synchronous tier, also used to gate other analyzers
+        match = self.matcher.best(text)
+        return match[0] if match else None
 
     async def detect_intent(self, text: str) -> Dict[str, Any]:
-        text_lower = text.lower()
-        
         # Rule-based matching first
-        for intent, patterns in self.intent_patterns.items():
-            if any(pattern in text_lower for pattern in patterns):
-                return {
-                    "intent": intent,
-                    "confidence": 0.85,
-                    "method": "rule_based"
-                }
+        keyword_intent = self.keyword_intent(text)
+        if keyword_intent:
+            return {
+                "intent": keyword_intent,
+                "confidence": 0.85,
+                "method": "rule_based"
+            }
+        
+        # Semantic lookup; only confident matches skip the classifier
+        self.semantic_index.reload_if_changed()
+        if self.semantic_index.is_loaded and model_registry.is_available("embedding"):
+            try:
+                result = await self.semantic_batcher.submit(text)
+                if result and result['score'] >= settings.INTENT_SEMANTIC_THRESHOLD:
+                    return {
+                        "intent": result['label'],
+                        "confidence": result['score'],
+                        "method": "semantic"
+                    }
+            except Exception as e:
+                logger.error(f"Semantic intent lookup failed: {str(e)}")
         
         # ML-based classification if available
-        if self.intent_classifier:
+        if model_registry.is_available("intent"):
             try:
-                result = self.intent_classifier(text)
+                result = await self.batcher.submit(text)
                 return {
-                    "intent": result[0]['label'],
-                    "confidence": result[0]['score'],
+                    "intent": result['label'],
+                    "confidence": result['score'],
                     "method": "ml_based"
                 }
             except Exception as e:
@@ -56,4 +88,29 @@ class IntentService:
             "intent": "general",
             "confidence": 0.5,
             "method": "fallback"
-        }
\ No newline at end of file
+        }
+
+    def _candidate_labels(self) -> List[str]:
+        # Zero-shot picks the best candidate even for off-topic messages, so an
+        # explicit catch-all label gives them somewhere to go
+        labels = self.matcher.labels
+        labels = labels + [label for label in self.semantic_index.intents if label not in labels]
+        if settings.INTENT_OUT_OF_SCOPE_LABEL not in labels:
+            labels.append(settings.INTENT_OUT_OF_SCOPE_LABEL)
+        return labels
+
+    def _classify_batch(self, texts: List[str]) -> List[Dict[str, Any]]:
+        intent_classifier = model_registry.get("intent")
+        if intent_classifier is None:
+            raise RuntimeError("Intent classifier is not available")
+        results = intent_classifier(texts, candidate_labels=self._candidate_labels(),
+                                    batch_size=len(texts))
+        if isinstance(results, dict):
+            results = [results]
+        return [{"label": result['labels'][0], "score": result['scores'][0]} for result in results]
+
+    def _semantic_batch(self, texts: List[str]) -> List[Optional[Dict[str, Any]]]:
+        encoder = model_registry.get("embedding")
+        if encoder is None:
+            raise RuntimeError("Sentence encoder is not available")
+        return self.semantic_index.search(encoder.encode(texts))
\ No newline at end of file
@@ -1,34 +1,43 @@
 import logging
-from typing import Dict, Any
-from transformers import pipeline
+from typing import Dict, Any, List
 import redis.asyncio as redis
 from datetime import datetime, timedelta
 import json
+from functools import partial
+
+from config.settings import settings
+from utils.batching import BatchScheduler
+from utils.inference import inference_executor
+from utils.keyword_matcher import KeywordMatcher
+from utils.model_registry import model_registry
+from utils.sentiment_rollup import SentimentAggregator
 
 logger = logging.getLogger(__name__)
 
 class SentimentService:
     def __init__(self):
-        try:
-            self.sentiment_analyzer = pipeline(
-                "sentiment-analysis",
-                model="cardiffnlp/twitter-roberta-base-sentiment-latest"
-            )
-        except Exception as e:
-            logger.warning(f"Could not load sentiment analyzer: {str(e)}")
-            self.sentiment_analyzer = None
+        # The analyzer is loaded lazily by the model registry on first use
+        inference_executor.register("sentiment", self._analyze_batch)
+        self.batcher = BatchScheduler("sentiment", partial(inference_executor.run, "sentiment"))
+        self.aggregator = SentimentAggregator()
         
         # Simple rule-based sentiment as fallback
         self.sentiment_words = {
             "positive": ["good", "great", "excellent", "amazing", "wonderful", "happy"],
             "negative": ["bad", "terrible", "awful", "horrible", "sad", "angry"]
         }
+        
+        self.matcher = KeywordMatcher()
+        self.matcher.add_patterns(self.sentiment_words)
+        if settings.SENTIMENT_WORDS_PATH:
+            self.matcher.load_file(settings.SENTIMENT_WORDS_PATH)
+        self.matcher.compile()
 
     async def analyze_sentiment(self, text: str) -> Dict[str, Any]:
         # ML-based sentiment analysis
-        if self.sentiment_analyzer:
+        if model_registry.is_available("sentiment"):
             try:
-                result = self.sentiment_analyzer(text)[0]
+                result = await self.batcher.submit(text)
                 return {
                     "label": result['label'],
                     "score": result['score'],
@@ -40,10 +49,16 @@ class SentimentService:
         # Rule-based fallback
         return await self._rule_based_sentiment(text)
 
+    def _analyze_batch(self, texts: List[str]) -> List[Dict[str, Any]]:
+        sentiment_analyzer = model_registry.get("sentiment")
+        if sentiment_analyzer is None:
+            raise RuntimeError("Sentiment analyzer is not available")
+        return sentiment_analyzer(texts, batch_size=len(texts))
+
     async def _rule_based_sentiment(self, text: str) -> Dict[str, Any]:
-        text_lower = text.lower()
-        positive_count = sum(1 for word in self.sentiment_words["positive"] if word in text_lower)
-        negative_count = sum(1 for word in self.sentiment_words["negative"] if word in text_lower)
+        scores = self.matcher.scores(text)
+        positive_count = scores.get("positive", 0.0)
+        negative_count = scores.get("negative", 0.0)
         
         if positive_count > negative_count:
             return {"label": "POSITIVE", "score": 0.7, "method": "rule_based"}
@@ -52,13 +67,11 @@ class SentimentService:
         else:
             return {"label": "NEUTRAL", "score": 0.5, "method": "rule_based"}
 
+    def track(self, sentiment: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
+        # Feeds the global rollups; returns the session's updated sentiment fields
+        score = self.aggregator.record(sentiment)
+        return self.aggregator.update_session(context, score)
+
     async def get_sentiment_trends(self) -> Dict[str, Any]:
-        # This would typically analyze historical sentiment data
-        # For now, return mock data
-        return {
-            "overall_sentiment": "positive",
-            "positive_percentage": 65.2,
-            "negative_percentage": 15.8,
-            "neutral_percentage": 19.0,
-            "trend": "improving"
-        }
\ No newline at end of file
+        # Precomputed rollups: a fixed number of buckets, independent of message volume
+        return await self.aggregator.get_trends()
@@ -1,48 +1,224 @@
-from flask import Flask, request, jsonify
-import requests
+import asyncio
 import logging
+import time
+import zlib
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from config.settings import settings
+from utils.cache import CacheManager, cache_manager
+from utils.inference import InferenceBusyError
+from utils.rate_limit import TokenBucket
+from utils.response_cache import LocalTTLCache
 
 logger = logging.getLogger(__name__)
 
+UNSUPPORTED_MESSAGE_REPLY = "Sorry, I can only read text messages for now."
+ERROR_REPLY = "Sorry, I'm having trouble processing your message."
+
+
+class WhatsAppBusyError(Exception):
+    """Raised when webhook messages could not be queued; the delivery should be retried."""
+
+
 class WhatsAppService:
-    def __init__(self, verify_token, access_token):
-        self.verify_token = verify_token
-        self.access_token = access_token
-        self.api_url = f"https://graph.facebook.com/v17.0/"
-
-    def verify_webhook(self, mode, token, challenge):
-        if mode and token:
-            if mode == "subscribe" and token == self.verify_token:
-                return challenge
-        return None
+    """WhatsApp Cloud API channel running inside the FastAPI process.
 
-    def process_message(self, message):
-        # Extract message text
-        message_text = message.get('text', {}).get('body', '')
-        
-        # Call chatbot API
-        response = requests.post(
-            "http://localhost:8000/api/chat",
-            json={"message": message_text, "session_id": "whatsapp_user"}
+    Webhook deliveries are acknowledged as soon as they are queued (a
+    delivery that does not fit the queues is refused, so it is retried). Worker
+    tasks then run each message through ``ChatService`` in-process and
+    send the reply over a pooled keep-alive client, under a send rate
+    limit. Messages are sharded across workers by phone number, so one
+    user's messages are answered in order. Each phone number is its own
+    chat session.
+    """
+
+    def __init__(self, chat_service, analytics_service=None,
+                 client: Optional[httpx.AsyncClient] = None,
+                 cache: Optional[CacheManager] = cache_manager):
+        self.chat_service = chat_service
+        self.analytics_service = analytics_service
+        self.verify_token = settings.WHATSAPP_VERIFY_TOKEN
+        self.api_url = f"{settings.WHATSAPP_API_URL.rstrip('/')}/{settings.WHATSAPP_PHONE_NUMBER_ID}"
+        self.client = client or httpx.AsyncClient(
+            headers={"Authorization": f"Bearer {settings.WHATSAPP_ACCESS_TOKEN}"},
+            timeout=httpx.Timeout(settings.WHATSAPP_TIMEOUT_SECONDS),
+            limits=httpx.Limits(max_connections=settings.WHATSAPP_MAX_CONNECTIONS,
+                                max_keepalive_connections=settings.WHATSAPP_MAX_CONNECTIONS)
         )
-        
-        if response.status_code == 200:
-            return response.json()["response"]
+        self.send_limiter = TokenBucket(settings.WHATSAPP_SEND_RATE, settings.WHATSAPP_SEND_BURST)
+        # Webhooks are retried until acknowledged, possibly on another worker process
+        self.seen = LocalTTLCache(settings.WHATSAPP_DEDUPE_MAX_ENTRIES, settings.WHATSAPP_DEDUPE_TTL)
+        self.remote = cache if settings.WHATSAPP_DEDUPE_USE_REDIS else None
+        self._remote_retry_at = 0.0
+        self._queues: List[asyncio.Queue] = []
+        self._workers: List[asyncio.Task] = []
+        self.stats = {
+            "received": 0,
+            "duplicates": 0,
+            "dropped": 0,
+            "processed": 0,
+            "busy_retries": 0,
+            "sent": 0,
+            "send_failures": 0,
+        }
+
+    async def start(self):
+        queue_size = max(1, settings.WHATSAPP_QUEUE_SIZE // settings.WHATSAPP_WORKERS)
+        self._queues = [asyncio.Queue(maxsize=queue_size) for _ in range(settings.WHATSAPP_WORKERS)]
+        self._workers = [asyncio.create_task(self._run(queue)) for queue in self._queues]
+
+    async def stop(self):
+        # Sentinels queue behind pending messages, so those are answered first
+        for queue in self._queues:
+            await queue.put(None)
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        await self.client.aclose()
+
+    def verify_webhook(self, mode: Optional[str], token: Optional[str],
+                       challenge: Optional[str]) -> Optional[str]:
+        if mode == "subscribe" and token and token == self.verify_token:
+            return challenge
+        return None
+
+    async def handle_webhook(self, payload: Dict[str, Any]) -> int:
+        # Returns how many messages were queued; never waits on the chat pipeline.
+        # Raises WhatsAppBusyError if any message was dropped, after releasing
+        # its dedupe claim so the redelivery is not mistaken for a duplicate
+        queued = dropped = 0
+        for message in self._extract_messages(payload):
+            self.stats["received"] += 1
+            if await self._is_duplicate(message["id"]):
+                self.stats["duplicates"] += 1
+                continue
+            queue = self._queues[zlib.crc32(message["from"].encode("utf-8")) % len(self._queues)]
+            try:
+                queue.put_nowait(message)
+                queued += 1
+            except asyncio.QueueFull:
+                await self._release(message["id"])
+                dropped += 1
+                self.stats["dropped"] += 1
+                logger.warning(f"WhatsApp queue full, refusing message {message['id']}")
+        if dropped:
+            raise WhatsAppBusyError(f"{dropped} WhatsApp messages could not be queued")
+        return queued
+
+    @staticmethod
+    def _extract_messages(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+        messages = []
+        for entry in payload.get("entry", []):
+            for change in entry.get("changes", []):
+                # Delivery/read status updates arrive here too and carry no messages
+                for message in change.get("value", {}).get("messages", []):
+                    if message.get("id") and message.get("from"):
+                        messages.append(message)
+        return messages
+
+    async def _is_duplicate(self, message_id: str) -> bool:
+        # Claims the id as it checks it (SET NX), so concurrent deliveries to
+        # different worker processes cannot both queue the same message
+        if self.seen.get(message_id) is not None:
+            return True
+        self.seen.set(message_id, True)
+
+        if self.remote is None or time.monotonic() < self._remote_retry_at:
+            return False
+        try:
+            redis_client = await self.remote.get_redis_pool()
+            first = await redis_client.set(f"whatsapp:seen:{message_id}", 1, nx=True,
+                                           ex=int(settings.WHATSAPP_DEDUPE_TTL))
+            return not first
+        except Exception as e:
+            # Fall back to per-process dedupe rather than failing the webhook
+            self._remote_retry_at = time.monotonic() + settings.RESPONSE_CACHE_REDIS_RETRY_SECONDS
+            logger.warning(f"WhatsApp dedupe Redis tier unavailable: {str(e)}")
+            return False
+
+    async def _release(self, message_id: str):
+        self.seen.delete(message_id)
+        if self.remote is None or time.monotonic() < self._remote_retry_at:
+            return
+        try:
+            redis_client = await self.remote.get_redis_pool()
+            await redis_client.delete(f"whatsapp:seen:{message_id}")
+        except Exception as e:
+            logger.warning(f"Failed to release WhatsApp dedupe claim {message_id}: {str(e)}")
+
+    async def _run(self, queue: asyncio.Queue):
+        while True:
+            message = await queue.get()
+            if message is None:
+                break
+            try:
+                await self.process_message(message)
+            except Exception as e:
+                logger.error(f"WhatsApp message {message.get('id')} failed: {str(e)}")
+
+    async def process_message(self, message: Dict[str, Any]):
+        phone_number = message["from"]
+        message_text = message.get("text", {}).get("body", "") if message.get("type") == "text" else ""
+        if not message_text:
+            await self.send_message(phone_number, UNSUPPORTED_MESSAGE_REPLY)
+            return
+
+        session_id = f"whatsapp:{phone_number}"
+        response = await self._answer(message_text, session_id)
+        if response is None:
+            reply = ERROR_REPLY
         else:
-            return "Sorry, I'm having trouble processing your message."
+            reply = response["response"]
+            if self.analytics_service:
+                await self.analytics_service.track_interaction(session_id, message_text, response)
+        self.stats["processed"] += 1
+        await self.send_message(phone_number, reply)
 
-    def send_message(self, phone_number, message):
-        url = f"{self.api_url}/messages"
-        headers = {
-            "Authorization": f"Bearer {self.access_token}",
-            "Content-Type": "application/json"
-        }
-        
+    async def _answer(self, message_text: str, session_id: str) -> Optional[Dict[str, Any]]:
+        # The webhook is already acknowledged, so a busy pipeline is waited
+        # out (as bulk batch items do) instead of losing the message
+        for attempt in range(settings.WHATSAPP_BUSY_RETRIES + 1):
+            try:
+                return await self.chat_service.process_message(message_text, session_id)
+            except InferenceBusyError as e:
+                if attempt == settings.WHATSAPP_BUSY_RETRIES:
+                    logger.error(f"Chat pipeline busy, giving up on WhatsApp message: {str(e)}")
+                    return None
+                self.stats["busy_retries"] += 1
+                await asyncio.sleep(max(getattr(e, "retry_after", 0.0), 0.1 * 2 ** attempt))
+            except Exception as e:
+                logger.error(f"Chat pipeline failed for WhatsApp message: {str(e)}")
+                return None
+
+    async def send_message(self, phone_number: str, message: str) -> Optional[Dict[str, Any]]:
         payload = {
             "messaging_product": "whatsapp",
             "to": phone_number,
             "text": {"body": message}
         }
-        
-        response = requests.post(url, headers=headers, json=payload)
-        return response.json()
\ No newline at end of file
+        for attempt in range(settings.WHATSAPP_SEND_RETRIES + 1):
+            await self.send_limiter.acquire()
+            try:
+                response = await self.client.post(f"{self.api_url}/messages", json=payload)
+            except httpx.HTTPError as e:
+                logger.warning(f"WhatsApp send failed: {str(e)}")
+            else:
+                if response.status_code < 400:
+                    self.stats["sent"] += 1
+                    return response.json()
+                logger.warning(f"WhatsApp send returned {response.status_code}: {response.text}")
+                # Only throttling and server errors are worth retrying
+                if response.status_code != 429 and response.status_code < 500:
+                    break
+            if attempt < settings.WHATSAPP_SEND_RETRIES:
+                await asyncio.sleep(0.5 * 2 ** attempt)
+        self.stats["send_failures"] += 1
+        return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "queued": sum(queue.qsize() for queue in self._queues),
+            "workers": len(self._workers),
+        }
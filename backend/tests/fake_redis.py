@@ -0,0 +1,139 @@
+"""A small in-memory stand-in for the redis.asyncio commands the services use."""
+from typing import Any, Dict, List, Optional
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data: Dict[str, Any] = {}
+
+    # Strings
+    async def set(self, key: str, value: str, ex: Optional[int] = None, nx: bool = False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def get(self, key: str):
+        return self.data.get(key)
+
+    async def mget(self, keys: List[str]):
+        return [self.data.get(key) for key in keys]
+
+    async def delete(self, *keys: str):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    async def expire(self, key: str, seconds: int):
+        return key in self.data
+
+    # Hashes
+    async def hincrby(self, key: str, field: str, amount: int = 1):
+        bucket = self.data.setdefault(key, {})
+        bucket[field] = str(int(bucket.get(field, 0)) + amount)
+        return int(bucket[field])
+
+    async def hincrbyfloat(self, key: str, field: str, amount: float):
+        bucket = self.data.setdefault(key, {})
+        bucket[field] = str(float(bucket.get(field, 0.0)) + amount)
+        return float(bucket[field])
+
+    async def hset(self, key: str, mapping: Dict[str, str]):
+        self.data.setdefault(key, {}).update(mapping)
+
+    async def hdel(self, key: str, *fields: str):
+        bucket = self.data.get(key, {})
+        return sum(bucket.pop(field, None) is not None for field in fields)
+
+    async def hgetall(self, key: str):
+        return dict(self.data.get(key, {}))
+
+    # Lists
+    async def rpush(self, key: str, *values: str):
+        items = self.data.setdefault(key, [])
+        items.extend(values)
+        return len(items)
+
+    async def ltrim(self, key: str, start: int, end: int):
+        items = self.data.get(key, [])
+        items[:] = items[start:end + 1 if end != -1 else None]
+
+    async def lrange(self, key: str, start: int, end: int):
+        return list(self.data.get(key, [])[start:end + 1 if end != -1 else None])
+
+    # Sets
+    async def sadd(self, key: str, *members: str):
+        self.data.setdefault(key, set()).update(members)
+
+    async def srem(self, key: str, *members: str):
+        self.data.get(key, set()).difference_update(members)
+
+    async def smembers(self, key: str):
+        return set(self.data.get(key, set()))
+
+    # Sorted sets
+    async def zincrby(self, key: str, amount: float, member: str):
+        scores = self.data.setdefault(key, {})
+        scores[member] = scores.get(member, 0.0) + amount
+        return scores[member]
+
+    async def zadd(self, key: str, mapping: Dict[str, float]):
+        self.data.setdefault(key, {}).update(mapping)
+
+    async def zcard(self, key: str):
+        return len(self.data.get(key, {}))
+
+    async def zrem(self, key: str, *members: str):
+        scores = self.data.get(key, {})
+        return sum(scores.pop(member, None) is not None for member in members)
+
+    def _ranked(self, key: str):
+        return sorted(self.data.get(key, {}).items(), key=lambda item: (item[1], item[0]))
+
+    async def zremrangebyrank(self, key: str, start: int, end: int):
+        ranked = self._ranked(key)
+        end = len(ranked) + end if end < 0 else end
+        for member, _ in ranked[start:end + 1]:
+            del self.data[key][member]
+
+    async def zrange(self, key: str, start: int, end: int):
+        ranked = self._ranked(key)
+        end = len(ranked) + end if end < 0 else end
+        return [member for member, _ in ranked[start:end + 1]]
+
+    async def zrevrange(self, key: str, start: int, end: int, withscores: bool = False):
+        ranked = list(reversed(self._ranked(key)))[start:end + 1 if end >= 0 else None]
+        return ranked if withscores else [member for member, _ in ranked]
+
+    def pipeline(self, transaction: bool = True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis: FakeRedis):
+        self.redis = redis
+        self.calls = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __getattr__(self, name: str):
+        command = getattr(self.redis, name)
+
+        def queue(*args, **kwargs):
+            self.calls.append((command, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self):
+        calls, self.calls = self.calls, []
+        return [await command(*args, **kwargs) for command, args, kwargs in calls]
+
+
+class FakeCacheManager:
+    def __init__(self, redis: Optional[FakeRedis] = None):
+        self.redis = redis or FakeRedis()
+
+    async def get_redis_pool(self):
+        return self.redis
@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+
+import services.analytics_service as analytics_module
+from config.settings import settings
+from services.analytics_service import WORKER_IDS_KEY, WORKER_KEY_PREFIX, AnalyticsService
+from tests.fake_redis import FakeCacheManager
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = FakeCacheManager()
+    monkeypatch.setattr(analytics_module, "cache_manager", cache)
+    monkeypatch.setattr(settings, "ANALYTICS_REDIS_MERGE", True)
+    monkeypatch.setattr(settings, "ANALYTICS_PUBLISH_INTERVAL", 3600.0)
+    return cache
+
+
+def worker(worker_id: str) -> AnalyticsService:
+    service = AnalyticsService()
+    service.worker_id = worker_id
+    return service
+
+
+async def track(service: AnalyticsService, intent: str, latency: float, times: int = 1):
+    for _ in range(times):
+        await service.track_interaction("s", "hi", {"response_time": latency,
+                                                     "intent": {"intent": intent}})
+
+
+def test_lifetime_totals_are_shared_and_survive_restarts(cache):
+    async def scenario():
+        first, second = worker("host:1"), worker("host:2")
+        await track(first, "greeting", 0.1, times=3)
+        await track(second, "weather", 0.5, times=2)
+        await first._publish()
+        await second._publish()
+        # Workers stop (or restart); a fresh one still sees the lifetime totals
+        await first._publish(final=True)
+        await second._publish(final=True)
+        fresh = worker("host:3")
+        await track(fresh, "greeting", 0.2)
+        return await fresh.get_conversation_analytics()
+
+    analytics = asyncio.run(scenario())
+    metrics = analytics["metrics"]
+    assert metrics["total_conversations"] == 6
+    assert metrics["common_intents"] == {"greeting": 4, "weather": 2}
+    assert analytics["latency"]["lifetime"]["count"] == 6
+    assert analytics["latency"]["lifetime"]["p95"] == pytest.approx(0.5, rel=0.06)
+    assert analytics["workers"] == 1
+
+
+def test_unpublished_deltas_are_not_counted_twice(cache):
+    async def scenario():
+        service = worker("host:1")
+        await track(service, "greeting", 0.1, times=2)
+        before = (await service.get_conversation_analytics())["metrics"]["total_conversations"]
+        await service._publish()
+        after = (await service.get_conversation_analytics())["metrics"]["total_conversations"]
+        return before, after
+
+    assert asyncio.run(scenario()) == (2, 2)
+
+
+def test_failed_publish_keeps_the_deltas(cache, monkeypatch):
+    async def scenario():
+        service = worker("host:1")
+        await track(service, "greeting", 0.1)
+
+        async def broken():
+            raise ConnectionError("redis down")
+        monkeypatch.setattr(cache, "get_redis_pool", broken)
+        with pytest.raises(ConnectionError):
+            await service._publish()
+        monkeypatch.undo()
+        monkeypatch.setattr(analytics_module, "cache_manager", cache)
+        monkeypatch.setattr(settings, "ANALYTICS_REDIS_MERGE", True)
+        await service._publish()
+        return await worker("host:2").get_conversation_analytics()
+
+    assert asyncio.run(scenario())["metrics"]["total_conversations"] == 1
+
+
+def test_windows_merge_live_workers_and_expired_ones_are_pruned(cache):
+    async def scenario():
+        first, second, dead = worker("host:1"), worker("host:2"), worker("host:3")
+        for service in (first, second, dead):
+            await track(service, "greeting", 0.1)
+            await service._publish()
+        # The dead worker's snapshot key expired; only its id is left
+        await cache.redis.delete(f"{WORKER_KEY_PREFIX}host:3")
+        return await first.get_conversation_analytics()
+
+    analytics = asyncio.run(scenario())
+    assert analytics["workers"] == 2
+    assert analytics["latency"]["1m"]["count"] == 2
+    assert analytics["metrics"]["total_conversations"] == 3
+    assert cache.redis.data[WORKER_IDS_KEY] == {"host:1", "host:2"}
+
+
+def test_stop_leaves_the_live_set(cache):
+    async def scenario():
+        service = worker("host:1")
+        await service.start()
+        await track(service, "greeting", 0.1)
+        await service.stop()
+
+    asyncio.run(scenario())
+    assert not cache.redis.data.get(WORKER_IDS_KEY)
+    assert f"{WORKER_KEY_PREFIX}host:1" not in cache.redis.data
+    assert cache.redis.data["analytics:lifetime"]["total"] == "1"
@@ -0,0 +1,89 @@
+import asyncio
+import time
+
+import pytest
+
+from utils.batching import BatchQueueFullError, BatchScheduler
+
+
+class Recorder:
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, items):
+        self.batches.append(list(items))
+        return [item * 2 for item in items]
+
+
+def test_flushes_as_soon_as_a_batch_is_full():
+    recorder = Recorder()
+    scheduler = BatchScheduler("test-size", recorder, max_batch_size=4, max_wait_ms=10000.0)
+
+    async def scenario():
+        start = time.perf_counter()
+        results = await asyncio.gather(*(scheduler.submit(i) for i in range(4)))
+        return results, time.perf_counter() - start
+
+    results, elapsed = asyncio.run(scenario())
+    assert results == [0, 2, 4, 6]
+    assert recorder.batches == [[0, 1, 2, 3]]
+    assert elapsed < 1.0
+
+
+def test_flushes_a_partial_batch_after_max_wait():
+    recorder = Recorder()
+    scheduler = BatchScheduler("test-timeout", recorder, max_batch_size=100, max_wait_ms=50.0)
+
+    async def scenario():
+        start = time.perf_counter()
+        results = await asyncio.gather(scheduler.submit(1), scheduler.submit(2))
+        return results, time.perf_counter() - start
+
+    results, elapsed = asyncio.run(scenario())
+    assert results == [2, 4]
+    assert recorder.batches == [[1, 2]]
+    assert 0.04 <= elapsed < 1.0
+    assert scheduler.get_stats()["average_batch_size"] == 2
+
+
+def test_splits_a_backlog_into_full_batches():
+    recorder = Recorder()
+    scheduler = BatchScheduler("test-split", recorder, max_batch_size=3, max_wait_ms=10000.0)
+
+    async def scenario():
+        return await asyncio.gather(*(scheduler.submit(i) for i in range(6)))
+
+    assert asyncio.run(scenario()) == [i * 2 for i in range(6)]
+    assert recorder.batches == [[0, 1, 2], [3, 4, 5]]
+
+
+def test_async_batch_function_and_errors_reach_every_caller():
+    async def failing(items):
+        raise RuntimeError("model crashed")
+
+    scheduler = BatchScheduler("test-error", failing, max_batch_size=2, max_wait_ms=10.0)
+
+    async def scenario():
+        return await asyncio.gather(scheduler.submit("a"), scheduler.submit("b"),
+                                    return_exceptions=True)
+
+    errors = asyncio.run(scenario())
+    assert [str(error) for error in errors] == ["model crashed", "model crashed"]
+    assert scheduler.stats["errors"] == 1
+
+
+def test_rejects_when_the_queue_is_full():
+    scheduler = BatchScheduler("test-full", Recorder(), max_batch_size=10,
+                               max_wait_ms=10000.0, max_queue_depth=2)
+
+    async def scenario():
+        pending = [asyncio.create_task(scheduler.submit(i)) for i in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(BatchQueueFullError):
+            await scheduler.submit(2)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    asyncio.run(scenario())
+    assert scheduler.stats["rejected"] == 1
@@ -0,0 +1,104 @@
+import json
+import multiprocessing
+import os
+
+import pytest
+
+from config.settings import settings
+from utils.faq_index import (CURRENT_FILE, KEEP_VERSIONS, VERSIONS_DIR, FAQIndex, ensure_index,
+                             tokenize)
+
+CATALOG = [
+    {"id": "reset-password", "question": "How do I reset my password?",
+     "alternatives": ["forgot my password"],
+     "answer": "Use the Forgot password link on the sign-in page."},
+    {"id": "delivery-time", "question": "How long does delivery take?",
+     "answer": "Orders arrive within 3-5 working days."},
+    {"id": "cancel-order", "question": "How can I cancel my order?",
+     "answer": "Open Orders and choose Cancel."},
+]
+
+
+@pytest.fixture(autouse=True)
+def faq_settings(monkeypatch):
+    monkeypatch.setattr(settings, "FAQ_MIN_MATCHED_TERMS", 2)
+
+
+@pytest.fixture
+def catalog_path(tmp_path):
+    path = tmp_path / "faq.json"
+    path.write_text(json.dumps(CATALOG))
+    return str(path)
+
+
+@pytest.fixture
+def index_path(tmp_path):
+    return str(tmp_path / "index")
+
+
+def test_tokenize_folds_contractions_plurals_and_stopwords():
+    assert tokenize("Where's my passwords? I can't log in") == ["where", "password", "log"]
+
+
+def test_exact_question_scores_close_to_one(catalog_path, index_path):
+    index = FAQIndex(index_path, catalog_path=catalog_path, reload_interval=0.0)
+    match = index.search("How do I reset my password")
+    assert match["id"] == "reset-password"
+    assert match["score"] > 0.95
+    assert index.search("i forgot my password")["id"] == "reset-password"
+
+
+def test_single_shared_term_does_not_match(catalog_path, index_path):
+    index = FAQIndex(index_path, catalog_path=catalog_path, reload_interval=0.0)
+    assert index.search("what time is it") is None
+    assert index.search("password") is None
+
+
+def test_rebuilds_when_the_catalog_changes(catalog_path, index_path):
+    FAQIndex(index_path, catalog_path=catalog_path)
+    with open(catalog_path, "w") as f:
+        json.dump(CATALOG + [{"id": "gift-card", "question": "Can I pay with a gift card?",
+                              "answer": "Yes, at checkout."}], f)
+
+    index = FAQIndex(index_path, catalog_path=catalog_path)
+    assert index.search("pay with gift card")["id"] == "gift-card"
+    assert ensure_index(catalog_path, index_path) is None
+
+
+def test_journal_updates_and_compaction(catalog_path, index_path):
+    index = FAQIndex(index_path, catalog_path=catalog_path, reload_interval=0.0)
+    index.add([{"id": "opening-hours", "question": "What are your opening hours?",
+                "answer": "9 to 5."}])
+    index.remove(["cancel-order"])
+
+    other = FAQIndex(index_path, reload_interval=0.0)
+    assert other.search("opening hours")["id"] == "opening-hours"
+    assert other.search("cancel my order") is None
+
+    index.compact()
+    reopened = FAQIndex(index_path, catalog_path=catalog_path, reload_interval=0.0)
+    assert len(reopened) == 3
+    assert reopened.search("opening hours")["id"] == "opening-hours"
+
+
+def test_builds_publish_versions_atomically_and_prune_old_ones(catalog_path, index_path):
+    index = FAQIndex(index_path, catalog_path=catalog_path, reload_interval=0.0)
+    for i in range(4):
+        index.compact()
+    versions = os.listdir(os.path.join(index_path, VERSIONS_DIR))
+    with open(os.path.join(index_path, CURRENT_FILE)) as f:
+        assert f.read() in versions
+    assert len(versions) == KEEP_VERSIONS
+    assert index.search("How do I reset my password")["id"] == "reset-password"
+
+
+def _ensure(args):
+    return ensure_index(*args) is not None
+
+
+def test_concurrent_workers_build_once(catalog_path, index_path):
+    with multiprocessing.get_context("fork").Pool(4) as pool:
+        built = pool.map(_ensure, [(catalog_path, index_path)] * 4)
+    assert sum(built) == 1
+    assert len(os.listdir(os.path.join(index_path, VERSIONS_DIR))) == 1
+    assert FAQIndex(index_path).search("cancel my order")["id"] == "cancel-order"
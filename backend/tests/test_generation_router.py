@@ -0,0 +1,79 @@
+import time
+
+import pytest
+
+from config.settings import settings
+from utils.batching import BatchScheduler
+from utils.generation_router import GenerationRouter
+from utils.model_registry import model_registry
+
+
+class FakeBreaker:
+    state = "closed"
+
+
+class FakeLLMClient:
+    def __init__(self):
+        self.breaker = FakeBreaker()
+
+
+@pytest.fixture(autouse=True)
+def router_settings(monkeypatch):
+    monkeypatch.setattr(settings, "GENERATION_TIERS", ["gpt", "dialogpt"])
+    monkeypatch.setattr(settings, "GENERATION_SLO_MS", 2000.0)
+    monkeypatch.setattr(settings, "GENERATION_LATENCY_HALF_LIFE_SECONDS", 30.0)
+    monkeypatch.setattr(model_registry, "is_available", lambda name: True)
+
+
+@pytest.fixture
+def router():
+    batcher = BatchScheduler("test-router", lambda items: items, max_batch_size=4)
+    return GenerationRouter(batcher, FakeLLMClient())
+
+
+def backends(plan):
+    return [backend for backend, _ in plan]
+
+
+def test_prefers_tiers_in_order(router):
+    assert router.plan(None) == [("gpt", "preferred"), ("dialogpt", "preferred"),
+                                 ("template", "exhausted")]
+
+
+def test_open_circuit_skips_gpt(router):
+    router.llm_client.breaker.state = "open"
+    assert router.plan(None) == [("dialogpt", "circuit_open"), ("template", "circuit_open")]
+
+
+def test_slow_model_is_kept_when_the_client_sent_no_deadline(router, monkeypatch):
+    monkeypatch.setattr(settings, "GENERATION_TIERS", ["dialogpt"])
+    router.record("dialogpt", 2.5, ok=True)
+    assert router.plan(None) == [("dialogpt", "over_budget"), ("template", "over_budget")]
+
+
+def test_slow_tier_moves_behind_faster_ones_without_a_deadline(router):
+    router.record("gpt", 5.0, ok=True)
+    router.record("dialogpt", 0.2, ok=True)
+    assert backends(router.plan(None)) == ["dialogpt", "gpt", "template"]
+
+
+def test_slow_model_is_skipped_when_it_cannot_meet_the_deadline(router):
+    router.record("dialogpt", 2.5, ok=True)
+    plan = router.plan(router.deadline_for(1000))
+    assert backends(plan) == ["gpt", "template"]
+    assert plan[0] == ("gpt", "preferred")
+
+
+def test_latency_estimate_decays_while_idle(router, monkeypatch):
+    monkeypatch.setattr(settings, "GENERATION_LATENCY_HALF_LIFE_SECONDS", 0.05)
+    router.record("dialogpt", 2.5, ok=True)
+    assert "dialogpt" not in backends(router.plan(router.deadline_for(1000)))
+    time.sleep(0.1)
+    assert "dialogpt" in backends(router.plan(router.deadline_for(1000)))
+
+
+def test_failing_backend_sits_out_its_cooldown(router, monkeypatch):
+    monkeypatch.setattr(settings, "GENERATION_ERROR_COOLDOWN_SECONDS", 60.0)
+    for _ in range(5):
+        router.record("gpt", 0.1, ok=False)
+    assert router.plan(None)[0] == ("dialogpt", "error_rate")
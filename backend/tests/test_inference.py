@@ -0,0 +1,65 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from config.settings import settings
+from utils.inference import InferenceBusyError, InferenceExecutor
+
+
+def make_executor(monkeypatch, limit=1, max_pending=0):
+    monkeypatch.setattr(settings, "INFERENCE_MODEL_CONCURRENCY", {"generation": limit})
+    monkeypatch.setattr(settings, "INFERENCE_MAX_PENDING", max_pending)
+    executor = InferenceExecutor(mode="thread", max_workers=4)
+    active = []
+    peak = [0]
+    lock = threading.Lock()
+
+    def handler(tag):
+        with lock:
+            active.append(tag)
+            peak[0] = max(peak[0], len(active))
+        time.sleep(0.05)
+        with lock:
+            active.remove(tag)
+        return tag
+
+    executor.register("generation", handler)
+    executor.register("generation_stream", handler, resource="generation")
+    return executor, peak
+
+
+def test_streams_and_batches_share_one_limit(monkeypatch):
+    executor, peak = make_executor(monkeypatch, limit=1, max_pending=4)
+
+    async def scenario():
+        return await asyncio.gather(executor.run("generation", "batch"),
+                                    executor.run("generation_stream", "stream"))
+
+    try:
+        assert asyncio.run(scenario()) == ["batch", "stream"]
+    finally:
+        executor.shutdown()
+    assert peak[0] == 1
+    stats = executor.get_stats()["models"]
+    assert stats["generation_stream"]["resource"] == "generation"
+    assert stats["generation_stream"]["concurrency_limit"] == 1
+
+
+def test_a_running_stream_saturates_generation(monkeypatch):
+    executor, _ = make_executor(monkeypatch, limit=1, max_pending=0)
+
+    async def scenario():
+        stream = asyncio.create_task(executor.run("generation_stream", "stream"))
+        await asyncio.sleep(0.01)
+        assert executor.pending("generation") == 1
+        with pytest.raises(InferenceBusyError):
+            await executor.run("generation", "batch")
+        return await stream
+
+    try:
+        assert asyncio.run(scenario()) == "stream"
+    finally:
+        executor.shutdown()
+    assert executor.get_stats()["models"]["generation"]["rejected"] == 1
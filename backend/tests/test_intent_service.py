@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+from services.chat_service import ChatService
+from services.intent_service import IntentService
+from utils.model_registry import model_registry
+
+
+class FavouriteLabelClassifier:
+    """Zero-shot stand-in that ranks one label first when it is a candidate."""
+
+    def __init__(self, favourite: str):
+        self.favourite = favourite
+        self.candidates = None
+
+    def __call__(self, texts, candidate_labels, batch_size=1):
+        self.candidates = list(candidate_labels)
+        ranked = sorted(candidate_labels, key=lambda label: label != self.favourite)
+        return [{"labels": ranked, "scores": [0.9] + [0.1 / len(ranked)] * (len(ranked) - 1)}
+                for _ in texts]
+
+
+@pytest.fixture
+def intent_service():
+    return IntentService()
+
+
+def test_zero_shot_candidates_include_an_out_of_scope_label(intent_service, monkeypatch):
+    classifier = FavouriteLabelClassifier("general")
+    monkeypatch.setattr(model_registry, "get", lambda name: classifier)
+
+    results = intent_service._classify_batch(["tell me about quantum physics"])
+
+    assert "general" in classifier.candidates
+    assert set(intent_service.matcher.labels) <= set(classifier.candidates)
+    assert results == [{"label": "general", "score": 0.9}]
+
+
+def test_keywords_still_win_before_any_model(intent_service):
+    result = asyncio.run(intent_service.detect_intent("thanks a lot"))
+    assert (result["intent"], result["method"]) == ("thanks", "rule_based")
+
+
+@pytest.mark.parametrize("method, expected", [
+    ("rule_based", "You're welcome! Is there anything else I can help with?"),
+    ("semantic", "You're welcome! Is there anything else I can help with?"),
+    ("ml_based", ""),
+    ("fallback", ""),
+])
+def test_only_rule_and_semantic_intents_pick_canned_replies(method, expected):
+    chat_service = ChatService.__new__(ChatService)
+    intent = {"intent": "thanks", "confidence": 0.95, "method": method}
+
+    assert asyncio.run(chat_service._get_rule_based_response(intent, {})) == expected
+    assert asyncio.run(chat_service._get_rule_based_response(intent, {}, min_confidence=0.0)) == expected
@@ -0,0 +1,68 @@
+import json
+
+from utils.keyword_matcher import KeywordMatcher
+
+
+def make_matcher() -> KeywordMatcher:
+    matcher = KeywordMatcher()
+    matcher.add_patterns({
+        "greeting": ["hi", "hello", "good morning"],
+        "goodbye": ["bye", "good night"],
+        "complaint": [{"pattern": "not working", "weight": 2.0}, "broken"]
+    })
+    return matcher
+
+
+def test_matches_respect_word_boundaries():
+    matcher = make_matcher()
+    assert matcher.find("this is a shipment") == []
+    assert matcher.find("Hi there") == [("greeting", "hi")]
+
+
+def test_longest_pattern_wins_at_a_position():
+    matcher = KeywordMatcher()
+    matcher.add("short", "good")
+    matcher.add("long", "good morning")
+    assert matcher.find("good morning all") == [("long", "good morning")]
+    assert matcher.find("good evening") == [("short", "good")]
+
+
+def test_whitespace_and_case_are_normalized():
+    assert make_matcher().find("GOOD    Night\nfolks") == [("goodbye", "good night")]
+
+
+def test_scores_sum_weights_and_best_breaks_ties_by_registration_order():
+    matcher = make_matcher()
+    assert matcher.scores("hello, it's broken and not working") == {
+        "greeting": 1.0, "complaint": 3.0
+    }
+    assert matcher.best("hello, it's broken and not working") == ("complaint", 3.0)
+    assert matcher.best("hi and bye") == ("greeting", 1.0)
+    assert matcher.best("nothing to see") is None
+
+
+def test_patterns_added_after_compiling_are_picked_up():
+    matcher = make_matcher()
+    assert matcher.best("thanks") is None
+    matcher.add("thanks", "thanks")
+    assert matcher.best("thanks") == ("thanks", 1.0)
+
+
+def test_regex_metacharacters_are_literal(tmp_path):
+    path = tmp_path / "patterns.json"
+    path.write_text(json.dumps({"pricing": ["c++ course", {"pattern": "$5 plan", "weight": 0.5}]}))
+    matcher = KeywordMatcher()
+    matcher.load_file(str(path))
+    assert len(matcher) == 2
+    assert matcher.find("is the c++ course in the $5 plan") == [
+        ("pricing", "c++ course"), ("pricing", "$5 plan")
+    ]
+    assert matcher.find("cxx course") == []
+    # "+" at the end of a word still needs a boundary after it
+    matcher.add("pricing", "c++")
+    assert matcher.find("c++") == [("pricing", "c++")]
+    assert matcher.find("c++x") == []
+
+
+def test_empty_matcher_finds_nothing():
+    assert KeywordMatcher().best("hello") is None
@@ -0,0 +1,193 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Tuple
+
+import pytest
+
+from config.settings import settings
+from utils.llm_client import CircuitOpenError, LLMClient, LLMClientError, NonRetryableLLMError
+
+
+def completion(content: str) -> dict:
+    return {"choices": [{"message": {"role": "assistant", "content": content}}]}
+
+
+class StubProvider(ThreadingHTTPServer):
+    """OpenAI-compatible stub answering from a script of (status, body, delay_seconds)."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.script: List[Tuple[int, dict, float]] = []
+        self.hits = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def next_response(self) -> Tuple[int, dict, float]:
+        with self.lock:
+            self.hits += 1
+            return self.script.pop(0) if self.script else (200, completion("default"), 0.0)
+
+    def handle_error(self, request, client_address):
+        # A hedged or cancelled request may close its connection before we answer
+        pass
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        status, body, delay = self.server.next_response()
+        time.sleep(delay)
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def provider():
+    server = StubProvider()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def fast_client_settings(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_MAX_RETRIES", 2)
+    monkeypatch.setattr(settings, "LLM_RETRY_BASE_DELAY_SECONDS", 0.0)
+    monkeypatch.setattr(settings, "LLM_CIRCUIT_FAILURE_THRESHOLD", 5)
+    monkeypatch.setattr(settings, "LLM_CIRCUIT_RESET_SECONDS", 30.0)
+    monkeypatch.setattr(settings, "LLM_HEDGE_ENABLED", False)
+
+
+def run(client: LLMClient, coro_fn):
+    async def scenario():
+        try:
+            return await coro_fn()
+        finally:
+            await client.close()
+    return asyncio.run(scenario())
+
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+
+def test_retries_retryable_status_then_succeeds(provider):
+    provider.script = [(503, {}, 0.0), (200, completion("hi there"), 0.0)]
+    client = LLMClient(base_url=provider.url, api_key="test")
+
+    assert run(client, lambda: client.chat(MESSAGES)) == "hi there"
+    assert provider.hits == 2
+    assert client.stats["retries"] == 1
+    assert client.breaker.state == "closed"
+
+
+def test_client_errors_are_not_retried(provider):
+    provider.script = [(401, {}, 0.0)]
+    client = LLMClient(base_url=provider.url, api_key="test")
+
+    with pytest.raises(NonRetryableLLMError):
+        run(client, lambda: client.chat(MESSAGES))
+    assert provider.hits == 1
+
+
+def test_circuit_opens_then_recovers_through_a_probe(provider, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_MAX_RETRIES", 0)
+    monkeypatch.setattr(settings, "LLM_CIRCUIT_FAILURE_THRESHOLD", 2)
+    monkeypatch.setattr(settings, "LLM_CIRCUIT_RESET_SECONDS", 0.1)
+    provider.script = [(500, {}, 0.0), (500, {}, 0.0), (200, completion("back"), 0.0)]
+    client = LLMClient(base_url=provider.url, api_key="test")
+
+    async def scenario():
+        for _ in range(2):
+            with pytest.raises(LLMClientError):
+                await client.chat(MESSAGES)
+        assert client.breaker.state == "open"
+        with pytest.raises(CircuitOpenError):
+            await client.chat(MESSAGES)
+        assert provider.hits == 2
+
+        await asyncio.sleep(0.15)
+        assert client.breaker.state == "half_open"
+        return await client.chat(MESSAGES)
+
+    assert run(client, scenario) == "back"
+    assert client.breaker.state == "closed"
+    assert client.stats["circuit_rejections"] == 1
+
+
+def test_cancelled_probe_does_not_wedge_the_breaker(provider):
+    provider.script = [(200, completion("late"), 1.0)]
+    client = LLMClient(base_url=provider.url, api_key="test")
+    client.breaker.opened_at = time.monotonic() - settings.LLM_CIRCUIT_RESET_SECONDS
+
+    async def scenario():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(client.chat(MESSAGES), timeout=0.1)
+
+    run(client, scenario)
+    assert not client.breaker._probe_in_flight
+    # Giving up is not a provider failure: the next call may probe again
+    assert client.breaker.state == "half_open"
+    assert client.stats["failures"] == 0
+
+
+def test_cancelled_calls_do_not_trip_the_breaker(provider, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_CIRCUIT_FAILURE_THRESHOLD", 2)
+    provider.script = [(200, completion("late"), 0.3) for _ in range(5)]
+    client = LLMClient(base_url=provider.url, api_key="test")
+
+    async def scenario():
+        for _ in range(5):
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(client.chat(MESSAGES), timeout=0.05)
+        assert client.breaker.state == "closed"
+        return await client.chat(MESSAGES)
+
+    # Cancelled requests may or may not have reached the stub; either answer is fine
+    assert run(client, scenario) in ("late", "default")
+    assert client.stats["failures"] == 0
+
+
+def test_stream_closed_early_hands_back_the_probe(provider):
+    client = LLMClient(base_url=provider.url, api_key="test")
+    client.breaker.opened_at = time.monotonic() - settings.LLM_CIRCUIT_RESET_SECONDS
+    provider.script = [(200, completion("late"), 1.0)]
+
+    async def scenario():
+        stream = client.stream_chat(MESSAGES)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(stream.__anext__(), timeout=0.1)
+        await stream.aclose()
+
+    run(client, scenario)
+    assert not client.breaker._probe_in_flight
+    assert client.breaker.state == "half_open"
+
+
+def test_hedged_request_wins_when_first_is_slow(provider, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_HEDGE_ENABLED", True)
+    monkeypatch.setattr(settings, "LLM_HEDGE_DELAY_MS", 50.0)
+    provider.script = [(200, completion("slow"), 1.0), (200, completion("fast"), 0.0)]
+    client = LLMClient(base_url=provider.url, api_key="test")
+
+    start = time.monotonic()
+    assert run(client, lambda: client.chat(MESSAGES)) == "fast"
+    assert time.monotonic() - start < 0.8
+    assert client.stats["hedged"] == 1
+    assert provider.hits == 2
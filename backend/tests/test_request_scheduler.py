@@ -0,0 +1,139 @@
+import asyncio
+
+import pytest
+
+from config.settings import settings
+from utils.request_scheduler import RequestRejectedError, RequestScheduler
+
+
+@pytest.fixture(autouse=True)
+def scheduler_settings(monkeypatch):
+    monkeypatch.setattr(settings, "SCHEDULER_CLIENT_MAX_CONCURRENCY", 8)
+    monkeypatch.setattr(settings, "SCHEDULER_CLIENT_MAX_QUEUED", 32)
+    monkeypatch.setattr(settings, "SCHEDULER_CLIENT_RATE", 0.0)
+
+
+async def turn(scheduler: RequestScheduler, session_id: str, label: str, events: list,
+               client_id=None, hold: float = 0.01):
+    async with scheduler.slot(session_id, client_id):
+        events.append(("start", label))
+        await asyncio.sleep(hold)
+        events.append(("end", label))
+
+
+def test_turns_of_one_session_run_one_at_a_time_in_arrival_order():
+    scheduler = RequestScheduler(max_concurrency=4, max_queued=16)
+    events = []
+
+    async def scenario():
+        await asyncio.gather(*(turn(scheduler, "s1", f"t{i}", events) for i in range(4)))
+
+    asyncio.run(scenario())
+    assert events == [(kind, f"t{i}") for i in range(4) for kind in ("start", "end")]
+    assert scheduler.get_stats()["running"] == 0
+
+
+def test_different_sessions_run_concurrently():
+    scheduler = RequestScheduler(max_concurrency=4, max_queued=16)
+    events = []
+
+    async def scenario():
+        await asyncio.gather(turn(scheduler, "a", "a", events, hold=0.05),
+                             turn(scheduler, "b", "b", events, hold=0.05))
+
+    asyncio.run(scenario())
+    assert [kind for kind, _ in events[:2]] == ["start", "start"]
+
+
+def test_sessions_share_slots_round_robin():
+    scheduler = RequestScheduler(max_concurrency=1, max_queued=16)
+    events = []
+
+    async def scenario():
+        tasks = [asyncio.create_task(turn(scheduler, "a", f"a{i}", events)) for i in range(3)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(turn(scheduler, "b", "b0", events)))
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+    starts = [label for kind, label in events if kind == "start"]
+    # b waits behind a's running turn only, not behind a's whole backlog
+    assert starts == ["a0", "b0", "a1", "a2"]
+
+
+def test_rejects_when_the_queue_is_full():
+    scheduler = RequestScheduler(max_concurrency=1, max_queued=1)
+
+    async def scenario():
+        await scheduler.acquire("a")
+        waiting = asyncio.create_task(scheduler.acquire("b"))
+        await asyncio.sleep(0)
+        with pytest.raises(RequestRejectedError) as rejected:
+            await scheduler.acquire("c")
+        scheduler.release("a")
+        await waiting
+        scheduler.release("b")
+        return rejected.value
+
+    error = asyncio.run(scenario())
+    assert error.reason == "overloaded"
+    assert scheduler.stats["rejected"] == 1
+    assert scheduler.get_stats()["running"] == 0
+
+
+def test_rejects_clients_over_their_queue_limit(monkeypatch):
+    monkeypatch.setattr(settings, "SCHEDULER_CLIENT_MAX_CONCURRENCY", 1)
+    monkeypatch.setattr(settings, "SCHEDULER_CLIENT_MAX_QUEUED", 1)
+    scheduler = RequestScheduler(max_concurrency=8, max_queued=16)
+
+    async def scenario():
+        await scheduler.acquire("a", "client")
+        waiting = asyncio.create_task(scheduler.acquire("b", "client"))
+        await asyncio.sleep(0)
+        with pytest.raises(RequestRejectedError) as rejected:
+            await scheduler.acquire("c", "client")
+        # Another client is unaffected
+        await scheduler.acquire("d", "other")
+        scheduler.release("d", "other")
+        scheduler.release("a", "client")
+        await waiting
+        scheduler.release("b", "client")
+        return rejected.value
+
+    assert asyncio.run(scenario()).reason == "client_overloaded"
+
+
+def test_rate_limited_client_gets_retry_after(monkeypatch):
+    monkeypatch.setattr(settings, "SCHEDULER_CLIENT_RATE", 1.0)
+    monkeypatch.setattr(settings, "SCHEDULER_CLIENT_BURST", 2.0)
+    scheduler = RequestScheduler(max_concurrency=8, max_queued=16)
+    events = []
+
+    async def scenario():
+        await turn(scheduler, "a", "1", events, client_id="client")
+        await turn(scheduler, "a", "2", events, client_id="client")
+        with pytest.raises(RequestRejectedError) as rejected:
+            await scheduler.acquire("a", "client")
+        return rejected.value
+
+    error = asyncio.run(scenario())
+    assert error.reason == "rate_limited"
+    assert 0 < error.retry_after <= 1.0
+    assert scheduler.stats["rate_limited"] == 1
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    scheduler = RequestScheduler(max_concurrency=1, max_queued=4)
+
+    async def scenario():
+        await scheduler.acquire("a")
+        waiting = asyncio.create_task(scheduler.acquire("b"))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        scheduler.release("a")
+
+    asyncio.run(scenario())
+    stats = scheduler.get_stats()
+    assert (stats["running"], stats["waiting"], stats["cancelled"]) == (0, 0, 1)
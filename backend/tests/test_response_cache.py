@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+
+import utils.response_cache as response_cache_module
+from config.settings import settings
+from utils.response_cache import LocalTTLCache, ResponseCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(response_cache_module.time, "monotonic", clock)
+    return clock
+
+
+class DictRemote:
+    """Stands in for CacheManager's get/set."""
+
+    def __init__(self, fail: bool = False):
+        self.values = {}
+        self.fail = fail
+        self.calls = 0
+
+    async def get(self, key):
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError("redis down")
+        return self.values.get(key)
+
+    async def set(self, key, value, expire=None):
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError("redis down")
+        self.values[key] = value
+
+
+def make_cache(monkeypatch, remote=None) -> ResponseCache:
+    monkeypatch.setattr(settings, "RESPONSE_CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "RESPONSE_CACHE_USE_REDIS", remote is not None)
+    return ResponseCache(remote=remote)
+
+
+def test_local_cache_expires_and_evicts_least_recently_used(clock):
+    cache = LocalTTLCache(max_entries=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+    clock.now += 11
+    assert cache.get("a") is None and len(cache) == 1
+
+
+def test_response_keys_normalize_text_but_not_context():
+    cache = ResponseCache(remote=None)
+    assert cache.response_key("What time is it?", {}) == cache.response_key("what  time is it", {})
+    assert (cache.response_key("yes", {"last_intent": "booking"})
+            != cache.response_key("yes", {"last_intent": "cancel"}))
+    # Analyzer results are keyed on the exact text
+    assert cache.analysis_key("intent", "Hi!") != cache.analysis_key("intent", "hi")
+
+
+def test_remote_hits_are_copied_to_the_local_tier(monkeypatch, clock):
+    remote = DictRemote()
+    writer, reader = make_cache(monkeypatch, remote), make_cache(monkeypatch, remote)
+
+    async def scenario():
+        await writer.set("key", {"response": "hello"})
+        first = await reader.get("key")
+        calls = remote.calls
+        second = await reader.get("key")
+        return first, second, remote.calls - calls
+
+    first, second, extra_remote_calls = asyncio.run(scenario())
+    assert first == second == {"response": "hello"}
+    assert extra_remote_calls == 0
+    stats = reader.get_stats()
+    assert stats["redis"]["hits"] == 1 and stats["local"]["hits"] == 1
+
+
+def test_failing_remote_is_skipped_until_the_retry_window(monkeypatch, clock):
+    monkeypatch.setattr(settings, "RESPONSE_CACHE_REDIS_RETRY_SECONDS", 30)
+    remote = DictRemote(fail=True)
+    cache = make_cache(monkeypatch, remote)
+
+    async def lookups():
+        return [await cache.get(f"key{i}") for i in range(3)]
+
+    assert asyncio.run(lookups()) == [None, None, None]
+    assert remote.calls == 1
+    clock.now += 31
+    remote.fail = False
+    asyncio.run(lookups())
+    assert remote.calls == 4
+    assert cache.get_stats()["redis"]["errors"] == 1
+
+
+def test_disabled_cache_stores_nothing(monkeypatch):
+    cache = make_cache(monkeypatch)
+    cache.enabled = False
+
+    async def scenario():
+        await cache.set("key", "value")
+        return await cache.get("key")
+
+    assert asyncio.run(scenario()) is None
+    assert len(cache.local) == 0
@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+import utils.session_store as session_store_module
+from config.settings import settings
+from tests.fake_redis import FakeCacheManager
+from utils.session_store import InMemorySessionStore, RedisSessionStore, SessionStore
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_session_store_is_abstract():
+    with pytest.raises(TypeError):
+        SessionStore()
+
+
+def test_memory_store_evicts_least_recently_used(monkeypatch):
+    store = InMemorySessionStore(max_sessions=2, idle_ttl=60)
+
+    async def scenario():
+        await store.append_turn("a", "hi", "hello", {}, {})
+        await store.append_turn("b", "hi", "hello", {}, {})
+        await store.get("a")
+        await store.append_turn("c", "hi", "hello", {}, {})
+        return await store.get("a"), await store.get("b")
+
+    a, b = run(scenario())
+    assert a["history"] == ["User: hi", "Bot: hello"]
+    assert b["history"] == []
+    assert store.get_stats()["evictions"]["capacity"] == 1
+
+
+def test_memory_store_drops_idle_sessions(monkeypatch):
+    store = InMemorySessionStore(idle_ttl=60)
+    clock = [1000.0]
+    monkeypatch.setattr(session_store_module.time, "monotonic", lambda: clock[0])
+
+    run(store.append_turn("a", "hi", "hello", {"last_intent": "greeting"}, {}))
+    clock[0] += 61
+    context = run(store.get("a"))
+    assert context["history"] == [] and context["last_intent"] == ""
+    assert store.get_stats()["evictions"]["idle"] == 1
+    assert store.get_stats()["approx_bytes"] == 0
+
+
+def test_memory_store_caps_history_and_entities(monkeypatch):
+    monkeypatch.setattr(settings, "SESSION_MAX_HISTORY", 4)
+    monkeypatch.setattr(settings, "SESSION_MAX_ENTITIES", 2)
+    store = InMemorySessionStore()
+
+    async def scenario():
+        for turn in range(3):
+            await store.append_turn("a", f"q{turn}", f"a{turn}", {}, {f"label{turn}": turn})
+        return await store.get("a")
+
+    context = run(scenario())
+    assert context["history"] == ["User: q1", "Bot: a1", "User: q2", "Bot: a2"]
+    assert context["entities"] == {"label1": 1, "label2": 2}
+
+
+@pytest.fixture
+def redis_store(monkeypatch):
+    monkeypatch.setattr(settings, "SESSION_MAX_HISTORY", 4)
+    monkeypatch.setattr(settings, "SESSION_MAX_ENTITIES", 2)
+    return RedisSessionStore(cache=FakeCacheManager(), idle_ttl=60)
+
+
+def test_redis_store_round_trips_a_session(redis_store):
+    async def scenario():
+        await redis_store.append_turn("a", "hi", "hello", {"last_intent": "greeting"},
+                                      {"GPE": ["Paris"]})
+        return await redis_store.get("a")
+
+    context = run(scenario())
+    assert context["history"] == ["User: hi", "Bot: hello"]
+    assert context["last_intent"] == "greeting"
+    assert context["entities"] == {"GPE": ["Paris"]}
+    assert redis_store.get_stats()["new_sessions"] == 1
+
+
+def test_redis_store_trims_oldest_entities_and_history(redis_store):
+    async def scenario():
+        await redis_store.append_turn("a", "q0", "a0", {}, {"A": 0, "B": 0})
+        # A is the oldest label, then B
+        await redis_store.append_turn("a", "q1", "a1", {}, {"C": 1})
+        # A comes back as the most recent, so B and C go
+        await redis_store.append_turn("a", "q2", "a2", {}, {"A": 2, "D": 2})
+        return await redis_store.get("a")
+
+    context = run(scenario())
+    assert context["entities"] == {"A": 2, "D": 2}
+    assert context["history"] == ["User: q1", "Bot: a1", "User: q2", "Bot: a2"]
+    stats = redis_store.get_stats()
+    assert stats["evictions"] == {"history": 2, "entities": 3}
+    assert stats["errors"] == 0
@@ -0,0 +1,69 @@
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+
+class FlakyChatService:
+    """Streams one token, then fails on the first message only."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def stream_message(self, message, session_id, client_id=None, timeout_ms=None):
+        self.calls += 1
+        yield {"type": "metadata", "session_id": session_id}
+        if self.calls == 1:
+            raise RuntimeError("generation failed")
+        yield {"type": "token", "token": "hello"}
+        yield {"type": "done", "response": "hello", "time_to_first_token": 0.01,
+               "response_time": 0.01, "session_id": session_id}
+
+    async def process_message(self, message, session_id, client_id=None, timeout_ms=None):
+        raise RuntimeError("pipeline failed")
+
+
+class RecordingAnalytics:
+    def __init__(self):
+        self.tracked = []
+
+    async def track_interaction(self, session_id, message, response):
+        self.tracked.append(response)
+
+    async def track_first_token(self, session_id, seconds):
+        pass
+
+
+def receive_until_done(websocket):
+    events = []
+    while not events or events[-1]["type"] != "done":
+        events.append(websocket.receive_json())
+    return events
+
+
+def test_stream_error_keeps_the_socket_open(monkeypatch):
+    analytics = RecordingAnalytics()
+    monkeypatch.setattr(app, "state", SimpleNamespace(chat_service=FlakyChatService(),
+                                                      analytics_service=analytics))
+    with TestClient(app).websocket_connect("/ws/chat") as websocket:
+        websocket.send_json({"message": "hi", "session_id": "s", "stream": True})
+        failed = receive_until_done(websocket)
+        assert [event["type"] for event in failed] == ["metadata", "error", "done"]
+        assert failed[-1]["error"] is True
+
+        websocket.send_json({"message": "hi again", "session_id": "s", "stream": True})
+        retried = receive_until_done(websocket)
+        assert [event["type"] for event in retried] == ["metadata", "token", "done"]
+    # Only the completed stream is counted
+    assert len(analytics.tracked) == 1
+
+
+def test_message_error_sends_an_error_frame(monkeypatch):
+    monkeypatch.setattr(app, "state", SimpleNamespace(chat_service=FlakyChatService(),
+                                                      analytics_service=RecordingAnalytics()))
+    with TestClient(app).websocket_connect("/ws/chat") as websocket:
+        websocket.send_json({"message": "hi", "session_id": "s"})
+        assert websocket.receive_json()["type"] == "error"
+        websocket.send_json({"message": "hi", "session_id": "s", "stream": True})
+        assert receive_until_done(websocket)[-1]["type"] == "done"
@@ -0,0 +1,111 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from config.settings import settings
+from services.whatsapp_service import ERROR_REPLY, WhatsAppBusyError, WhatsAppService
+from utils.request_scheduler import RequestRejectedError
+
+
+class FakeChatService:
+    def __init__(self, busy_times: int = 0):
+        self.busy_times = busy_times
+        self.calls = []
+
+    async def process_message(self, message, session_id):
+        self.calls.append((message, session_id))
+        if len(self.calls) <= self.busy_times:
+            raise RequestRejectedError("overloaded", retry_after=0.01)
+        return {"response": f"echo: {message}"}
+
+
+def webhook(*messages):
+    return {"entry": [{"changes": [{"value": {"messages": [
+        {"id": message_id, "from": sender, "type": "text", "text": {"body": body}}
+        for message_id, sender, body in messages
+    ]}}]}]}
+
+
+@pytest.fixture(autouse=True)
+def whatsapp_settings(monkeypatch):
+    monkeypatch.setattr(settings, "WHATSAPP_DEDUPE_USE_REDIS", False)
+    monkeypatch.setattr(settings, "WHATSAPP_BUSY_RETRIES", 3)
+    monkeypatch.setattr(settings, "WHATSAPP_SEND_RATE", 1000.0)
+    monkeypatch.setattr(settings, "WHATSAPP_SEND_BURST", 1000.0)
+
+
+def make_service(chat_service, sent):
+    def handler(request: httpx.Request) -> httpx.Response:
+        sent.append(json.loads(request.content))
+        return httpx.Response(200, json={"messages": [{"id": "out"}]})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return WhatsAppService(chat_service, client=client)
+
+
+def test_busy_pipeline_is_retried_instead_of_answering_with_an_error():
+    sent = []
+    chat_service = FakeChatService(busy_times=2)
+    service = make_service(chat_service, sent)
+
+    async def scenario():
+        await service.process_message({"id": "m1", "from": "123", "type": "text",
+                                       "text": {"body": "hello"}})
+        await service.client.aclose()
+
+    asyncio.run(scenario())
+    assert len(chat_service.calls) == 3
+    assert [payload["text"]["body"] for payload in sent] == ["echo: hello"]
+    assert service.stats["busy_retries"] == 2
+
+
+def test_gives_up_with_the_error_reply_when_busy_persists():
+    sent = []
+    service = make_service(FakeChatService(busy_times=100), sent)
+
+    async def scenario():
+        await service.process_message({"id": "m1", "from": "123", "type": "text",
+                                       "text": {"body": "hello"}})
+        await service.client.aclose()
+
+    asyncio.run(scenario())
+    assert [payload["text"]["body"] for payload in sent] == [ERROR_REPLY]
+
+
+def test_webhook_queues_and_answers_each_message_once():
+    sent = []
+    chat_service = FakeChatService()
+    service = make_service(chat_service, sent)
+
+    async def scenario():
+        await service.start()
+        queued = await service.handle_webhook(webhook(("m1", "123", "hi"), ("m2", "456", "yo")))
+        # Redelivery of an acknowledged message is ignored
+        redelivered = await service.handle_webhook(webhook(("m1", "123", "hi")))
+        await service.stop()
+        return queued, redelivered
+
+    assert asyncio.run(scenario()) == (2, 0)
+    assert sorted(payload["text"]["body"] for payload in sent) == ["echo: hi", "echo: yo"]
+    assert service.stats["duplicates"] == 1
+
+
+def test_full_queue_refuses_the_delivery_so_it_can_be_redelivered(monkeypatch):
+    monkeypatch.setattr(settings, "WHATSAPP_WORKERS", 1)
+    monkeypatch.setattr(settings, "WHATSAPP_QUEUE_SIZE", 1)
+    service = make_service(FakeChatService(), [])
+
+    async def scenario():
+        service._queues = [asyncio.Queue(maxsize=1)]
+        assert await service.handle_webhook(webhook(("m1", "123", "first"))) == 1
+        with pytest.raises(WhatsAppBusyError):
+            await service.handle_webhook(webhook(("m2", "123", "second")))
+        service._queues[0].get_nowait()
+        # The refused message was not marked seen
+        assert await service.handle_webhook(webhook(("m2", "123", "second"))) == 1
+        await service.client.aclose()
+
+    asyncio.run(scenario())
+    assert service.stats["dropped"] == 1
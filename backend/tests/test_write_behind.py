@@ -0,0 +1,124 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+import utils.write_behind as write_behind_module
+from config.settings import settings
+from models.database import Base, Conversation, UserSession
+from utils.write_behind import ConversationWriter, conversation_row
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine, expire_on_commit=False)
+    monkeypatch.setattr(write_behind_module, "engine", engine)
+    monkeypatch.setattr(write_behind_module, "SessionLocal", session_factory)
+    monkeypatch.setattr(settings, "PERSISTENCE_RETRY_DELAY_MS", 1.0)
+    yield session_factory
+    engine.dispose()
+
+
+def row(session_id: str, message: str = "hi", created_at=None):
+    values = conversation_row(session_id, message, "hello", {"intent": "greeting", "confidence": 0.9},
+                              {}, {"label": "positive", "score": 0.8}, 0.05)
+    if created_at is not None:
+        values["created_at"] = created_at
+    return values
+
+
+def sessions(session_factory):
+    with session_factory() as session:
+        return {s.session_id: s for s in session.scalars(select(UserSession))}
+
+
+def conversation_count(session_factory) -> int:
+    with session_factory() as session:
+        return session.scalar(select(func.count()).select_from(Conversation))
+
+
+def test_batches_upsert_session_counts(database):
+    writer = ConversationWriter(batch_size=2, flush_interval_ms=10)
+    earlier = datetime.utcnow() - timedelta(minutes=5)
+
+    async def scenario():
+        await writer.start()
+        writer.enqueue(row("a"))
+        writer.enqueue(row("b"))
+        writer.enqueue(row("a", created_at=earlier))
+        await writer.stop()
+
+    asyncio.run(scenario())
+    stored = sessions(database)
+    assert conversation_count(database) == 3
+    assert {session_id: s.message_count for session_id, s in stored.items()} == {"a": 2, "b": 1}
+    # An older row landing in a later batch doesn't move last_active back
+    assert stored["a"].last_active > earlier
+    assert writer.get_stats()["written"] == 3
+
+
+def test_failed_batch_is_retried_without_duplicates(database, monkeypatch):
+    writer = ConversationWriter(batch_size=10, flush_interval_ms=10)
+    write_batch = writer._write_batch
+    failures = [1]
+
+    def flaky(rows):
+        if failures[0]:
+            failures[0] -= 1
+            # Fails after the inserts, so the rollback is what keeps them out
+            with write_behind_module.SessionLocal.begin() as session:
+                session.execute(write_behind_module.insert(Conversation), rows)
+                raise RuntimeError("database is locked")
+        write_batch(rows)
+
+    monkeypatch.setattr(writer, "_write_batch", flaky)
+
+    async def scenario():
+        await writer.start()
+        writer.enqueue(row("a"))
+        writer.enqueue(row("a"))
+        await writer.stop()
+
+    asyncio.run(scenario())
+    assert conversation_count(database) == 2
+    assert sessions(database)["a"].message_count == 2
+    assert writer.stats["retries"] == 1 and writer.stats["failed"] == 0
+
+
+def test_rows_are_counted_as_failed_after_the_last_retry(database, monkeypatch):
+    monkeypatch.setattr(settings, "PERSISTENCE_MAX_RETRIES", 2)
+    writer = ConversationWriter(batch_size=10, flush_interval_ms=10)
+
+    def broken(rows):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(writer, "_write_batch", broken)
+
+    async def scenario():
+        await writer.start()
+        writer.enqueue(row("a"))
+        await writer.stop()
+
+    asyncio.run(scenario())
+    assert writer.stats["failed"] == 1 and writer.stats["retries"] == 2
+    assert writer.stats["written"] == 0
+
+
+def test_enqueue_drops_when_full_or_not_started(database):
+    writer = ConversationWriter(max_queue_size=1, batch_size=10)
+    assert writer.enqueue(row("a")) is False
+
+    async def scenario():
+        await writer.start()
+        # The worker hasn't run yet, so the single slot fills up
+        results = [writer.enqueue(row("a")), writer.enqueue(row("a"))]
+        await writer.stop()
+        return results
+
+    assert asyncio.run(scenario()) == [True, False]
+    assert writer.stats["dropped"] == 2
+    assert conversation_count(database) == 1
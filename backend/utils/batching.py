@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from config.settings import settings
+from utils.inference import InferenceBusyError
+
+logger = logging.getLogger(__name__)
+
+# All schedulers created in this process, keyed by name (used for metrics)
+_schedulers: Dict[str, "BatchScheduler"] = {}
+
+
+class BatchQueueFullError(InferenceBusyError):
+    pass
+
+
+class BatchScheduler:
+    """Coalesces single-item calls from concurrent requests into batched calls.
+
+    Callers ``await submit(item)``; items are queued and flushed through
+    ``batch_fn`` (a list in, a list of the same length out; sync or async)
+    once ``max_batch_size`` items are waiting or the oldest one has waited
+    ``max_wait_ms``.
+    """
+
+    def __init__(self, name: str, batch_fn: Callable[[List[Any]], Any],
+                 max_batch_size: Optional[int] = None,
+                 max_wait_ms: Optional[float] = None,
+                 max_queue_depth: Optional[int] = None):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size or settings.BATCH_MAX_SIZE
+        self.max_wait = (max_wait_ms if max_wait_ms is not None
+                         else settings.BATCH_MAX_WAIT_MS) / 1000.0
+        self.max_queue_depth = max_queue_depth or settings.BATCH_MAX_QUEUE_DEPTH
+
+        self._queue: List[Tuple[Any, asyncio.Future, float]] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._in_flight: Set[asyncio.Task] = set()
+
+        self.stats = {
+            "batches": 0,
+            "items": 0,
+            "rejected": 0,
+            "errors": 0,
+            "total_wait_time": 0.0,
+            "max_wait_time": 0.0,
+            "total_fill_ratio": 0.0,
+        }
+        _schedulers[name] = self
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    async def submit(self, item: Any) -> Any:
+        if len(self._queue) >= self.max_queue_depth:
+            self.stats["rejected"] += 1
+            raise BatchQueueFullError(
+                f"Batch queue '{self.name}' is full ({self.max_queue_depth} pending)"
+            )
+
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.append((item, future, time.perf_counter()))
+        self._wakeup.set()
+        return await future
+
+    def _ensure_worker(self):
+        # The worker is started lazily so schedulers can be built outside a loop
+        if self._worker is None or self._worker.done():
+            self._wakeup = asyncio.Event()
+            self._worker = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            if not self._queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+
+            # Wait until the batch is full or the oldest item hits the deadline
+            deadline = self._queue[0][2] + self.max_wait
+            while len(self._queue) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+
+            batch = self._queue[:self.max_batch_size]
+            del self._queue[:self.max_batch_size]
+            # Flush without blocking the next batch; the executor bounds concurrency
+            task = asyncio.create_task(self._flush(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _flush(self, batch: List[Tuple[Any, asyncio.Future, float]]):
+        # Drop callers that gave up (e.g. timed out) while waiting
+        batch = [entry for entry in batch if not entry[1].done()]
+        if not batch:
+            return
+
+        now = time.perf_counter()
+        for _, _, enqueued_at in batch:
+            waited = now - enqueued_at
+            self.stats["total_wait_time"] += waited
+            self.stats["max_wait_time"] = max(self.stats["max_wait_time"], waited)
+        self.stats["batches"] += 1
+        self.stats["items"] += len(batch)
+        self.stats["total_fill_ratio"] += len(batch) / self.max_batch_size
+
+        try:
+            results = self.batch_fn([item for item, _, _ in batch])
+            if asyncio.iscoroutine(results):
+                results = await results
+            if len(results) != len(batch):
+                raise ValueError(
+                    f"Batch function returned {len(results)} results for {len(batch)} inputs"
+                )
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"Batch '{self.name}' failed: {str(e)}")
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def get_stats(self) -> Dict[str, Any]:
+        batches = self.stats["batches"]
+        items = self.stats["items"]
+        return {
+            "queue_depth": self.queue_depth,
+            "batches_in_flight": len(self._in_flight),
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "batches": batches,
+            "items": items,
+            "rejected": self.stats["rejected"],
+            "errors": self.stats["errors"],
+            "average_batch_size": items / batches if batches else 0.0,
+            "average_fill_ratio": self.stats["total_fill_ratio"] / batches if batches else 0.0,
+            "average_wait_ms": self.stats["total_wait_time"] / items * 1000.0 if items else 0.0,
+            "max_wait_ms_observed": self.stats["max_wait_time"] * 1000.0,
+        }
+
+
+def get_batching_stats() -> Dict[str, Any]:
+    return {name: scheduler.get_stats() for name, scheduler in _schedulers.items()}
@@ -0,0 +1,232 @@
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("pytorch", "quantized", "onnx")
+MANIFEST_FILE = "manifest.json"
+QUANTIZED_WEIGHTS_FILE = "quantized.pt"
+ONNX_FILE = "model.onnx"
+ONNX_QUANTIZED_FILE = "model.int8.onnx"
+
+_threads_configured = False
+
+
+def configure_torch_threads():
+    global _threads_configured
+    if _threads_configured or not settings.INFERENCE_THREADS:
+        return
+    import torch
+
+    torch.set_num_threads(settings.INFERENCE_THREADS)
+    _threads_configured = True
+
+
+def _artifact_dir(base_path: str, backend: str) -> str:
+    return os.path.join(base_path, backend)
+
+
+def _artifact_current(path: str, model_name: str, files: List[str]) -> bool:
+    # Artifacts are reused only if they were exported from the configured model
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return False
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    return (manifest.get("model") == model_name and
+            all(os.path.exists(os.path.join(path, name)) for name in files))
+
+
+def _write_manifest(path: str, model_name: str, backend: str):
+    with open(os.path.join(path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump({"model": model_name, "backend": backend}, f)
+
+
+def load_text_classifier(task: str, model_name: str, artifact_path: str,
+                         backend: Optional[str] = None) -> Any:
+    """Load a sequence classifier for the configured CPU inference backend.
+
+    Every backend returns a callable with the calling convention of the
+    transformers pipeline for ``task`` (text or zero-shot classification),
+    so services do not care which one is in use. Quantized and ONNX
+    artifacts are built on first load and cached under ``artifact_path``.
+    """
+    backend = backend or settings.INFERENCE_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}', expected one of {BACKENDS}")
+
+    if backend == "onnx":
+        return _load_onnx(task, model_name, _artifact_dir(artifact_path, backend))
+
+    configure_torch_threads()
+    if backend == "quantized":
+        return _load_quantized(task, model_name, _artifact_dir(artifact_path, backend))
+
+    from transformers import pipeline
+
+    return pipeline(task, model=model_name, tokenizer=model_name)
+
+
+def _load_quantized(task: str, model_name: str, path: str) -> Any:
+    import torch
+    from transformers import (AutoConfig, AutoModelForSequenceClassification,
+                              AutoTokenizer, pipeline)
+
+    weights_path = os.path.join(path, QUANTIZED_WEIGHTS_FILE)
+    if _artifact_current(path, model_name, [QUANTIZED_WEIGHTS_FILE]):
+        # Rebuild the quantized module structure, then load the int8 weights
+        tokenizer = AutoTokenizer.from_pretrained(path)
+        model = AutoModelForSequenceClassification.from_config(AutoConfig.from_pretrained(path))
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        model.load_state_dict(torch.load(weights_path))
+    else:
+        logger.info(f"Quantizing {model_name} to int8 (cached in {path})")
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModelForSequenceClassification.from_pretrained(model_name)
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        os.makedirs(path, exist_ok=True)
+        torch.save(model.state_dict(), weights_path)
+        tokenizer.save_pretrained(path)
+        model.config.save_pretrained(path)
+        _write_manifest(path, model_name, "quantized")
+
+    return pipeline(task, model=model.eval(), tokenizer=tokenizer)
+
+
+def _export_onnx(model_name: str, path: str):
+    import inspect
+
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    logger.info(f"Exporting {model_name} to ONNX (cached in {path})")
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name).eval()
+    sample = dict(tokenizer(["warm up the exporter"], return_tensors="pt"))
+    # Graph inputs follow the order of forward()'s parameters
+    input_names = [name for name in inspect.signature(model.forward).parameters if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["logits"] = {0: "batch"}
+
+    os.makedirs(path, exist_ok=True)
+    onnx_path = os.path.join(path, ONNX_FILE)
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (sample,),
+            onnx_path,
+            input_names=input_names,
+            output_names=["logits"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14
+        )
+    tokenizer.save_pretrained(path)
+    model.config.save_pretrained(path)
+
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(onnx_path, os.path.join(path, ONNX_QUANTIZED_FILE),
+                     weight_type=QuantType.QInt8)
+    _write_manifest(path, model_name, "onnx")
+
+
+def _load_onnx(task: str, model_name: str, path: str) -> "OnnxTextClassifier":
+    try:
+        import onnxruntime  # noqa: F401
+    except ImportError:
+        raise RuntimeError("INFERENCE_BACKEND=onnx requires the onnxruntime package")
+
+    model_file = ONNX_QUANTIZED_FILE if settings.ONNX_QUANTIZE else ONNX_FILE
+    if not _artifact_current(path, model_name, [ONNX_FILE, ONNX_QUANTIZED_FILE]):
+        _export_onnx(model_name, path)
+    if task == "zero-shot-classification":
+        return OnnxZeroShotClassifier(path, model_file)
+    return OnnxTextClassifier(path, model_file)
+
+
+class OnnxTextClassifier:
+    """ONNX Runtime sequence classifier with the transformers pipeline interface."""
+
+    def __init__(self, path: str, model_file: str, max_length: int = 256):
+        import onnxruntime as ort
+        from transformers import AutoConfig, AutoTokenizer
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if settings.INFERENCE_THREADS:
+            options.intra_op_num_threads = settings.INFERENCE_THREADS
+        self.session = ort.InferenceSession(os.path.join(path, model_file), options,
+                                            providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(path)
+        self.id2label = AutoConfig.from_pretrained(path).id2label
+        self.max_length = max_length
+
+    def _logits(self, *texts: List[str]):
+        import numpy as np
+
+        encoded = self.tokenizer(*texts, padding=True, truncation=True,
+                                 max_length=self.max_length, return_tensors="np")
+        feeds = {name: value.astype(np.int64) for name, value in encoded.items()
+                 if name in self.input_names}
+        return self.session.run(["logits"], feeds)[0]
+
+    @staticmethod
+    def _softmax(logits):
+        import numpy as np
+
+        exponents = np.exp(logits - logits.max(axis=-1, keepdims=True))
+        return exponents / exponents.sum(axis=-1, keepdims=True)
+
+    def __call__(self, texts, batch_size: Optional[int] = None, **kwargs):
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        batch_size = batch_size or len(texts)
+
+        results: List[Dict[str, Any]] = []
+        for start in range(0, len(texts), batch_size):
+            for row in self._softmax(self._logits(texts[start:start + batch_size])):
+                index = int(row.argmax())
+                results.append({"label": self.id2label[index], "score": float(row[index])})
+        return results[0] if single else results
+
+
+class OnnxZeroShotClassifier(OnnxTextClassifier):
+    """NLI-based zero-shot classification, mirroring the transformers pipeline.
+
+    Each text is paired with one hypothesis per candidate label and the
+    entailment logits are normalized across labels.
+    """
+
+    def __init__(self, path: str, model_file: str, max_length: int = 256):
+        super().__init__(path, model_file, max_length)
+        self.entailment_id = next(
+            (index for index, label in self.id2label.items() if label.lower().startswith("entail")),
+            len(self.id2label) - 1
+        )
+
+    def __call__(self, texts, candidate_labels: List[str], batch_size: Optional[int] = None,
+                 hypothesis_template: str = "This example is {}.", **kwargs):
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        batch_size = batch_size or len(texts)
+        hypotheses = [hypothesis_template.format(label) for label in candidate_labels]
+
+        results: List[Dict[str, Any]] = []
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            premises = [text for text in batch for _ in hypotheses]
+            logits = self._logits(premises, hypotheses * len(batch))
+            entailment = logits[:, self.entailment_id].reshape(len(batch), len(hypotheses))
+            for text, scores in zip(batch, self._softmax(entailment)):
+                order = scores.argsort()[::-1]
+                results.append({
+                    "sequence": text,
+                    "labels": [candidate_labels[i] for i in order],
+                    "scores": [float(scores[i]) for i in order],
+                })
+        return results[0] if single else results
@@ -0,0 +1,80 @@
+from collections import deque
+from typing import Callable, Deque, List, Optional, Tuple
+
+from config.settings import settings
+from utils.response_cache import LocalTTLCache
+
+# Session history entries are "User: ..." / "Bot: ..." strings
+_SPEAKER_PREFIXES = ("User: ", "Bot: ")
+
+
+def _strip_speaker(turn: str) -> str:
+    for prefix in _SPEAKER_PREFIXES:
+        if turn.startswith(prefix):
+            return turn[len(prefix):]
+    return turn
+
+
+class ConversationWindow:
+    """Recent turns of one conversation, kept as cached token ids.
+
+    Each turn is tokenized once (with the model's EOS separator appended,
+    as DialoGPT expects) when it enters the window; building a prompt only
+    concatenates the cached ids of as many recent turns as fit the budget.
+    """
+
+    def __init__(self, max_turns: Optional[int] = None):
+        self.turns: Deque[Tuple[str, List[int]]] = deque(
+            maxlen=max_turns or settings.GENERATION_WINDOW_TURNS
+        )
+
+    def append(self, history_entry: str, token_ids: List[int]):
+        self.turns.append((history_entry, token_ids))
+
+    def sync(self, history: List[str], encode: Callable[[str], List[int]]):
+        # Catch up with turns recorded elsewhere (rule-based or GPT replies,
+        # another worker); only turns not already in the window are encoded
+        if not history or (self.turns and self.turns[-1][0] == history[-1]):
+            return
+        start = 0
+        if self.turns:
+            last = self.turns[-1][0]
+            for index in range(len(history) - 1, -1, -1):
+                if history[index] == last:
+                    start = index + 1
+                    break
+            else:
+                self.turns.clear()
+        for entry in history[max(start, len(history) - self.turns.maxlen):]:
+            self.turns.append((entry, encode(_strip_speaker(entry))))
+
+    def build(self, message_ids: List[int], max_tokens: int) -> List[int]:
+        if len(message_ids) >= max_tokens:
+            return message_ids[-max_tokens:]
+        parts = [message_ids]
+        total = len(message_ids)
+        for _, token_ids in reversed(self.turns):
+            if total + len(token_ids) > max_tokens:
+                break
+            parts.append(token_ids)
+            total += len(token_ids)
+        return [token_id for part in reversed(parts) for token_id in part]
+
+
+class ConversationWindows:
+    """Per-process cache of conversation windows, evicted like sessions."""
+
+    def __init__(self, max_sessions: Optional[int] = None, idle_ttl: Optional[float] = None):
+        self._windows = LocalTTLCache(max_sessions or settings.SESSION_MAX_SESSIONS,
+                                      idle_ttl or settings.SESSION_IDLE_TTL)
+
+    def get(self, session_id: str) -> ConversationWindow:
+        window = self._windows.get(session_id)
+        if window is None:
+            window = ConversationWindow()
+        # Re-set on every access so the idle TTL counts from the last turn
+        self._windows.set(session_id, window)
+        return window
+
+    def __len__(self) -> int:
+        return len(self._windows)
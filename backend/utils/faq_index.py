@@ -0,0 +1,554 @@
+"""BM25 lookup of FAQ answers over an inverted index of question text.
+
+The index is built from a FAQ catalog (JSON or YAML list of entries with
+``question``, ``answer`` and optional ``id`` and ``alternatives``):
+
+    python -m utils.faq_index build --catalog config/faq.json --output models/faq_index/
+
+Postings are stored term-major (CSC layout: ``indptr``, ``doc_ids``,
+``tf``) as ``.npy`` files and loaded with ``np.load(mmap_mode="r")``, so
+startup does not re-tokenize the catalog and every worker process shares
+the same pages. Each build writes a new directory under ``versions/`` and
+publishes it by atomically replacing the ``CURRENT`` pointer file, so a
+reader always sees the arrays and metadata of one build. Builds take a
+lock file, so concurrent workers build at most once per catalog change
+(the multi-worker launcher builds before forking).
+
+Entries added or removed later go to an append-only journal next to the
+index. Every worker replays the journal on top of the memory-mapped
+postings, with no rebuild:
+
+    python -m utils.faq_index add --entries new_faqs.json
+    python -m utils.faq_index remove --id shipping-times
+    python -m utils.faq_index compact      # fold the journal into the index
+"""
+import argparse
+import fcntl
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import shutil
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+METADATA_FILE = "index.json"
+JOURNAL_FILE = "updates.jsonl"
+CURRENT_FILE = "CURRENT"
+LOCK_FILE = ".lock"
+VERSIONS_DIR = "versions"
+# The published build and the one before it, which readers may still be loading
+KEEP_VERSIONS = 2
+ARRAY_FILES = ("indptr", "doc_ids", "tf", "doc_len", "doc_terms", "rows")
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a am an and are be can cant could did didnt do does doesnt dont for from "
+    "get got had has hasnt have how i im in is isnt it its me my of on or "
+    "please should still the there this to was what whats when where which "
+    "who why will with would yet you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    terms = []
+    # Contractions collapse to one token ("hasn't" -> "hasnt")
+    for token in _TOKEN.findall(text.lower().replace("'", "").replace("\u2019", "")):
+        if len(token) < 2 or token in STOPWORDS:
+            continue
+        # Cheap plural folding ("passwords" -> "password"), no full stemmer
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        terms.append(token)
+    return terms
+
+
+def normalize_entry(entry: Dict[str, Any]) -> Dict[str, Any]:
+    question = str(entry.get("question") or "").strip()
+    answer = str(entry.get("answer") or "").strip()
+    if not question or not answer:
+        raise ValueError(f"FAQ entry needs a question and an answer: {entry!r}")
+    entry_id = entry.get("id") or hashlib.sha1(question.lower().encode("utf-8")).hexdigest()[:12]
+    return {
+        "id": str(entry_id),
+        "question": question,
+        "answer": answer,
+        "alternatives": [str(text) for text in entry.get("alternatives", []) if text],
+    }
+
+
+def load_catalog(path: str) -> List[Dict[str, Any]]:
+    # [{"id": ..., "question": ..., "alternatives": [...], "answer": ...}, ...]
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            import yaml
+
+            catalog = yaml.safe_load(f)
+        else:
+            catalog = json.load(f)
+    return [normalize_entry(entry) for entry in catalog or []]
+
+
+def _documents(entry: Dict[str, Any]) -> List[Counter]:
+    # Each phrasing of the question is its own document
+    return [Counter(tokenize(text)) for text in [entry["question"], *entry["alternatives"]]]
+
+
+@contextmanager
+def index_lock(path: str) -> Iterator[None]:
+    # Serializes builds and compactions across processes; not re-entrant
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, LOCK_FILE), "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def current_version(path: str) -> Optional[str]:
+    try:
+        with open(os.path.join(path, CURRENT_FILE), "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def version_path(path: str, version: str) -> str:
+    return os.path.join(path, VERSIONS_DIR, version)
+
+
+def _publish(output_path: str, version: str):
+    pointer = os.path.join(output_path, CURRENT_FILE)
+    with open(f"{pointer}.{os.getpid()}.tmp", "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(f"{pointer}.{os.getpid()}.tmp", pointer)
+
+    versions = sorted(os.listdir(os.path.join(output_path, VERSIONS_DIR)))
+    for old in versions[:-KEEP_VERSIONS]:
+        if old != version:
+            shutil.rmtree(version_path(output_path, old), ignore_errors=True)
+
+
+def write_index(entries: List[Dict[str, Any]], output_path: str,
+                catalog_sha256: Optional[str] = None) -> Dict[str, Any]:
+    """Writes a new index version and publishes it; the caller holds ``index_lock``."""
+    vocab: Dict[str, int] = {}
+    term_ids, doc_ids, tfs, lengths, distinct, rows = [], [], [], [], [], []
+    for entry_index, entry in enumerate(entries):
+        for counts in _documents(entry):
+            doc = len(lengths)
+            for term, count in counts.items():
+                term_ids.append(vocab.setdefault(term, len(vocab)))
+                doc_ids.append(doc)
+                tfs.append(count)
+            lengths.append(sum(counts.values()))
+            distinct.append(len(counts))
+            rows.append(entry_index)
+
+    # Stable sort by term keeps each posting list in document order
+    term_ids = np.asarray(term_ids, dtype=np.int32)
+    order = np.argsort(term_ids, kind="stable")
+    arrays = {
+        "indptr": np.concatenate([[0], np.cumsum(np.bincount(term_ids, minlength=len(vocab)))])
+                    .astype(np.int64),
+        "doc_ids": np.asarray(doc_ids, dtype=np.int32)[order],
+        "tf": np.asarray(tfs, dtype=np.float32)[order],
+        "doc_len": np.asarray(lengths, dtype=np.float32),
+        "doc_terms": np.asarray(distinct, dtype=np.float32),
+        "rows": np.asarray(rows, dtype=np.int32),
+    }
+    metadata = {
+        "catalog_sha256": catalog_sha256,
+        "built_at": time.time(),
+        "documents": len(lengths),
+        "vocab": list(vocab),
+        "entries": entries,
+    }
+
+    # A fresh directory per build (zero-padded time sorts by age), published
+    # only once every file is complete
+    version = f"{time.time_ns():020d}-{os.getpid()}"
+    build_path = version_path(output_path, version)
+    os.makedirs(build_path)
+    for name, array in arrays.items():
+        np.save(os.path.join(build_path, f"{name}.npy"), array)
+    with open(os.path.join(build_path, METADATA_FILE), "w", encoding="utf-8") as f:
+        json.dump(metadata, f)
+    _publish(output_path, version)
+    return metadata
+
+
+def catalog_sha256(catalog_path: str) -> str:
+    with open(catalog_path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _build(catalog_path: str, output_path: str, catalog_hash: str) -> Dict[str, Any]:
+    # A repeated id replaces the earlier entry, as it would through the journal
+    entries = list({entry["id"]: entry for entry in load_catalog(catalog_path)}.values())
+    return write_index(entries, output_path, catalog_hash)
+
+
+def build_index(catalog_path: str, output_path: str) -> Dict[str, Any]:
+    with index_lock(output_path):
+        return _build(catalog_path, output_path, catalog_sha256(catalog_path))
+
+
+def ensure_index(catalog_path: str, output_path: str) -> Optional[Dict[str, Any]]:
+    """Builds the index unless the published one was built from this catalog.
+
+    Returns the new metadata, or None when the index was already current.
+    Whoever takes the lock first builds; the others find it done.
+    """
+    catalog_hash = catalog_sha256(catalog_path)
+    with index_lock(output_path):
+        version = current_version(output_path)
+        if version is not None:
+            try:
+                with open(os.path.join(version_path(output_path, version), METADATA_FILE),
+                          "r", encoding="utf-8") as f:
+                    if json.load(f).get("catalog_sha256") == catalog_hash:
+                        return None
+            except (OSError, ValueError) as e:
+                logger.warning(f"Rebuilding unreadable FAQ index {version}: {str(e)}")
+        return _build(catalog_path, output_path, catalog_hash)
+
+
+def append_journal(path: str, op: Dict[str, Any]):
+    # One short line per write; O_APPEND keeps concurrent writers from interleaving
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, JOURNAL_FILE), "a", encoding="utf-8") as f:
+        f.write(json.dumps(op) + "\n")
+
+
+class _IndexState:
+    """Memory-mapped postings plus the journal entries applied on top of them."""
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, METADATA_FILE), "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+                  for name in ARRAY_FILES}
+        self.indptr = arrays["indptr"]
+        self.doc_ids = arrays["doc_ids"]
+        self.tf = arrays["tf"]
+        self.base_terms = len(self.indptr) - 1
+        self.doc_len = arrays["doc_len"]
+        self.doc_terms = arrays["doc_terms"]
+        self.rows = arrays["rows"]
+        self.catalog_sha256 = metadata.get("catalog_sha256")
+        self.vocab = {term: index for index, term in enumerate(metadata["vocab"])}
+        self.entries: List[Optional[Dict[str, Any]]] = list(metadata["entries"])
+        self.by_id = {entry["id"]: index for index, entry in enumerate(self.entries)}
+        self.alive = np.ones(len(self.rows), dtype=bool)
+        self.deleted = 0
+        self.total_len = float(self.doc_len.sum())
+        self._length_norm: Optional[Tuple[Tuple[float, float, int], np.ndarray]] = None
+        # term id -> (doc ids, term frequencies) for documents added since the build
+        self.delta: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        self.journal_offset = 0
+
+    @property
+    def documents(self) -> int:
+        return len(self.rows)
+
+    @property
+    def live_entries(self) -> int:
+        return len(self.by_id)
+
+    def postings(self, term_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        if term_id < self.base_terms:
+            start, end = self.indptr[term_id], self.indptr[term_id + 1]
+            docs, tfs = self.doc_ids[start:end], self.tf[start:end]
+            if term_id not in self.delta:
+                return docs, tfs
+            delta_docs, delta_tfs = self.delta[term_id]
+            return np.concatenate([docs, delta_docs]), np.concatenate([tfs, delta_tfs])
+        return self.delta[term_id]
+
+    def add(self, entry: Dict[str, Any]):
+        self.remove(entry["id"])
+        entry_index = len(self.entries)
+        self.entries.append(entry)
+        self.by_id[entry["id"]] = entry_index
+        lengths, distinct = [], []
+        for counts in _documents(entry):
+            doc = self.documents + len(lengths)
+            for term, count in counts.items():
+                term_id = self.vocab.setdefault(term, len(self.vocab))
+                docs, tfs = self.delta.get(term_id, (np.empty(0, np.int32), np.empty(0, np.float32)))
+                self.delta[term_id] = (np.append(docs, np.int32(doc)),
+                                       np.append(tfs, np.float32(count)))
+            lengths.append(sum(counts.values()))
+            distinct.append(len(counts))
+        self.doc_len = np.concatenate([self.doc_len, np.asarray(lengths, dtype=np.float32)])
+        self.doc_terms = np.concatenate([self.doc_terms, np.asarray(distinct, dtype=np.float32)])
+        self.rows = np.concatenate([self.rows, np.full(len(lengths), entry_index, dtype=np.int32)])
+        self.alive = np.concatenate([self.alive, np.ones(len(lengths), dtype=bool)])
+        self.total_len += sum(lengths)
+
+    def remove(self, entry_id: str) -> bool:
+        entry_index = self.by_id.pop(entry_id, None)
+        if entry_index is None:
+            return False
+        # Deleted documents keep counting towards idf and avgdl until the next compaction
+        removed = self.rows == entry_index
+        self.alive[removed] = False
+        self.deleted += int(removed.sum())
+        self.entries[entry_index] = None
+        return True
+
+    def length_norm(self, k1: float, b: float) -> np.ndarray:
+        # BM25's per-document k1 * (1 - b + b * len / avgdl), kept until the
+        # parameters or the document count change
+        key = (k1, b, self.documents)
+        if self._length_norm is None or self._length_norm[0] != key:
+            avgdl = self.total_len / self.documents if self.documents and self.total_len else 1.0
+            norm = (k1 * (1.0 - b + b * np.asarray(self.doc_len) / avgdl)).astype(np.float32)
+            self._length_norm = (key, norm)
+        return self._length_norm[1]
+
+    def apply(self, op: Dict[str, Any]):
+        if op.get("op") == "add":
+            for entry in op.get("entries", []):
+                self.add(normalize_entry(entry))
+        elif op.get("op") == "remove":
+            for entry_id in op.get("ids", []):
+                self.remove(str(entry_id))
+
+    def live(self) -> List[Dict[str, Any]]:
+        return [entry for entry in self.entries if entry is not None]
+
+
+class FAQIndex:
+    """Best-matching FAQ entry for a message, scored with BM25.
+
+    Only the posting lists of the query's terms are touched: their scores
+    are accumulated with one ``np.bincount`` over the candidate documents,
+    so a lookup stays well under a millisecond for tens of thousands of
+    entries. BM25 is normalized by the query's total idf, which gives the
+    share of the query the question covers (terms the index has never
+    seen count against it). That is multiplied by the share of the
+    question's own terms the query matched, so "what time is it" does not
+    fully match "delivery time". Questions matching fewer than
+    ``FAQ_MIN_MATCHED_TERMS`` query terms score 0. An exact rephrasing
+    scores close to 1.0, so one threshold works for short and long
+    questions alike.
+
+    The index files and the journal are re-checked at most every
+    ``reload_interval`` seconds: a rebuilt index is swapped in, and journal
+    lines written since the last check are applied in place.
+    """
+
+    def __init__(self, path: str, catalog_path: Optional[str] = None,
+                 reload_interval: Optional[float] = None):
+        self.path = path
+        self.catalog_path = catalog_path
+        self.reload_interval = (settings.FAQ_RELOAD_INTERVAL
+                                if reload_interval is None else reload_interval)
+        self._state: Optional[_IndexState] = None
+        self._version: Optional[float] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.reload_if_changed(force=True)
+        self._ensure_built()
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._state is not None
+
+    def __len__(self) -> int:
+        return self._state.live_entries if self._state else 0
+
+    def _ensure_built(self):
+        # Built from the catalog on first start and whenever the catalog changes
+        # (or the files on disk cannot be loaded); otherwise the files are only mapped
+        if not self.catalog_path or not os.path.exists(self.catalog_path):
+            return
+        try:
+            if self._state is not None and \
+                    self._state.catalog_sha256 == catalog_sha256(self.catalog_path):
+                return
+            metadata = ensure_index(self.catalog_path, self.path)
+            if metadata is not None:
+                logger.info(f"Built FAQ index at {self.path} ({len(metadata['entries'])} entries)")
+        except Exception as e:
+            logger.warning(f"Could not build FAQ index from {self.catalog_path}: {str(e)}")
+            return
+        self.reload_if_changed(force=True)
+
+    def _current_version(self) -> Optional[str]:
+        return current_version(self.path)
+
+    def reload_if_changed(self, force: bool = False):
+        # The published version name changes with every build or compaction
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.reload_interval:
+            return
+        with self._lock:
+            self._checked_at = now
+            version = self._current_version()
+            if version is None:
+                return
+            try:
+                if version != self._version:
+                    state = _IndexState(version_path(self.path, version))
+                    self._replay_journal(state)
+                    # A single reference swap keeps concurrent searches on a consistent state
+                    self._state = state
+                    self._version = version
+                    logger.info(f"Loaded FAQ index from {self.path} ({len(state.by_id)} entries, "
+                                f"{len(state.vocab)} terms)")
+                elif self._state is not None:
+                    self._replay_journal(self._state)
+            except Exception as e:
+                logger.warning(f"Could not load FAQ index: {str(e)}")
+
+    def _replay_journal(self, state: _IndexState):
+        journal_path = os.path.join(self.path, JOURNAL_FILE)
+        if not os.path.exists(journal_path) or os.path.getsize(journal_path) <= state.journal_offset:
+            return
+        with open(journal_path, "rb") as f:
+            f.seek(state.journal_offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Still being written; picked up on the next check
+                    break
+                state.journal_offset += len(line)
+                if line.strip():
+                    state.apply(json.loads(line))
+
+    def add(self, entries: List[Dict[str, Any]]) -> List[str]:
+        """Adds or replaces entries (by id) without rebuilding the index."""
+        entries = [normalize_entry(entry) for entry in entries]
+        if self._current_version() is None:
+            with index_lock(self.path):
+                if self._current_version() is None:
+                    write_index([], self.path)
+        append_journal(self.path, {"op": "add", "entries": entries})
+        self.reload_if_changed(force=True)
+        return [entry["id"] for entry in entries]
+
+    def remove(self, entry_ids: List[str]):
+        append_journal(self.path, {"op": "remove", "ids": [str(entry_id) for entry_id in entry_ids]})
+        self.reload_if_changed(force=True)
+
+    def compact(self) -> Dict[str, Any]:
+        """Rewrites the index with the journal folded in, then empties the journal.
+
+        Meant for an offline step (CLI or deploy), not while other
+        processes are writing to the journal.
+        """
+        with index_lock(self.path):
+            self.reload_if_changed(force=True)
+            state = self._state
+            if state is None:
+                raise RuntimeError(f"No FAQ index at {self.path}")
+            # Keeps the catalog hash so the compacted index is not rebuilt on the next start
+            metadata = write_index(state.live(), self.path, state.catalog_sha256)
+            # Readers that load the new version before this replay the old
+            # journal on top of it, which is harmless: adds replace by id
+            open(os.path.join(self.path, JOURNAL_FILE), "w").close()
+        self.reload_if_changed(force=True)
+        return metadata
+
+    def search(self, text: str) -> Optional[Dict[str, Any]]:
+        self.reload_if_changed()
+        state = self._state
+        if state is None or not state.by_id:
+            return None
+        terms = set(tokenize(text))
+        if not terms:
+            return None
+
+        k1 = settings.FAQ_BM25_K1
+        documents = state.documents
+        length_norm = state.length_norm(k1, settings.FAQ_BM25_B)
+        query_weight = 0.0
+        doc_parts, weight_parts = [], []
+        for term in terms:
+            term_id = state.vocab.get(term)
+            docs, tfs = state.postings(term_id) if term_id is not None else ((), ())
+            df = len(docs)
+            idf = math.log(1.0 + (documents - df + 0.5) / (df + 0.5))
+            query_weight += idf
+            if df:
+                doc_parts.append(docs)
+                weight_parts.append(idf * (k1 + 1.0) * tfs / (tfs + length_norm[docs]))
+        if not doc_parts:
+            return None
+
+        docs = np.concatenate(doc_parts)
+        matched = np.bincount(docs)
+        candidates = np.flatnonzero(matched >= max(settings.FAQ_MIN_MATCHED_TERMS, 1))
+        if state.deleted:
+            candidates = candidates[state.alive[candidates]]
+        if not len(candidates):
+            return None
+        bm25 = np.bincount(docs, np.concatenate(weight_parts))[candidates]
+        scores = (np.minimum(bm25 / query_weight, 1.0) * matched[candidates]
+                  / np.maximum(state.doc_terms[candidates], 1.0))
+        position = int(scores.argmax())
+        best = int(candidates[position])
+        entry = state.entries[state.rows[best]]
+        return {
+            "id": entry["id"],
+            "question": entry["question"],
+            "answer": entry["answer"],
+            "score": float(scores[position]),
+            "matched_terms": int(matched[best]),
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        state = self._state
+        return {
+            "loaded": state is not None,
+            "entries": state.live_entries if state else 0,
+            "documents": state.documents if state else 0,
+            "terms": len(state.vocab) if state else 0,
+            "journal_terms": len(state.delta) if state else 0,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and update the FAQ index")
+    parser.add_argument("command", choices=["build", "add", "remove", "compact"])
+    parser.add_argument("--catalog", default=settings.FAQ_CATALOG_PATH)
+    parser.add_argument("--output", default=settings.FAQ_INDEX_PATH)
+    parser.add_argument("--entries", help="JSON/YAML file of entries to add")
+    parser.add_argument("--id", action="append", default=[], help="Entry id to remove")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "build":
+        metadata = build_index(args.catalog, args.output)
+        logger.info(f"Wrote {len(metadata['entries'])} entries "
+                    f"({metadata['documents']} questions) to {args.output}")
+        return
+
+    index = FAQIndex(args.output, reload_interval=0.0)
+    if args.command == "add":
+        ids = index.add(load_catalog(args.entries))
+        logger.info(f"Added {len(ids)} entries to the journal at {args.output}")
+    elif args.command == "remove":
+        index.remove(args.id)
+        logger.info(f"Removed {len(args.id)} entries via the journal at {args.output}")
+    else:
+        metadata = index.compact()
+        logger.info(f"Compacted {args.output} to {len(metadata['entries'])} entries")
+
+
+if __name__ == "__main__":
+    main()
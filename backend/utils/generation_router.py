@@ -0,0 +1,176 @@
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.settings import settings
+from utils.batching import BatchScheduler
+from utils.inference import inference_executor
+from utils.llm_client import LLMClient
+from utils.metrics import LatencyHistogram
+from utils.model_registry import model_registry
+from utils.tracing import LabelledCounter
+
+logger = logging.getLogger(__name__)
+
+ROUTE_DECISIONS = LabelledCounter(
+    "chatbot_generation_route_total",
+    "Backend chosen for each reply, and why",
+    ["backend", "reason"]
+)
+ROUTE_SKIPS = LabelledCounter(
+    "chatbot_generation_skip_total",
+    "Generation backends passed over while routing, by reason",
+    ["backend", "reason"]
+)
+
+
+class BackendStats:
+    """Live latency and error estimates for one generation backend."""
+
+    def __init__(self):
+        self.latency: Optional[float] = None   # EWMA, seconds
+        self.error_rate = 0.0                  # EWMA of failures
+        self.last_failure = 0.0
+        self.last_sample = 0.0
+        self.histogram = LatencyHistogram()
+        self.calls = 0
+        self.failures = 0
+
+    def record(self, duration: float, ok: bool):
+        alpha = settings.GENERATION_LATENCY_EWMA_ALPHA
+        self.calls += 1
+        if ok:
+            self.latency = duration if self.latency is None else \
+                self.latency + alpha * (duration - self.latency)
+            self.last_sample = time.monotonic()
+            self.histogram.record(duration)
+        else:
+            self.failures += 1
+            self.last_failure = time.monotonic()
+        self.error_rate += alpha * ((0.0 if ok else 1.0) - self.error_rate)
+
+    def estimate(self) -> Optional[float]:
+        # A backend judged too slow is no longer routed to, so it produces no
+        # new samples; the estimate halves every GENERATION_LATENCY_HALF_LIFE_SECONDS
+        # without one, until the backend fits the budget again and is re-measured
+        if self.latency is None:
+            return None
+        half_life = settings.GENERATION_LATENCY_HALF_LIFE_SECONDS
+        if half_life <= 0:
+            return self.latency
+        return self.latency * 0.5 ** ((time.monotonic() - self.last_sample) / half_life)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "latency_ewma": self.latency,
+            "error_rate": self.error_rate,
+            "latency": self.histogram.summary(),
+        }
+
+
+class GenerationRouter:
+    """Picks the generation backend per request from live stats and the time budget.
+
+    Backends in ``GENERATION_TIERS`` are tried in order. One is skipped when
+    it is unusable: GPT's circuit is open, or the local model is not loaded
+    or its executor is saturated. It is also skipped while its recent error
+    rate is high, or when its expected latency does not fit the request
+    deadline. Without a deadline nothing is dropped for being slow: backends
+    expected to exceed ``GENERATION_SLO_MS`` are only tried after the ones
+    that fit it. Expected latency is the EWMA scaled by the current backlog;
+    it decays while a backend gets no traffic, so one slow spell does not
+    keep a backend out for good. A templated answer always ends the plan.
+    """
+
+    def __init__(self, generation_batcher: BatchScheduler, llm_client: Optional[LLMClient] = None):
+        self.generation_batcher = generation_batcher
+        self.llm_client = llm_client
+        self.backends = {name: BackendStats() for name in ("gpt", "dialogpt")}
+
+    @staticmethod
+    def deadline_for(timeout_ms: Optional[float]) -> Optional[float]:
+        # Wall-clock, so it stays meaningful inside process-pool workers
+        return time.time() + float(timeout_ms) / 1000.0 if timeout_ms else None
+
+    @staticmethod
+    def remaining(deadline: Optional[float]) -> Optional[float]:
+        return None if deadline is None else deadline - time.time()
+
+    def expected_latency(self, backend: str) -> float:
+        latency = self.backends[backend].estimate()
+        if latency is None:
+            return 0.0
+        if backend == "dialogpt":
+            # Work already queued ahead of us, in units of full batches
+            backlog = (self.generation_batcher.queue_depth
+                       + inference_executor.pending("generation"))
+            return latency * (1.0 + backlog / self.generation_batcher.max_batch_size)
+        return latency
+
+    def _skip_reason(self, backend: str, budget: float) -> Optional[str]:
+        if backend == "gpt":
+            if self.llm_client is None:
+                return "disabled"
+            if self.llm_client.breaker.state == "open":
+                return "circuit_open"
+        elif backend == "dialogpt":
+            if not model_registry.is_available("generation"):
+                return "unavailable"
+            if inference_executor.is_saturated("generation"):
+                return "saturated"
+        else:
+            return "unknown"
+
+        stats = self.backends[backend]
+        if (stats.error_rate > settings.GENERATION_MAX_ERROR_RATE
+                and time.monotonic() - stats.last_failure < settings.GENERATION_ERROR_COOLDOWN_SECONDS):
+            return "error_rate"
+        if self.expected_latency(backend) > budget:
+            return "over_budget"
+        return None
+
+    def plan(self, deadline: Optional[float]) -> List[Tuple[str, str]]:
+        """Ordered (backend, reason) attempts for one reply; always ends with "template".
+
+        The reason is "preferred" when no earlier tier was skipped or demoted,
+        otherwise why the first such tier was passed over (e.g. "circuit_open").
+        """
+        remaining = self.remaining(deadline)
+        budget = remaining if remaining is not None else settings.GENERATION_SLO_MS / 1000.0
+        plan = []
+        # Over the SLO with no client deadline: still worth waiting for, just last
+        slow = []
+        first_skip = None
+        for backend in settings.GENERATION_TIERS:
+            reason = self._skip_reason(backend, budget)
+            if reason is None:
+                plan.append((backend, first_skip or "preferred"))
+            elif reason == "over_budget" and deadline is None:
+                slow.append(backend)
+                first_skip = first_skip or reason
+            elif reason != "disabled":
+                # An unconfigured backend is not a routing decision
+                ROUTE_SKIPS.inc(backend=backend, reason=reason)
+                first_skip = first_skip or reason
+        plan.extend((backend, first_skip) for backend in slow)
+        plan.append(("template", first_skip or "exhausted"))
+        return plan
+
+    def record(self, backend: str, duration: float, ok: bool):
+        if backend in self.backends:
+            self.backends[backend].record(duration, ok)
+
+    def chose(self, backend: str, reason: str):
+        ROUTE_DECISIONS.inc(backend=backend, reason=reason)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "tiers": list(settings.GENERATION_TIERS),
+            "slo_ms": settings.GENERATION_SLO_MS,
+            "backends": {name: {**stats.to_dict(), "expected_latency": self.expected_latency(name)}
+                         for name, stats in self.backends.items()},
+            "routes": [{**labels, "count": count} for labels, count in ROUTE_DECISIONS.items()],
+            "skips": [{**labels, "count": count} for labels, count in ROUTE_SKIPS.items()],
+        }
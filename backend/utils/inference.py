@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Handlers are looked up by model name inside the pool. Process workers are
+# forked after services register them, so they inherit the loaded models.
+_handlers: Dict[str, Callable] = {}
+
+
+def _invoke(model: str, *args):
+    return _handlers[model](*args)
+
+
+class InferenceBusyError(Exception):
+    pass
+
+
+class InferenceExecutor:
+    """Runs blocking model calls off the event loop.
+
+    Each model has its own concurrency limit and a bounded number of callers
+    allowed to wait behind it; beyond that ``run`` fails fast with
+    ``InferenceBusyError`` instead of queueing without bound. Handlers that
+    drive the same model (e.g. batched and streamed generation) register
+    with a shared ``resource`` so they count against one limit.
+    """
+
+    def __init__(self, mode: Optional[str] = None, max_workers: Optional[int] = None):
+        self.mode = mode or settings.INFERENCE_EXECUTOR
+        if self.mode not in ("thread", "process"):
+            raise ValueError(f"Unknown inference executor mode: {self.mode}")
+        self.max_workers = max_workers or settings.INFERENCE_MAX_WORKERS
+        self._pool: Optional[Executor] = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._pending: Dict[str, int] = {}
+        # Handler name -> the model whose limit it counts against
+        self._resources: Dict[str, str] = {}
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    def register(self, model: str, handler: Callable, resource: Optional[str] = None):
+        _handlers[model] = handler
+        self._resources[model] = resource or model
+        self.stats.setdefault(model, {"calls": 0, "rejected": 0, "errors": 0})
+
+    def _resource(self, model: str) -> str:
+        return self._resources.get(model, model)
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            if self.mode == "process":
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("fork")
+                )
+            else:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="inference"
+                )
+        return self._pool
+
+    def _limit(self, model: str) -> int:
+        return settings.INFERENCE_MODEL_CONCURRENCY.get(self._resource(model), 1)
+
+    def _get_semaphore(self, model: str) -> asyncio.Semaphore:
+        resource = self._resource(model)
+        if resource not in self._semaphores:
+            self._semaphores[resource] = asyncio.Semaphore(self._limit(resource))
+        return self._semaphores[resource]
+
+    def pending(self, model: str) -> int:
+        return self._pending.get(self._resource(model), 0)
+
+    def is_saturated(self, model: str) -> bool:
+        return self.pending(model) >= self._limit(model) + settings.INFERENCE_MAX_PENDING
+
+    async def run(self, model: str, *args) -> Any:
+        if model not in _handlers:
+            raise KeyError(f"No inference handler registered for '{model}'")
+
+        stats = self.stats[model]
+        if self.is_saturated(model):
+            stats["rejected"] += 1
+            raise InferenceBusyError(f"Inference for '{model}' is saturated")
+
+        resource = self._resource(model)
+        self._pending[resource] = self._pending.get(resource, 0) + 1
+        try:
+            async with self._get_semaphore(model):
+                stats["calls"] += 1
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._get_pool(), _invoke, model, *args)
+        except InferenceBusyError:
+            raise
+        except Exception:
+            stats["errors"] += 1
+            raise
+        finally:
+            self._pending[resource] -= 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "max_workers": self.max_workers,
+            "models": {
+                model: {
+                    **stats,
+                    "resource": self._resource(model),
+                    "pending": self.pending(model),
+                    "concurrency_limit": self._limit(model),
+                }
+                for model, stats in self.stats.items()
+            }
+        }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+# Global executor instance
+inference_executor = InferenceExecutor()
@@ -0,0 +1,103 @@
+import json
+import logging
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+PatternSpec = Union[str, Dict[str, Any]]
+
+
+class KeywordMatcher:
+    """Whole-word keyword matcher compiled into a single trie-shaped regex.
+
+    Patterns are grouped under labels (intents, sentiment polarities, ...)
+    with an optional weight. The text is scanned once regardless of how many
+    patterns are registered, matches respect word boundaries ("hi" does not
+    match "this"), and at any position the longest pattern wins.
+    """
+
+    def __init__(self):
+        self._patterns: Dict[str, Tuple[str, float]] = {}
+        self._priority: Dict[str, int] = {}
+        self._regex: Optional[re.Pattern] = None
+
+    def add(self, label: str, pattern: str, weight: float = 1.0):
+        pattern = " ".join(pattern.lower().split())
+        if not pattern:
+            return
+        if label not in self._priority:
+            # Labels registered first win ties
+            self._priority[label] = len(self._priority)
+        self._patterns[pattern] = (label, weight)
+        self._regex = None
+
+    def add_patterns(self, patterns: Dict[str, Iterable[PatternSpec]]):
+        for label, specs in patterns.items():
+            for spec in specs:
+                if isinstance(spec, str):
+                    self.add(label, spec)
+                else:
+                    self.add(label, spec["pattern"], float(spec.get("weight", 1.0)))
+
+    def load_file(self, path: str):
+        # JSON object: {"label": ["pattern", {"pattern": "...", "weight": 2.0}, ...]}
+        with open(path, "r", encoding="utf-8") as f:
+            self.add_patterns(json.load(f))
+        logger.info(f"Loaded keyword patterns from {path} ({len(self._patterns)} total)")
+
+    def __len__(self) -> int:
+        return len(self._patterns)
+
+    @property
+    def labels(self) -> List[str]:
+        return list(self._priority)
+
+    def compile(self):
+        if not self._patterns:
+            self._regex = None
+            return
+        trie: Dict[str, Any] = {}
+        for pattern in self._patterns:
+            node = trie
+            for char in pattern:
+                node = node.setdefault(char, {})
+            node[""] = True
+        # Lookarounds rather than \b, so patterns may start or end with "$", "+", ...
+        self._regex = re.compile(r"(?<!\w)(?:" + self._trie_to_regex(trie) + r")(?!\w)")
+
+    def _trie_to_regex(self, node: Dict[str, Any]) -> str:
+        terminal = "" in node
+        branches = []
+        for char in sorted(key for key in node if key):
+            branches.append(re.escape(char) + self._trie_to_regex(node[char]))
+
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if terminal:
+            # Greedy optional: prefer the longer pattern, fall back to this prefix
+            body = "(?:" + body + ")?"
+        return body
+
+    def find(self, text: str) -> List[Tuple[str, str]]:
+        if self._regex is None:
+            self.compile()
+            if self._regex is None:
+                return []
+        normalized = " ".join(text.lower().split())
+        return [(self._patterns[match][0], match)
+                for match in self._regex.findall(normalized)]
+
+    def scores(self, text: str) -> Dict[str, float]:
+        scores: Dict[str, float] = {}
+        for label, pattern in self.find(text):
+            scores[label] = scores.get(label, 0.0) + self._patterns[pattern][1]
+        return scores
+
+    def best(self, text: str) -> Optional[Tuple[str, float]]:
+        scores = self.scores(text)
+        if not scores:
+            return None
+        label = min(scores, key=lambda l: (-scores[l], self._priority[l]))
+        return label, scores[label]
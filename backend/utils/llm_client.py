@@ -0,0 +1,307 @@
+import asyncio
+import json
+import logging
+import random
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class LLMClientError(Exception):
+    pass
+
+
+class NonRetryableLLMError(LLMClientError):
+    pass
+
+
+class CircuitOpenError(LLMClientError):
+    pass
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures and lets one probe through after a cool-down."""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def release_probe(self):
+        # The call ended without telling us anything about the provider
+        self._probe_in_flight = False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+class LLMClient:
+    """Async client for an OpenAI-compatible chat completions API.
+
+    Connections are pooled and kept alive, in-flight requests are bounded by
+    a semaphore, retryable failures are retried with jittered exponential
+    backoff, and a circuit breaker makes callers fail fast (so they can fall
+    back to the local model) while the provider is unhealthy. Optionally a
+    second, hedged request is sent if the first is slow to answer.
+    """
+
+    def __init__(self, base_url: Optional[str] = None, api_key: Optional[str] = None,
+                 model: Optional[str] = None):
+        self.base_url = (base_url or settings.OPENAI_BASE_URL).rstrip("/")
+        self.api_key = api_key or settings.OPENAI_API_KEY
+        self.model = model or settings.OPENAI_MODEL
+        self.breaker = CircuitBreaker(settings.LLM_CIRCUIT_FAILURE_THRESHOLD,
+                                      settings.LLM_CIRCUIT_RESET_SECONDS)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.stats = {
+            "requests": 0,
+            "successes": 0,
+            "failures": 0,
+            "retries": 0,
+            "timeouts": 0,
+            "hedged": 0,
+            "circuit_rejections": 0,
+            "total_latency": 0.0,
+            "max_latency": 0.0,
+        }
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                timeout=httpx.Timeout(settings.LLM_TIMEOUT_SECONDS,
+                                      connect=settings.LLM_CONNECT_TIMEOUT_SECONDS),
+                limits=httpx.Limits(max_connections=settings.LLM_MAX_CONNECTIONS,
+                                    max_keepalive_connections=settings.LLM_MAX_CONNECTIONS)
+            )
+        return self._client
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+        return self._semaphore
+
+    def _payload(self, messages: List[Dict[str, str]], max_tokens: int,
+                 temperature: float, stream: bool = False) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "stream": stream
+        }
+
+    def _check_circuit(self):
+        if not self.breaker.allow():
+            self.stats["circuit_rejections"] += 1
+            raise CircuitOpenError("LLM provider circuit is open")
+
+    async def chat(self, messages: List[Dict[str, str]], max_tokens: int = 150,
+                   temperature: float = 0.7, timeout: Optional[float] = None) -> str:
+        payload = self._payload(messages, max_tokens, temperature)
+
+        for attempt in range(settings.LLM_MAX_RETRIES + 1):
+            self._check_circuit()
+            start_time = time.monotonic()
+            try:
+                if settings.LLM_HEDGE_ENABLED:
+                    data = await self._hedged_post(payload, timeout)
+                else:
+                    data = await self._post(payload, timeout)
+            except LLMClientError as e:
+                self._record_failure(e)
+                if isinstance(e, NonRetryableLLMError) or attempt == settings.LLM_MAX_RETRIES:
+                    raise
+                self.stats["retries"] += 1
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            except asyncio.CancelledError:
+                # The caller gave up (deadline, disconnect); that says nothing
+                # about the provider, but a half-open probe must be handed back
+                self.breaker.release_probe()
+                raise
+            except Exception as e:
+                self._record_failure(e)
+                raise
+
+            self._record_success(time.monotonic() - start_time)
+            return data["choices"][0]["message"]["content"].strip()
+
+    async def stream_chat(self, messages: List[Dict[str, str]], max_tokens: int = 150,
+                          temperature: float = 0.7,
+                          timeout: Optional[float] = None) -> AsyncIterator[str]:
+        # Retries only happen before the first token; after that errors propagate
+        payload = self._payload(messages, max_tokens, temperature, stream=True)
+
+        for attempt in range(settings.LLM_MAX_RETRIES + 1):
+            self._check_circuit()
+            start_time = time.monotonic()
+            emitted = False
+            try:
+                async with self._get_semaphore():
+                    self.stats["requests"] += 1
+                    async with self._get_client().stream(
+                        "POST", "/chat/completions", json=payload,
+                        timeout=self._timeout(timeout)
+                    ) as response:
+                        self._raise_for_status(response)
+                        async for line in response.aiter_lines():
+                            if not line.startswith("data:"):
+                                continue
+                            data = line[len("data:"):].strip()
+                            if data == "[DONE]":
+                                break
+                            delta = json.loads(data)["choices"][0].get("delta", {})
+                            content = delta.get("content")
+                            if content:
+                                emitted = True
+                                yield content
+            except httpx.TimeoutException as e:
+                error = self._timeout_error(e)
+            except httpx.TransportError as e:
+                error = LLMClientError(f"LLM transport error: {str(e)}")
+            except LLMClientError as e:
+                error = e
+            except (asyncio.CancelledError, GeneratorExit):
+                # Cancelled, or the consumer stopped reading early: not the
+                # provider's fault, but a half-open probe must be handed back
+                if emitted:
+                    self._record_success(time.monotonic() - start_time)
+                else:
+                    self.breaker.release_probe()
+                raise
+            except Exception as e:
+                self._record_failure(e)
+                raise
+            else:
+                self._record_success(time.monotonic() - start_time)
+                return
+
+            self._record_failure(error)
+            if (emitted or isinstance(error, NonRetryableLLMError)
+                    or attempt == settings.LLM_MAX_RETRIES):
+                raise error
+            self.stats["retries"] += 1
+            await asyncio.sleep(self._backoff(attempt))
+
+    async def _post(self, payload: Dict[str, Any], timeout: Optional[float]) -> Dict[str, Any]:
+        async with self._get_semaphore():
+            self.stats["requests"] += 1
+            try:
+                response = await self._get_client().post(
+                    "/chat/completions", json=payload, timeout=self._timeout(timeout)
+                )
+            except httpx.TimeoutException as e:
+                raise self._timeout_error(e)
+            except httpx.TransportError as e:
+                raise LLMClientError(f"LLM transport error: {str(e)}")
+        self._raise_for_status(response)
+        return response.json()
+
+    async def _hedged_post(self, payload: Dict[str, Any],
+                           timeout: Optional[float]) -> Dict[str, Any]:
+        # Send a second copy if the first hasn't answered within the hedge delay;
+        # the first successful answer wins and the other request is cancelled
+        tasks = [asyncio.create_task(self._post(payload, timeout))]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=settings.LLM_HEDGE_DELAY_MS / 1000.0)
+            if not done:
+                self.stats["hedged"] += 1
+                tasks.append(asyncio.create_task(self._post(payload, timeout)))
+
+            error: Optional[BaseException] = None
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def _timeout(self, timeout: Optional[float]) -> httpx.Timeout:
+        return httpx.Timeout(timeout or settings.LLM_TIMEOUT_SECONDS,
+                             connect=settings.LLM_CONNECT_TIMEOUT_SECONDS)
+
+    def _timeout_error(self, error: Exception) -> LLMClientError:
+        self.stats["timeouts"] += 1
+        return LLMClientError(f"LLM request timed out: {str(error) or type(error).__name__}")
+
+    def _raise_for_status(self, response: httpx.Response):
+        if response.status_code >= 400:
+            retryable = response.status_code in RETRYABLE_STATUS_CODES
+            error = LLMClientError(f"LLM provider returned HTTP {response.status_code}")
+            if not retryable:
+                # Client errors (bad key, bad request) won't improve on retry
+                raise NonRetryableLLMError(str(error))
+            raise error
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: uniform in [0, base * 2^attempt]
+        return random.uniform(0, settings.LLM_RETRY_BASE_DELAY_SECONDS * (2 ** attempt))
+
+    def _record_success(self, latency: float):
+        self.breaker.record_success()
+        self.stats["successes"] += 1
+        self.stats["total_latency"] += latency
+        self.stats["max_latency"] = max(self.stats["max_latency"], latency)
+
+    def _record_failure(self, error: BaseException):
+        self.breaker.record_failure()
+        self.stats["failures"] += 1
+        logger.warning(f"LLM request failed: {str(error) or type(error).__name__}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        successes = self.stats["successes"]
+        return {
+            **{k: v for k, v in self.stats.items() if k != "total_latency"},
+            "average_latency": self.stats["total_latency"] / successes if successes else 0.0,
+            "circuit_state": self.breaker.state,
+            "base_url": self.base_url,
+            "model": self.model
+        }
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
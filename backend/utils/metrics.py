@@ -0,0 +1,340 @@
+import hashlib
+import math
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# Latency histogram range and relative precision (HDR-style log buckets)
+_MIN_VALUE = 1e-4      # 0.1 ms
+_MAX_VALUE = 600.0     # 10 minutes
+_GROWTH = 1.05         # each bucket is 5% wider than the previous one
+_LOG_GROWTH = math.log(_GROWTH)
+_BUCKETS = int(math.ceil(math.log(_MAX_VALUE / _MIN_VALUE) / _LOG_GROWTH)) + 2
+
+
+class LatencyHistogram:
+    """Fixed-memory histogram with ~5% relative error on percentiles.
+
+    Bucket 0 holds values below 0.1 ms and the last bucket values above ten
+    minutes; everything in between lands in logarithmic buckets, so a
+    record is a single ``log`` and an increment.
+    """
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts: List[int] = [0] * _BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    @staticmethod
+    def _index(value: float) -> int:
+        if value < _MIN_VALUE:
+            return 0
+        return min(_BUCKETS - 1, 1 + int(math.log(value / _MIN_VALUE) / _LOG_GROWTH))
+
+    @staticmethod
+    def _upper_bound(index: int) -> float:
+        if index == 0:
+            return _MIN_VALUE
+        return _MIN_VALUE * _GROWTH ** index
+
+    def record(self, value: float):
+        self.counts[self._index(value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q / 100.0 * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if bucket_count and seen >= rank:
+                return min(self._upper_bound(index), self.max)
+        return self.max
+
+    def merge(self, other: "LatencyHistogram"):
+        for index, bucket_count in enumerate(other.counts):
+            if bucket_count:
+                self.counts[index] += bucket_count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.max,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        # Sparse encoding: only non-empty buckets
+        return {
+            "buckets": {str(i): c for i, c in enumerate(self.counts) if c},
+            "count": self.count,
+            "total": self.total,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LatencyHistogram":
+        histogram = cls()
+        for index, bucket_count in data["buckets"].items():
+            histogram.counts[int(index)] = bucket_count
+        histogram.count = data["count"]
+        histogram.total = data["total"]
+        histogram.max = data["max"]
+        return histogram
+
+    @classmethod
+    def from_counts(cls, counts: Dict[int, int], total: float) -> "LatencyHistogram":
+        # For bucket counts kept as plain counters (e.g. Redis); the max is
+        # only known to bucket precision
+        histogram = cls()
+        for index, bucket_count in counts.items():
+            if 0 <= index < _BUCKETS:
+                histogram.counts[index] = bucket_count
+        histogram.count = sum(histogram.counts)
+        histogram.total = total
+        if histogram.count:
+            top = max(index for index, count in enumerate(histogram.counts) if count)
+            histogram.max = cls._upper_bound(top)
+        return histogram
+
+
+class RollingWindow:
+    """Time-bucketed ring of histograms covering the last ``slots * width`` seconds."""
+
+    def __init__(self, width: float, slots: int):
+        self.width = width
+        self.slots = slots
+        self._epochs: List[int] = [-1] * slots
+        self._histograms: List[Optional[LatencyHistogram]] = [None] * slots
+        self._errors: List[int] = [0] * slots
+
+    def _slot(self, now: float) -> int:
+        epoch = int(now // self.width)
+        index = epoch % self.slots
+        if self._epochs[index] != epoch:
+            # The slot belongs to an older lap of the ring: recycle it
+            self._epochs[index] = epoch
+            self._histograms[index] = LatencyHistogram()
+            self._errors[index] = 0
+        return index
+
+    def record(self, value: float, error: bool = False, now: Optional[float] = None):
+        index = self._slot(time.time() if now is None else now)
+        self._histograms[index].record(value)
+        if error:
+            self._errors[index] += 1
+
+    def _live(self, now: float):
+        oldest = int(now // self.width) - self.slots + 1
+        for epoch, histogram, errors in zip(self._epochs, self._histograms, self._errors):
+            if histogram is not None and epoch >= oldest:
+                yield epoch, histogram, errors
+
+    def summary(self, now: Optional[float] = None) -> Dict[str, Any]:
+        now = time.time() if now is None else now
+        merged = LatencyHistogram()
+        errors = 0
+        for _, histogram, slot_errors in self._live(now):
+            merged.merge(histogram)
+            errors += slot_errors
+        span = self.width * self.slots
+        return {
+            **merged.summary(),
+            "errors": errors,
+            "error_rate": errors / merged.count if merged.count else 0.0,
+            "throughput_per_second": merged.count / span,
+        }
+
+    def to_dict(self, now: Optional[float] = None) -> Dict[str, Any]:
+        now = time.time() if now is None else now
+        return {
+            "width": self.width,
+            "slots": [[epoch, histogram.to_dict(), errors]
+                      for epoch, histogram, errors in self._live(now)],
+        }
+
+    def merge_dict(self, data: Dict[str, Any], now: Optional[float] = None):
+        now = time.time() if now is None else now
+        oldest = int(now // self.width) - self.slots + 1
+        for epoch, histogram, errors in data["slots"]:
+            if epoch < oldest:
+                continue
+            index = epoch % self.slots
+            if self._epochs[index] != epoch:
+                self._epochs[index] = epoch
+                self._histograms[index] = LatencyHistogram()
+                self._errors[index] = 0
+            self._histograms[index].merge(LatencyHistogram.from_dict(histogram))
+            self._errors[index] += errors
+
+
+class RollingCounts:
+    """Time-bucketed ring of per-label counts plus a score sum per bucket."""
+
+    def __init__(self, width: float, slots: int, labels: int):
+        self.width = width
+        self.slots = slots
+        self.labels = labels
+        self._epochs: List[int] = [-1] * slots
+        self._counts: List[List[int]] = [[0] * labels for _ in range(slots)]
+        self._scores: List[float] = [0.0] * slots
+
+    def add(self, epoch: int, label: int, score: float, count: int = 1):
+        index = epoch % self.slots
+        if self._epochs[index] != epoch:
+            if self._epochs[index] > epoch:
+                return
+            self._epochs[index] = epoch
+            self._counts[index] = [0] * self.labels
+            self._scores[index] = 0.0
+        self._counts[index][label] += count
+        self._scores[index] += score
+
+    def record(self, label: int, score: float, now: Optional[float] = None):
+        self.add(int((time.time() if now is None else now) // self.width), label, score)
+
+    def totals(self, slots: int, offset: int = 0,
+               now: Optional[float] = None) -> Tuple[List[int], float]:
+        # Sums the ``slots`` buckets ending ``offset`` buckets before the current one
+        newest = int((time.time() if now is None else now) // self.width) - offset
+        oldest = newest - slots + 1
+        counts = [0] * self.labels
+        score = 0.0
+        for epoch, slot_counts, slot_score in zip(self._epochs, self._counts, self._scores):
+            if oldest <= epoch <= newest:
+                for label, count in enumerate(slot_counts):
+                    counts[label] += count
+                score += slot_score
+        return counts, score
+
+
+class CountMinSketch:
+    """Approximate per-key counts in fixed memory (overestimates, never under)."""
+
+    def __init__(self, width: int = 1024, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.table: List[List[int]] = [[0] * width for _ in range(depth)]
+
+    def _indexes(self, key: str) -> List[int]:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=4 * self.depth).digest()
+        return [int.from_bytes(digest[4 * row:4 * row + 4], "little") % self.width
+                for row in range(self.depth)]
+
+    def add(self, key: str, count: int = 1) -> int:
+        estimate = None
+        for row, index in enumerate(self._indexes(key)):
+            self.table[row][index] += count
+            value = self.table[row][index]
+            estimate = value if estimate is None else min(estimate, value)
+        return estimate
+
+    def estimate(self, key: str) -> int:
+        return min(self.table[row][index] for row, index in enumerate(self._indexes(key)))
+
+    def merge(self, other: "CountMinSketch"):
+        for row in range(self.depth):
+            mine, theirs = self.table[row], other.table[row]
+            for index in range(self.width):
+                mine[index] += theirs[index]
+
+
+class TopK:
+    """Bounded heavy-hitters tracker: a count-min sketch plus the current top ``k`` keys."""
+
+    def __init__(self, k: int = 10, width: int = 1024, depth: int = 4):
+        self.k = k
+        self.sketch = CountMinSketch(width, depth)
+        self.top: Dict[str, int] = {}
+
+    def add(self, key: str, count: int = 1):
+        estimate = self.sketch.add(key, count)
+        if key in self.top or len(self.top) < self.k:
+            self.top[key] = estimate
+            return
+        smallest = min(self.top, key=self.top.get)
+        if estimate > self.top[smallest]:
+            del self.top[smallest]
+            self.top[key] = estimate
+
+    def items(self) -> List[Tuple[str, int]]:
+        return sorted(self.top.items(), key=lambda item: item[1], reverse=True)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"k": self.k, "table": self.sketch.table, "candidates": list(self.top)}
+
+    def merge_dict(self, data: Dict[str, Any]):
+        other = CountMinSketch(self.sketch.width, self.sketch.depth)
+        other.table = data["table"]
+        self.sketch.merge(other)
+        candidates = set(self.top) | set(data["candidates"])
+        ranked = sorted(((key, self.sketch.estimate(key)) for key in candidates),
+                        key=lambda item: item[1], reverse=True)
+        self.top = dict(ranked[:self.k])
+
+
+# Rolling windows reported by the analytics engine: name -> (slot width, slots)
+WINDOWS = {
+    "1m": (5.0, 12),
+    "5m": (30.0, 10),
+    "1h": (300.0, 12),
+}
+
+
+class MetricsAggregate:
+    """Everything AnalyticsService tracks, mergeable across workers."""
+
+    def __init__(self, top_k: int = 10):
+        self.total = 0
+        self.errors = 0
+        self.latency = LatencyHistogram()
+        self.first_token = LatencyHistogram()
+        self.windows = {name: RollingWindow(width, slots) for name, (width, slots) in WINDOWS.items()}
+        self.intents = TopK(top_k)
+
+    def record(self, latency: float, intent: str, error: bool = False):
+        now = time.time()
+        self.total += 1
+        if error:
+            self.errors += 1
+        self.latency.record(latency)
+        for window in self.windows.values():
+            window.record(latency, error, now)
+        self.intents.add(intent)
+
+    def record_first_token(self, latency: float):
+        self.first_token.record(latency)
+
+    def to_dict(self) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            "total": self.total,
+            "errors": self.errors,
+            "latency": self.latency.to_dict(),
+            "first_token": self.first_token.to_dict(),
+            "windows": {name: window.to_dict(now) for name, window in self.windows.items()},
+            "intents": self.intents.to_dict(),
+        }
+
+    def merge_dict(self, data: Dict[str, Any]):
+        now = time.time()
+        self.total += data["total"]
+        self.errors += data["errors"]
+        self.latency.merge(LatencyHistogram.from_dict(data["latency"]))
+        self.first_token.merge(LatencyHistogram.from_dict(data["first_token"]))
+        for name, window in data["windows"].items():
+            if name in self.windows:
+                self.windows[name].merge_dict(window, now)
+        self.intents.merge_dict(data["intents"])
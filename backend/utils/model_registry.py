@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from config.settings import settings
+from utils.classifier_backends import configure_torch_threads, load_text_classifier
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """Process-wide registry that loads each model once and shares it.
+
+    Models are registered as loader callables and loaded on first ``get``.
+    Loading is guarded per model, so concurrent callers (e.g. inference
+    threads) wait for a single load instead of racing.
+
+    With ``load_on_demand`` off (background warm-up), a model only counts
+    as available once it is ready, so requests fall back to rule-based
+    paths instead of blocking on a load.
+    """
+
+    def __init__(self):
+        self._loaders: Dict[str, Callable[[], Any]] = {}
+        self._models: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._status: Dict[str, Dict[str, Any]] = {}
+        self.load_on_demand = True
+
+    def register(self, name: str, loader: Callable[[], Any]):
+        self._loaders[name] = loader
+        self._locks.setdefault(name, threading.Lock())
+        self._models.pop(name, None)
+        self._status[name] = {"state": "not_loaded", "load_time": None, "error": None}
+
+    def get(self, name: str) -> Optional[Any]:
+        if name in self._models:
+            return self._models[name]
+
+        with self._locks[name]:
+            if name in self._models:
+                return self._models[name]
+            status = self._status[name]
+            if status["state"] == "failed":
+                return None
+
+            status["state"] = "loading"
+            start_time = time.time()
+            try:
+                model = self._loaders[name]()
+            except Exception as e:
+                logger.warning(f"Could not load model '{name}': {str(e)}")
+                status["state"] = "failed"
+                status["error"] = str(e)
+                return None
+
+            status["state"] = "ready"
+            status["load_time"] = time.time() - start_time
+            self._models[name] = model
+            logger.info(f"Loaded model '{name}' in {status['load_time']:.2f}s")
+            return model
+
+    def is_available(self, name: str) -> bool:
+        # False once loading failed; while warming up, also until the model is ready
+        if name not in self._status:
+            return False
+        state = self._status[name]["state"]
+        if state == "failed":
+            return False
+        return self.load_on_demand or state == "ready"
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+
+    async def warm_up(self, order: List[str]):
+        # Loads one model at a time so the first ones become usable sooner
+        for name in order + [name for name in self._loaders if name not in order]:
+            if name in self._loaders:
+                await asyncio.to_thread(self.get, name)
+        logger.info("Model warm-up finished")
+
+    def is_ready(self) -> bool:
+        return all(status["state"] in ("ready", "failed") for status in self._status.values())
+
+    def is_warming_up(self) -> bool:
+        return not self.load_on_demand and not self.is_ready()
+
+    def get_status(self) -> Dict[str, Dict[str, Any]]:
+        return {name: dict(status) for name, status in self._status.items()}
+
+
+# Heavy libraries are imported inside the loaders so that registering (or
+# replacing, e.g. with benchmark stubs) a model never pulls them in
+
+def _load_spacy():
+    import spacy
+    
+    try:
+        # Only the entity recognizer is used; skip the parser, tagger and lemmatizer
+        nlp = spacy.load("en_core_web_sm", exclude=["parser", "tagger", "attribute_ruler",
+                                                    "lemmatizer", "senter"])
+    except OSError:
+        # Downloading at runtime stalls startup; install it in the image instead
+        raise RuntimeError("spaCy model en_core_web_sm is not installed "
+                           "(run: python -m spacy download en_core_web_sm)")
+    if "tok2vec" in nlp.pipe_names and not nlp.get_pipe("tok2vec").listening_components:
+        # The small model's NER has its own embedding layer; nothing needs the shared one
+        nlp.disable_pipe("tok2vec")
+    return nlp
+
+
+def _load_intent_classifier():
+    # NLI model used zero-shot, so it scores our own intent labels
+    return load_text_classifier("zero-shot-classification", settings.INTENT_MODEL_NAME,
+                                settings.INTENT_MODEL_PATH)
+
+
+def _load_sentence_encoder():
+    from utils.semantic_index import SentenceEncoder
+    
+    configure_torch_threads()
+    return SentenceEncoder(settings.INTENT_EMBEDDING_MODEL_NAME)
+
+
+def _load_sentiment_analyzer():
+    return load_text_classifier("sentiment-analysis", settings.SENTIMENT_MODEL_NAME,
+                                settings.SENTIMENT_MODEL_PATH)
+
+
+def _load_response_generator():
+    from transformers import pipeline
+    
+    configure_torch_threads()
+    generator = pipeline(
+        "text-generation",
+        model="microsoft/DialoGPT-medium",
+        tokenizer="microsoft/DialoGPT-medium"
+    )
+    # DialoGPT has no pad token; pad on the left so batched prompts line up
+    generator.tokenizer.pad_token = generator.tokenizer.eos_token
+    generator.tokenizer.padding_side = "left"
+    return generator
+
+
+# Global registry instance
+model_registry = ModelRegistry()
+model_registry.register("spacy", _load_spacy)
+model_registry.register("embedding", _load_sentence_encoder)
+model_registry.register("intent", _load_intent_classifier)
+model_registry.register("sentiment", _load_sentiment_analyzer)
+model_registry.register("generation", _load_response_generator)
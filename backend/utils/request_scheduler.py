@@ -0,0 +1,203 @@
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional, Tuple
+
+from config.settings import settings
+from utils.inference import InferenceBusyError
+from utils.metrics import LatencyHistogram
+from utils.rate_limit import TokenBucket
+from utils.response_cache import LocalTTLCache
+from utils.tracing import current_trace
+
+logger = logging.getLogger(__name__)
+
+
+class RequestRejectedError(InferenceBusyError):
+    """Raised when a request is not admitted (HTTP 429) instead of being queued."""
+
+    def __init__(self, reason: str, retry_after: float = 1.0):
+        super().__init__(f"Request rejected: {reason}")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class RequestScheduler:
+    """Admission control and per-session ordering in front of the chat pipeline.
+
+    Each session has a FIFO of waiting turns and runs at most one turn at a
+    time, so concurrent messages for one session (two tabs, WebSocket plus
+    HTTP, webhook retries) never interleave their context reads and writes.
+    Sessions with work waiting share ``max_concurrency`` slots round-robin,
+    and a session goes to the back of the line after each turn. Clients
+    are limited by a token bucket and by their own running and queued
+    counts. Anything over a limit is rejected at once rather than queued.
+
+    All of this state lives in one process. Under the multi-worker launcher
+    every worker enforces the limits on its own, so a client can get up to
+    N times its configured rate and concurrency, and two turns of one
+    session that land on different workers are not ordered against each
+    other. Only routing a session's requests to a single worker (sticky
+    routing at the load balancer) restores those guarantees.
+    """
+
+    def __init__(self, max_concurrency: Optional[int] = None, max_queued: Optional[int] = None):
+        self.max_concurrency = max_concurrency or settings.SCHEDULER_MAX_CONCURRENCY
+        self.max_queued = max_queued or settings.SCHEDULER_MAX_QUEUED
+        self.client_max_concurrency = settings.SCHEDULER_CLIENT_MAX_CONCURRENCY
+        self.client_max_queued = settings.SCHEDULER_CLIENT_MAX_QUEUED
+
+        # session_id -> waiting (future, client_id) in arrival order
+        self._queues: Dict[str, Deque[Tuple[asyncio.Future, Optional[str]]]] = {}
+        self._active_sessions: set = set()
+        # Sessions that are not running and have a turn waiting, in round-robin order
+        self._ready: "OrderedDict[str, None]" = OrderedDict()
+        self._running = 0
+        self._queued = 0
+        self._client_running: Dict[str, int] = {}
+        self._client_queued: Dict[str, int] = {}
+        self._buckets = LocalTTLCache(settings.SCHEDULER_MAX_CLIENTS, ttl=600.0)
+
+        self.queue_wait = LatencyHistogram()
+        self.stats = {"admitted": 0, "queued": 0, "rate_limited": 0, "rejected": 0, "cancelled": 0}
+
+    @asynccontextmanager
+    async def slot(self, session_id: str, client_id: Optional[str] = None) -> AsyncIterator[None]:
+        with current_trace().stage("queue_wait"):
+            await self.acquire(session_id, client_id)
+        try:
+            yield
+        finally:
+            self.release(session_id, client_id)
+
+    def _check_rate(self, client_id: str):
+        if settings.SCHEDULER_CLIENT_RATE <= 0:
+            return
+        bucket = self._buckets.get(client_id)
+        if bucket is None:
+            bucket = TokenBucket(settings.SCHEDULER_CLIENT_RATE, settings.SCHEDULER_CLIENT_BURST)
+            self._buckets.set(client_id, bucket)
+        if not bucket.try_acquire():
+            self.stats["rate_limited"] += 1
+            raise RequestRejectedError("rate_limited", retry_after=bucket.wait_time())
+
+    def _has_capacity(self, client_id: Optional[str]) -> bool:
+        return (client_id is None
+                or self._client_running.get(client_id, 0) < self.client_max_concurrency)
+
+    async def acquire(self, session_id: str, client_id: Optional[str] = None):
+        # client_id None is internal work (batch jobs, channels): ordered and
+        # counted against the global limits, but not rate limited per client
+        if client_id is not None:
+            self._check_rate(client_id)
+
+        if (session_id not in self._active_sessions and session_id not in self._queues
+                and self._running < self.max_concurrency and self._has_capacity(client_id)):
+            self._start(session_id, client_id)
+            self.queue_wait.record(0.0)
+            return
+
+        if self._queued >= self.max_queued:
+            self.stats["rejected"] += 1
+            raise RequestRejectedError("overloaded")
+        if client_id is not None and self._client_queued.get(client_id, 0) >= self.client_max_queued:
+            self.stats["rejected"] += 1
+            raise RequestRejectedError("client_overloaded")
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queues.setdefault(session_id, deque()).append((future, client_id))
+        self._queued += 1
+        if client_id is not None:
+            self._client_queued[client_id] = self._client_queued.get(client_id, 0) + 1
+        if session_id not in self._active_sessions:
+            self._ready[session_id] = None
+        self.stats["queued"] += 1
+        enqueued_at = loop.time()
+        self._dispatch()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just as the caller gave up: hand the slot on
+                self.release(session_id, client_id)
+            else:
+                self._forget(session_id, future, client_id)
+            self.stats["cancelled"] += 1
+            raise
+        self.queue_wait.record(loop.time() - enqueued_at)
+
+    def release(self, session_id: str, client_id: Optional[str] = None):
+        self._running -= 1
+        self._active_sessions.discard(session_id)
+        if client_id is not None:
+            self._decrement(self._client_running, client_id)
+        if session_id in self._queues:
+            # Back of the line, so one chatty session cannot starve the others
+            self._ready[session_id] = None
+        self._dispatch()
+
+    def _start(self, session_id: str, client_id: Optional[str]):
+        self._running += 1
+        self._active_sessions.add(session_id)
+        if client_id is not None:
+            self._client_running[client_id] = self._client_running.get(client_id, 0) + 1
+        self.stats["admitted"] += 1
+
+    def _dispatch(self):
+        while self._running < self.max_concurrency and self._ready:
+            # First ready session whose client still has a free slot
+            session_id = next((sid for sid in self._ready
+                               if self._has_capacity(self._queues[sid][0][1])), None)
+            if session_id is None:
+                return
+            del self._ready[session_id]
+            queue = self._queues[session_id]
+            future, client_id = queue.popleft()
+            if not queue:
+                del self._queues[session_id]
+            self._queued -= 1
+            if client_id is not None:
+                self._decrement(self._client_queued, client_id)
+            self._start(session_id, client_id)
+            future.set_result(None)
+
+    def _forget(self, session_id: str, future: asyncio.Future, client_id: Optional[str]):
+        queue = self._queues.get(session_id)
+        if queue is None:
+            return
+        for entry in queue:
+            if entry[0] is future:
+                queue.remove(entry)
+                break
+        else:
+            return
+        self._queued -= 1
+        if client_id is not None:
+            self._decrement(self._client_queued, client_id)
+        if not queue:
+            del self._queues[session_id]
+            self._ready.pop(session_id, None)
+        self._dispatch()
+
+    @staticmethod
+    def _decrement(counts: Dict[str, int], key: str):
+        remaining = counts.get(key, 0) - 1
+        if remaining > 0:
+            counts[key] = remaining
+        else:
+            counts.pop(key, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "running": self._running,
+            "waiting": self._queued,
+            "sessions_waiting": len(self._queues),
+            "clients_running": len(self._client_running),
+            "max_concurrency": self.max_concurrency,
+            "max_queued": self.max_queued,
+            "queue_wait": self.queue_wait.summary(),
+        }
@@ -0,0 +1,136 @@
+import hashlib
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from config.settings import settings
+from utils.cache import CacheManager, cache_manager
+
+logger = logging.getLogger(__name__)
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+class LocalTTLCache:
+    """In-process LRU cache whose entries also expire after a TTL."""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        self._entries[key] = (time.monotonic() + (ttl or self.ttl), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class ResponseCache:
+    """Two-tier cache (process-local LRU/TTL, then Redis) for chat pipeline results.
+
+    Analyzer results are keyed on the exact message text, generated
+    responses on the normalized text plus a context fingerprint.
+    """
+
+    def __init__(self, remote: Optional[CacheManager] = cache_manager):
+        self.enabled = settings.RESPONSE_CACHE_ENABLED
+        self.local = LocalTTLCache(settings.RESPONSE_CACHE_MAX_ENTRIES,
+                                   settings.RESPONSE_CACHE_TTL)
+        self.remote = remote if settings.RESPONSE_CACHE_USE_REDIS else None
+        self._remote_retry_at = 0.0
+        self.stats = {
+            "local": {"hits": 0, "misses": 0},
+            "redis": {"hits": 0, "misses": 0, "errors": 0},
+        }
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return " ".join(_PUNCTUATION.sub(" ", text.lower()).split())
+
+    @staticmethod
+    def _digest(*parts: str) -> str:
+        return hashlib.blake2b("\x1f".join(parts).encode("utf-8"), digest_size=16).hexdigest()
+
+    def analysis_key(self, stage: str, text: str) -> str:
+        return f"chat:analysis:{stage}:{self._digest(text.strip())}"
+
+    def response_key(self, text: str, context: Dict[str, Any]) -> str:
+        fingerprint = context.get("last_intent", "")
+        return f"chat:response:{self._digest(self.normalize(text), fingerprint)}"
+
+    async def get(self, key: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+
+        value = self.local.get(key)
+        if value is not None:
+            self.stats["local"]["hits"] += 1
+            return value
+        self.stats["local"]["misses"] += 1
+
+        if not self._remote_available():
+            return None
+        try:
+            value = await self.remote.get(key)
+        except Exception as e:
+            self._remote_failed(e)
+            return None
+
+        if value is None:
+            self.stats["redis"]["misses"] += 1
+            return None
+        self.stats["redis"]["hits"] += 1
+        self.local.set(key, value)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        if not self.enabled:
+            return
+        ttl = ttl or settings.RESPONSE_CACHE_TTL
+        self.local.set(key, value, ttl)
+
+        if not self._remote_available():
+            return
+        try:
+            await self.remote.set(key, value, expire=ttl)
+        except Exception as e:
+            self._remote_failed(e)
+
+    def _remote_available(self) -> bool:
+        return self.remote is not None and time.monotonic() >= self._remote_retry_at
+
+    def _remote_failed(self, error: Exception):
+        # Skip Redis for a while rather than paying a failed round trip per message
+        self.stats["redis"]["errors"] += 1
+        self._remote_retry_at = time.monotonic() + settings.RESPONSE_CACHE_REDIS_RETRY_SECONDS
+        logger.warning(f"Response cache Redis tier unavailable: {str(error)}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        report = {"enabled": self.enabled, "local_entries": len(self.local)}
+        for tier, counts in self.stats.items():
+            lookups = counts["hits"] + counts["misses"]
+            report[tier] = {
+                **counts,
+                "hit_rate": counts["hits"] / lookups if lookups else 0.0
+            }
+        return report
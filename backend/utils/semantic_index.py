@@ -0,0 +1,214 @@
+"""Embedding-based intent lookup over a precomputed example-utterance index.
+
+The index is built offline from an intent catalog (JSON or YAML mapping
+each intent to example utterances):
+
+    python -m utils.semantic_index --catalog config/intent_catalog.json \
+        --output models/intent_index/
+
+and loaded read-only with ``np.load(mmap_mode="r")`` so every worker
+process shares the same pages.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+EMBEDDINGS_FILE = "embeddings.npy"
+METADATA_FILE = "index.json"
+
+
+class SentenceEncoder:
+    """Mean-pooled, L2-normalized sentence embeddings from a transformers encoder."""
+
+    def __init__(self, model_name: str, max_length: int = 128):
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
+        self._torch = torch
+        self.model_name = model_name
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = AutoModel.from_pretrained(model_name).eval()
+        self.max_length = max_length
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        torch = self._torch
+        chunks = []
+        for start in range(0, len(texts), batch_size):
+            encoded = self.tokenizer(texts[start:start + batch_size], padding=True, truncation=True,
+                                     max_length=self.max_length, return_tensors="pt")
+            with torch.no_grad():
+                hidden = self.model(**encoded).last_hidden_state
+            mask = encoded["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+            pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+            chunks.append(pooled.numpy())
+        return normalize(np.vstack(chunks).astype(np.float32))
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def load_catalog(path: str) -> Dict[str, List[str]]:
+    # {"intent": ["example utterance", ...], ...}
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            import yaml
+
+            catalog = yaml.safe_load(f)
+        else:
+            catalog = json.load(f)
+    return {intent: [str(example) for example in examples]
+            for intent, examples in catalog.items() if examples}
+
+
+def build_index(catalog_path: str, output_path: str, encoder: Any,
+                model_name: str) -> Dict[str, Any]:
+    catalog = load_catalog(catalog_path)
+    intents = list(catalog)
+    examples = [example for intent in intents for example in catalog[intent]]
+    rows = [index for index, intent in enumerate(intents) for _ in catalog[intent]]
+    embeddings = encoder.encode(examples)
+
+    with open(catalog_path, "rb") as f:
+        catalog_hash = hashlib.sha256(f.read()).hexdigest()
+    metadata = {
+        "model": model_name,
+        "catalog_sha256": catalog_hash,
+        "built_at": time.time(),
+        "dimensions": int(embeddings.shape[1]),
+        "intents": intents,
+        "rows": rows,
+        "examples": examples,
+    }
+
+    # Write to temporary names, then rename, so running workers never read a half-written index
+    os.makedirs(output_path, exist_ok=True)
+    embeddings_tmp = os.path.join(output_path, EMBEDDINGS_FILE + ".tmp")
+    metadata_tmp = os.path.join(output_path, METADATA_FILE + ".tmp")
+    with open(embeddings_tmp, "wb") as f:
+        np.save(f, embeddings)
+    with open(metadata_tmp, "w", encoding="utf-8") as f:
+        json.dump(metadata, f)
+    os.replace(embeddings_tmp, os.path.join(output_path, EMBEDDINGS_FILE))
+    os.replace(metadata_tmp, os.path.join(output_path, METADATA_FILE))
+    return metadata
+
+
+class SemanticIntentIndex:
+    """Cosine top-k lookup of message embeddings against example utterances.
+
+    The example matrix is memory-mapped and searched with one matrix
+    product per batch. The files are re-checked at most every
+    ``reload_interval`` seconds and swapped in when they change, so a
+    rebuilt index goes live without a restart.
+    """
+
+    def __init__(self, path: str, model_name: str, top_k: Optional[int] = None,
+                 reload_interval: Optional[float] = None):
+        self.path = path
+        self.model_name = model_name
+        self.top_k = top_k or settings.INTENT_SEMANTIC_TOP_K
+        self.reload_interval = (settings.INTENT_INDEX_RELOAD_INTERVAL
+                                if reload_interval is None else reload_interval)
+        self._state: Optional[Dict[str, Any]] = None
+        self._version: Optional[float] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.reload_if_changed(force=True)
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._state is not None
+
+    @property
+    def intents(self) -> List[str]:
+        return list(self._state["intents"]) if self._state else []
+
+    def _current_version(self) -> Optional[float]:
+        metadata_path = os.path.join(self.path, METADATA_FILE)
+        if not os.path.exists(metadata_path):
+            return None
+        return os.path.getmtime(metadata_path)
+
+    def reload_if_changed(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.reload_interval:
+            return
+        with self._lock:
+            self._checked_at = now
+            version = self._current_version()
+            if version is None or version == self._version:
+                return
+            try:
+                # A single reference swap keeps concurrent searches on a consistent state
+                self._state = self._load()
+                self._version = version
+                logger.info(f"Loaded semantic intent index from {self.path} "
+                            f"({len(self._state['rows'])} examples, "
+                            f"{len(self._state['intents'])} intents)")
+            except Exception as e:
+                logger.warning(f"Could not load semantic intent index: {str(e)}")
+
+    def _load(self) -> Dict[str, Any]:
+        with open(os.path.join(self.path, METADATA_FILE), "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+        if metadata["model"] != self.model_name:
+            raise ValueError(f"index was built with {metadata['model']}, "
+                             f"but the embedding model is {self.model_name}")
+        embeddings = np.load(os.path.join(self.path, EMBEDDINGS_FILE), mmap_mode="r")
+        return {
+            "embeddings": embeddings,
+            "rows": np.asarray(metadata["rows"], dtype=np.int32),
+            "intents": metadata["intents"],
+        }
+
+    def search(self, vectors: np.ndarray) -> List[Optional[Dict[str, Any]]]:
+        self.reload_if_changed()
+        state = self._state
+        if state is None:
+            return [None] * len(vectors)
+
+        embeddings, rows, intents = state["embeddings"], state["rows"], state["intents"]
+        similarities = np.asarray(vectors, dtype=np.float32) @ embeddings.T
+        k = min(self.top_k, similarities.shape[1])
+        top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+
+        results = []
+        for row_scores, candidates in zip(similarities, top):
+            # Best example per intent among the k nearest neighbours
+            best: Dict[int, float] = {}
+            for candidate in candidates:
+                intent_index = int(rows[candidate])
+                best[intent_index] = max(best.get(intent_index, -1.0), float(row_scores[candidate]))
+            intent_index, score = max(best.items(), key=lambda item: item[1])
+            results.append({"label": intents[intent_index], "score": score})
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the semantic intent index")
+    parser.add_argument("--catalog", default=settings.INTENT_CATALOG_PATH)
+    parser.add_argument("--output", default=settings.INTENT_INDEX_PATH)
+    parser.add_argument("--model", default=settings.INTENT_EMBEDDING_MODEL_NAME)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    metadata = build_index(args.catalog, args.output, SentenceEncoder(args.model), args.model)
+    logger.info(f"Wrote {len(metadata['examples'])} examples for "
+                f"{len(metadata['intents'])} intents to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
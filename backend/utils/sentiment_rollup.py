@@ -0,0 +1,241 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.settings import settings
+from utils.cache import CacheManager, cache_manager
+from utils.metrics import RollingCounts
+
+logger = logging.getLogger(__name__)
+
+LABELS = ["positive", "negative", "neutral"]
+_LABEL_INDEX = {label: index for index, label in enumerate(LABELS)}
+_POLARITY = {"positive": 1.0, "negative": -1.0, "neutral": 0.0}
+
+# Rollup granularities: name -> (bucket width in seconds, buckets kept)
+ROLLUPS = {
+    "5m": (300, 24),     # last two hours
+    "1h": (3600, 48),    # last two days
+}
+
+TOTALS_KEY = "sentiment:totals"
+
+
+def normalize_label(label: str) -> str:
+    label = str(label).lower()
+    return label if label in _LABEL_INDEX else "neutral"
+
+
+def polarity(sentiment: Dict[str, Any]) -> float:
+    """Signed score in [-1, 1]: confidence-weighted, positive minus negative."""
+    label = normalize_label(sentiment.get("label", "neutral"))
+    return _POLARITY[label] * float(sentiment.get("score", 0.0))
+
+
+def trend_label(delta: float) -> str:
+    if delta > settings.SENTIMENT_TREND_THRESHOLD:
+        return "improving"
+    if delta < -settings.SENTIMENT_TREND_THRESHOLD:
+        return "declining"
+    return "stable"
+
+
+def _summary(counts: List[int], score: float) -> Dict[str, Any]:
+    total = sum(counts)
+    return {
+        "total": total,
+        **{f"{label}_percentage": round(100.0 * counts[index] / total, 1) if total else 0.0
+           for index, label in enumerate(LABELS)},
+        "average_score": score / total if total else 0.0,
+    }
+
+
+class SentimentAggregator:
+    """Streaming sentiment rollups: O(1) per message, fixed memory, O(1) reads.
+
+    Every result lands in in-process ring buffers (5-minute and hourly
+    buckets) and in a pending delta that a background task flushes to Redis
+    as ``HINCRBY`` on one hash per bucket, so rollups survive restarts and
+    are shared across workers. Reads touch a fixed number of buckets no
+    matter how many messages were recorded.
+    """
+
+    def __init__(self, cache: CacheManager = cache_manager):
+        self.cache = cache
+        self.use_redis = settings.SENTIMENT_ROLLUP_REDIS
+        self.rollups = {name: RollingCounts(width, slots, len(LABELS))
+                        for name, (width, slots) in ROLLUPS.items()}
+        self.totals = [0] * len(LABELS)
+        self.total_score = 0.0
+        # (rollup, epoch) -> [count per label..., score sum] not yet in Redis
+        self._pending: Dict[Tuple[str, int], List[float]] = {}
+        self._flusher: Optional[asyncio.Task] = None
+        self._cached: Optional[Tuple[float, Dict[str, Any]]] = None
+        self.stats = {"recorded": 0, "flushes": 0, "errors": 0}
+
+    async def start(self):
+        if self.use_redis:
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        if self._flusher:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+            await self._flush()
+
+    def record(self, sentiment: Dict[str, Any], now: Optional[float] = None) -> float:
+        now = time.time() if now is None else now
+        label = _LABEL_INDEX[normalize_label(sentiment.get("label", "neutral"))]
+        score = polarity(sentiment)
+        self.stats["recorded"] += 1
+        self.totals[label] += 1
+        self.total_score += score
+        for name, rollup in self.rollups.items():
+            rollup.record(label, score, now)
+            if self.use_redis:
+                key = (name, int(now // rollup.width))
+                delta = self._pending.get(key)
+                if delta is None:
+                    delta = self._pending[key] = [0.0] * (len(LABELS) + 1)
+                delta[label] += 1
+                delta[-1] += score
+        return score
+
+    def update_session(self, context: Dict[str, Any], score: float) -> Dict[str, Any]:
+        """Fold one message score into the session's EMA; returns the context fields to store."""
+        previous = float(context.get("sentiment_score") or 0.0)
+        if context.get("history"):
+            ema = previous + settings.SENTIMENT_EMA_ALPHA * (score - previous)
+        else:
+            ema = score
+        if ema > settings.SENTIMENT_TREND_THRESHOLD:
+            trend = "positive"
+        elif ema < -settings.SENTIMENT_TREND_THRESHOLD:
+            trend = "negative"
+        else:
+            trend = "neutral"
+        return {"sentiment_score": round(ema, 4), "sentiment_trend": trend}
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(settings.SENTIMENT_FLUSH_INTERVAL)
+            await self._flush()
+
+    async def _flush(self):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        try:
+            redis_client = await self.cache.get_redis_pool()
+            async with redis_client.pipeline(transaction=False) as pipe:
+                for (name, epoch), delta in pending.items():
+                    width, slots = ROLLUPS[name]
+                    key = f"sentiment:{name}:{epoch}"
+                    # Lifetime totals ride along with the hourly deltas only
+                    targets = (key, TOTALS_KEY) if name == "1h" else (key,)
+                    for target in targets:
+                        for index, label in enumerate(LABELS):
+                            if delta[index]:
+                                pipe.hincrby(target, label, int(delta[index]))
+                        pipe.hincrbyfloat(target, "score", delta[-1])
+                    pipe.expire(key, int(width * slots))
+                await pipe.execute()
+            self.stats["flushes"] += 1
+        except Exception as e:
+            self.stats["errors"] += 1
+            # Put the deltas back so a Redis blip delays the rollups instead of losing them
+            for key, delta in pending.items():
+                current = self._pending.setdefault(key, [0.0] * (len(LABELS) + 1))
+                for index, value in enumerate(delta):
+                    current[index] += value
+            logger.warning(f"Could not flush sentiment rollups: {str(e)}")
+
+    async def _load_remote(self, now: float) -> Tuple[Dict[str, RollingCounts], List[int], float]:
+        rollups = {name: RollingCounts(width, slots, len(LABELS))
+                   for name, (width, slots) in ROLLUPS.items()}
+        keys = []
+        redis_client = await self.cache.get_redis_pool()
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for name, (width, slots) in ROLLUPS.items():
+                newest = int(now // width)
+                for epoch in range(newest - slots + 1, newest + 1):
+                    keys.append((name, epoch))
+                    pipe.hgetall(f"sentiment:{name}:{epoch}")
+            pipe.hgetall(TOTALS_KEY)
+            results = await pipe.execute()
+
+        for (name, epoch), bucket in zip(keys, results):
+            for index, label in enumerate(LABELS):
+                count = int(bucket.get(label, 0))
+                if count:
+                    rollups[name].add(epoch, index, 0.0, count)
+            if bucket:
+                rollups[name].add(epoch, 0, float(bucket.get("score", 0.0)), 0)
+        totals = results[-1]
+        # Deltas from this worker that have not been flushed yet
+        for (name, epoch), delta in self._pending.items():
+            for index in range(len(LABELS)):
+                if delta[index]:
+                    rollups[name].add(epoch, index, 0.0, int(delta[index]))
+            rollups[name].add(epoch, 0, delta[-1], 0)
+        pending_totals = [0] * len(LABELS)
+        pending_score = 0.0
+        for (name, _), delta in self._pending.items():
+            if name == "1h":
+                for index in range(len(LABELS)):
+                    pending_totals[index] += int(delta[index])
+                pending_score += delta[-1]
+        return (rollups,
+                [int(totals.get(label, 0)) + pending_totals[index]
+                 for index, label in enumerate(LABELS)],
+                float(totals.get("score", 0.0)) + pending_score)
+
+    async def get_trends(self) -> Dict[str, Any]:
+        now = time.time()
+        if self._cached and self._cached[0] > now:
+            return self._cached[1]
+
+        rollups, totals, total_score, source = self.rollups, self.totals, self.total_score, "local"
+        if self.use_redis:
+            try:
+                rollups, totals, total_score = await self._load_remote(now)
+                source = "redis"
+            except Exception as e:
+                logger.warning(f"Could not read sentiment rollups, using local only: {str(e)}")
+
+        minutes, hours = rollups["5m"], rollups["1h"]
+        last_hour = minutes.totals(12, now=now)
+        previous_hour = minutes.totals(12, offset=12, now=now)
+        windows = {
+            "last_5m": _summary(*minutes.totals(1, now=now)),
+            "last_hour": _summary(*last_hour),
+            "last_24h": _summary(*hours.totals(24, now=now)),
+        }
+        lifetime = _summary(totals, total_score)
+        delta = windows["last_hour"]["average_score"] - _summary(*previous_hour)["average_score"]
+        overall = LABELS[max(range(len(LABELS)), key=lambda index: totals[index])] \
+            if sum(totals) else "neutral"
+
+        trends = {
+            "overall_sentiment": overall,
+            "positive_percentage": lifetime["positive_percentage"],
+            "negative_percentage": lifetime["negative_percentage"],
+            "neutral_percentage": lifetime["neutral_percentage"],
+            "trend": trend_label(delta) if sum(previous_hour[0]) else "stable",
+            "total_messages": lifetime["total"],
+            "average_score": lifetime["average_score"],
+            "windows": windows,
+            "source": source,
+            "timestamp": datetime.utcnow().isoformat(),
+        }
+        self._cached = (now + settings.SENTIMENT_READ_CACHE_SECONDS, trends)
+        return trends
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "pending_buckets": len(self._pending)}
@@ -0,0 +1,248 @@
+import json
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional
+
+from config.settings import settings
+from utils.cache import CacheManager, cache_manager
+
+logger = logging.getLogger(__name__)
+
+
+def _default_context() -> Dict[str, Any]:
+    return {
+        'history': [],
+        'last_intent': '',
+        'entities': {},
+        'sentiment_trend': 'neutral',
+        'sentiment_score': 0.0
+    }
+
+
+class SessionStore(ABC):
+    """Storage for per-session conversation context.
+
+    ``get`` returns a context dict (history, last_intent, entities,
+    sentiment_trend, sentiment_score); ``append_turn`` records one user/bot exchange and
+    merges the new fields and entities into it.
+    """
+
+    @abstractmethod
+    async def get(self, session_id: str) -> Dict[str, Any]:
+        ...
+
+    @abstractmethod
+    async def append_turn(self, session_id: str, user_message: str, bot_response: str,
+                          fields: Dict[str, Any], entities: Dict[str, Any]):
+        ...
+
+    @abstractmethod
+    def get_stats(self) -> Dict[str, Any]:
+        ...
+
+
+class InMemorySessionStore(SessionStore):
+    """Per-process store with LRU eviction, idle TTL and an approximate memory cap."""
+
+    def __init__(self, max_sessions: Optional[int] = None, idle_ttl: Optional[float] = None,
+                 max_memory_bytes: Optional[int] = None):
+        self.max_sessions = max_sessions or settings.SESSION_MAX_SESSIONS
+        self.idle_ttl = idle_ttl or settings.SESSION_IDLE_TTL
+        self.max_memory_bytes = max_memory_bytes or settings.SESSION_MAX_MEMORY_MB * 1024 * 1024
+        # session_id -> [last_access, size_bytes, context]; oldest access first
+        self._sessions: "OrderedDict[str, List[Any]]" = OrderedDict()
+        self._total_bytes = 0
+        self.evictions = {"idle": 0, "capacity": 0, "memory": 0}
+
+    async def get(self, session_id: str) -> Dict[str, Any]:
+        entry = self._live_entry(session_id)
+        # Reads sweep idle sessions too, so read-mostly traffic still frees memory
+        self._evict()
+        if entry is None:
+            return _default_context()
+        entry[0] = time.monotonic()
+        self._sessions.move_to_end(session_id)
+        context = entry[2]
+        return {**context, 'history': list(context['history']),
+                'entities': dict(context['entities'])}
+
+    async def append_turn(self, session_id: str, user_message: str, bot_response: str,
+                          fields: Dict[str, Any], entities: Dict[str, Any]):
+        entry = self._live_entry(session_id)
+        if entry is None:
+            context = _default_context()
+            # Bounded deque: the oldest turns fall off without copying the rest
+            context['history'] = deque(maxlen=settings.SESSION_MAX_HISTORY)
+            entry = [0.0, 0, context]
+            self._sessions[session_id] = entry
+        context = entry[2]
+
+        history = context['history']
+        history.append(f"User: {user_message}")
+        history.append(f"Bot: {bot_response}")
+
+        context.update(fields)
+        merged = context['entities']
+        for label, value in entities.items():
+            # Re-insert so the most recently seen labels are kept when capping
+            merged.pop(label, None)
+            merged[label] = value
+        while len(merged) > settings.SESSION_MAX_ENTITIES:
+            merged.pop(next(iter(merged)))
+
+        size = self._estimate_size(context)
+        self._total_bytes += size - entry[1]
+        entry[0] = time.monotonic()
+        entry[1] = size
+        self._sessions.move_to_end(session_id)
+        self._evict()
+
+    def _live_entry(self, session_id: str) -> Optional[List[Any]]:
+        # An expired session is dropped here, so its stale history is never resumed
+        entry = self._sessions.get(session_id)
+        if entry is not None and time.monotonic() - entry[0] > self.idle_ttl:
+            del self._sessions[session_id]
+            self._total_bytes -= entry[1]
+            self.evictions["idle"] += 1
+            return None
+        return entry
+
+    def _estimate_size(self, context: Dict[str, Any]) -> int:
+        history_bytes = sum(len(turn) for turn in context['history'])
+        entity_bytes = len(json.dumps(context['entities'], default=str))
+        return history_bytes + entity_bytes + len(context.get('last_intent', '')) + 256
+
+    def _evict(self):
+        now = time.monotonic()
+        while self._sessions:
+            session_id, entry = next(iter(self._sessions.items()))
+            if now - entry[0] > self.idle_ttl:
+                reason = "idle"
+            elif len(self._sessions) > self.max_sessions:
+                reason = "capacity"
+            elif self._total_bytes > self.max_memory_bytes and len(self._sessions) > 1:
+                reason = "memory"
+            else:
+                break
+            del self._sessions[session_id]
+            self._total_bytes -= entry[1]
+            self.evictions[reason] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "memory",
+            "sessions": len(self._sessions),
+            "approx_bytes": self._total_bytes,
+            "max_sessions": self.max_sessions,
+            "max_memory_bytes": self.max_memory_bytes,
+            "idle_ttl": self.idle_ttl,
+            "evictions": dict(self.evictions)
+        }
+
+
+class RedisSessionStore(SessionStore):
+    """Shared store so any worker can serve any session.
+
+    Each session is a hash of scalar fields, a capped history list and a hash
+    of entities, all written in one pipeline and expiring after the idle TTL.
+    A sorted set orders entity labels by when they were last seen, so the
+    oldest are dropped once a session has more than SESSION_MAX_ENTITIES.
+    """
+
+    def __init__(self, cache: CacheManager = cache_manager, idle_ttl: Optional[int] = None):
+        self.cache = cache
+        self.idle_ttl = int(idle_ttl or settings.SESSION_IDLE_TTL)
+        self.stats = {"reads": 0, "writes": 0, "errors": 0, "new_sessions": 0}
+        self.evictions = {"history": 0, "entities": 0}
+
+    def _keys(self, session_id: str):
+        base = f"session:{session_id}"
+        return base, f"{base}:history", f"{base}:entities", f"{base}:entity_order"
+
+    async def get(self, session_id: str) -> Dict[str, Any]:
+        self.stats["reads"] += 1
+        fields_key, history_key, entities_key, _ = self._keys(session_id)
+        try:
+            redis_client = await self.cache.get_redis_pool()
+            async with redis_client.pipeline(transaction=False) as pipe:
+                pipe.hgetall(fields_key)
+                pipe.lrange(history_key, 0, -1)
+                pipe.hgetall(entities_key)
+                fields, history, entities = await pipe.execute()
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"Session store read failed: {str(e)}")
+            return _default_context()
+
+        context = _default_context()
+        context.update(fields)
+        context['history'] = history
+        context['entities'] = {label: json.loads(value) for label, value in entities.items()}
+        return context
+
+    async def append_turn(self, session_id: str, user_message: str, bot_response: str,
+                          fields: Dict[str, Any], entities: Dict[str, Any]):
+        self.stats["writes"] += 1
+        keys = self._keys(session_id)
+        fields_key, history_key, entities_key, order_key = keys
+        try:
+            redis_client = await self.cache.get_redis_pool()
+            async with redis_client.pipeline(transaction=True) as pipe:
+                pipe.rpush(history_key, f"User: {user_message}", f"Bot: {bot_response}")
+                pipe.ltrim(history_key, -settings.SESSION_MAX_HISTORY, -1)
+                if fields:
+                    pipe.hset(fields_key, mapping={k: str(v) for k, v in fields.items()})
+                if entities:
+                    pipe.hset(entities_key, mapping={
+                        label: json.dumps(value, default=str) for label, value in entities.items()
+                    })
+                    now = time.time()
+                    # Later labels in one turn count as more recent
+                    pipe.zadd(order_key, {label: now + index * 1e-6
+                                          for index, label in enumerate(entities)})
+                pipe.zcard(order_key)
+                for key in keys:
+                    pipe.expire(key, self.idle_ttl)
+                results = await pipe.execute()
+
+            history_length = results[0]
+            entity_count = results[len(results) - len(keys) - 1]
+            if history_length == 2:
+                self.stats["new_sessions"] += 1
+            self.evictions["history"] += max(0, history_length - settings.SESSION_MAX_HISTORY)
+            if entity_count > settings.SESSION_MAX_ENTITIES:
+                await self._trim_entities(redis_client, entities_key, order_key)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"Session store write failed: {str(e)}")
+
+    async def _trim_entities(self, redis_client, entities_key: str, order_key: str):
+        # Least recently seen first; a concurrent trim of the same labels is harmless
+        stale = await redis_client.zrange(order_key, 0, -settings.SESSION_MAX_ENTITIES - 1)
+        if not stale:
+            return
+        async with redis_client.pipeline(transaction=True) as pipe:
+            pipe.hdel(entities_key, *stale)
+            pipe.zrem(order_key, *stale)
+            await pipe.execute()
+        self.evictions["entities"] += len(stale)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "redis",
+            "idle_ttl": self.idle_ttl,
+            "max_history": settings.SESSION_MAX_HISTORY,
+            "max_entities": settings.SESSION_MAX_ENTITIES,
+            **self.stats,
+            "evictions": dict(self.evictions)
+        }
+
+
+def create_session_store() -> SessionStore:
+    if settings.SESSION_BACKEND == "redis":
+        return RedisSessionStore()
+    if settings.SESSION_BACKEND != "memory":
+        raise ValueError(f"Unknown session backend: {settings.SESSION_BACKEND}")
+    return InMemorySessionStore()
@@ -0,0 +1,258 @@
+import contextvars
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0)
+
+# A collector returns (name, type, help, [(labels, value), ...]) for gauges and
+# counters owned by other components (batch queues, caches, ...)
+Sample = Tuple[Dict[str, str], float]
+Collector = Callable[[], List[Tuple[str, str, str, List[Sample]]]]
+
+_histograms: List["Histogram"] = []
+_counters: List["LabelledCounter"] = []
+_collectors: List[Collector] = []
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    escaped = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        escaped.append(f'{key}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram with labels."""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str],
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        _histograms.append(self)
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        series = self._series.get(key)
+        if series is None:
+            # One slot per bucket, then +Inf, sum
+            series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[index] += 1
+                break
+        else:
+            series[len(self.buckets)] += 1
+        series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for key, series in self._series.items():
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': le})} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {series[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+class LabelledCounter:
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str]):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        _counters.append(self)
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def items(self) -> List[Tuple[Dict[str, str], float]]:
+        return [(dict(zip(self.labelnames, key)), value) for key, value in self._values.items()]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for key, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(dict(zip(self.labelnames, key)))} {value}")
+        return lines
+
+
+def register_collector(collector: Collector):
+    _collectors.append(collector)
+
+
+def render_prometheus() -> str:
+    lines: List[str] = []
+    for metric in _histograms + _counters:
+        lines.extend(metric.render())
+    for collector in _collectors:
+        try:
+            families = collector()
+        except Exception as e:
+            logger.warning(f"Metrics collector failed: {str(e)}")
+            continue
+        for name, metric_type, help_text, samples in families:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+STAGE_DURATION = Histogram(
+    "chatbot_stage_duration_seconds",
+    "Time spent in each stage of ChatService.process_message",
+    ["stage", "method", "backend"]
+)
+REQUEST_DURATION = Histogram(
+    "chatbot_request_duration_seconds",
+    "End-to-end chat pipeline latency",
+    ["backend"]
+)
+
+
+class RequestTrace:
+    """Per-request stage timings, recorded into the Prometheus histograms."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.labels: Dict[str, str] = {}
+
+    @contextmanager
+    def stage(self, name: str, **labels: str) -> Iterator[Dict[str, str]]:
+        # Callers may fill in labels (e.g. method) once the stage has run
+        stage_labels = dict(labels)
+        start = time.perf_counter()
+        try:
+            yield stage_labels
+        finally:
+            self.record(name, time.perf_counter() - start, **stage_labels)
+
+    def record(self, name: str, duration: float, **labels: str):
+        self.stages[name] = self.stages.get(name, 0.0) + duration
+        STAGE_DURATION.observe(duration, stage=name, **labels)
+
+    def finish(self) -> float:
+        total = time.perf_counter() - self.start
+        REQUEST_DURATION.observe(total, backend=self.labels.get("backend", ""))
+        return total
+
+    def breakdown(self) -> Dict[str, float]:
+        # Milliseconds, for the optional debug payload in chat responses
+        timings = {name: duration * 1000.0 for name, duration in self.stages.items()}
+        timings["total"] = (time.perf_counter() - self.start) * 1000.0
+        return timings
+
+
+_current_trace: contextvars.ContextVar[Optional[RequestTrace]] = contextvars.ContextVar(
+    "current_trace", default=None
+)
+
+
+def start_trace() -> RequestTrace:
+    trace = RequestTrace()
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace() -> RequestTrace:
+    # Code called outside a traced request still gets a (throwaway) trace
+    trace = _current_trace.get()
+    return trace if trace is not None else start_trace()
+
+
+class SlowRequestProfiler:
+    """Sampling profiler that logs hot stacks for requests slower than a threshold.
+
+    While any profiled request runs, one shared background thread samples
+    the stacks of every thread (the event loop and the inference pool) at a
+    fixed interval and adds them to each active request's samples; they are
+    only reported if the request turns out slow. At most ``max_active``
+    requests are profiled at once, and leaving a profile never waits on the
+    sampler, so the event loop is not blocked.
+    """
+
+    def __init__(self, interval_ms: Optional[float] = None, threshold_ms: Optional[float] = None,
+                 top: int = 5, max_active: Optional[int] = None):
+        self.interval = (interval_ms or settings.PROFILER_INTERVAL_MS) / 1000.0
+        self.threshold = (threshold_ms or settings.PROFILER_SLOW_REQUEST_MS) / 1000.0
+        self.top = top
+        self.max_active = max_active or settings.PROFILER_MAX_CONCURRENT
+        self._lock = threading.Lock()
+        # id(samples) -> samples, for every request being profiled
+        self._active: Dict[int, Counter] = {}
+        self._sampler: Optional[threading.Thread] = None
+
+    @contextmanager
+    def profile(self, label: str) -> Iterator[None]:
+        samples: Counter = Counter()
+        with self._lock:
+            profiled = len(self._active) < self.max_active
+            if profiled:
+                self._active[id(samples)] = samples
+                if self._sampler is None:
+                    self._sampler = threading.Thread(target=self._sample,
+                                                     name="slow-request-profiler", daemon=True)
+                    self._sampler.start()
+        if not profiled:
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                del self._active[id(samples)]
+            elapsed = time.perf_counter() - start
+            if elapsed >= self.threshold and samples:
+                self._report(label, elapsed, samples)
+
+    def _sample(self):
+        sampler_id = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            stacks = [tuple(f"{f.filename}:{f.lineno} {f.name}"
+                            for f in traceback.extract_stack(frame)[-8:])
+                      for thread_id, frame in sys._current_frames().items()
+                      if thread_id != sampler_id]
+            with self._lock:
+                if not self._active:
+                    # The next profiled request starts a new sampler
+                    self._sampler = None
+                    return
+                for samples in self._active.values():
+                    samples.update(stacks)
+
+    def _report(self, label: str, elapsed: float, samples: Counter):
+        total = sum(samples.values())
+        lines = [f"Slow request {label} took {elapsed * 1000.0:.0f}ms; hottest stacks "
+                 f"({total} samples):"]
+        for stack, count in samples.most_common(self.top):
+            lines.append(f"  {count / total:.0%} of samples:")
+            lines.extend(f"    {frame}" for frame in stack)
+        logger.warning("\n".join(lines))
+
+
+slow_request_profiler = SlowRequestProfiler()
@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import case, insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from config.settings import settings
+from models.database import Conversation, SessionLocal, UserSession, engine
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationWriter:
+    """Write-behind persistence for conversation rows.
+
+    ``enqueue`` never blocks the request path: rows go onto a bounded queue
+    (and are dropped, counted, when it is full). A background task drains
+    the queue and writes rows in bulk transactions once a batch fills up or
+    the flush interval elapses. A batch that fails is retried with backoff
+    (the transaction rolled back, so nothing is written twice) before its
+    rows are counted as failed.
+    """
+
+    def __init__(self, max_queue_size: Optional[int] = None,
+                 batch_size: Optional[int] = None,
+                 flush_interval_ms: Optional[float] = None):
+        self.max_queue_size = max_queue_size or settings.PERSISTENCE_QUEUE_SIZE
+        self.batch_size = batch_size or settings.PERSISTENCE_BATCH_SIZE
+        self.flush_interval = (flush_interval_ms or settings.PERSISTENCE_FLUSH_INTERVAL_MS) / 1000.0
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self.stats = {
+            "enqueued": 0,
+            "written": 0,
+            "dropped": 0,
+            "failed": 0,
+            "retries": 0,
+            "batches": 0,
+            "last_batch_size": 0,
+            "last_flush_seconds": 0.0,
+            "last_lag_seconds": 0.0,
+            "max_lag_seconds": 0.0,
+        }
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        # The sentinel queues behind every pending row, so they are all flushed first
+        if self._worker is None:
+            return
+        await self._queue.put(None)
+        await self._worker
+        self._worker = None
+        logger.info(f"Conversation writer stopped ({self.stats['written']} rows written)")
+
+    def enqueue(self, row: Dict[str, Any]) -> bool:
+        if self._queue is None:
+            self.stats["dropped"] += 1
+            return False
+        try:
+            self._queue.put_nowait((time.monotonic(), row))
+        except asyncio.QueueFull:
+            self.stats["dropped"] += 1
+            return False
+        self.stats["enqueued"] += 1
+        return True
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[Tuple[float, Dict[str, Any]]]):
+        if not batch:
+            return
+        lag = time.monotonic() - batch[0][0]
+        self.stats["last_lag_seconds"] = lag
+        self.stats["max_lag_seconds"] = max(self.stats["max_lag_seconds"], lag)
+
+        start_time = time.monotonic()
+        rows = [row for _, row in batch]
+        for attempt in range(settings.PERSISTENCE_MAX_RETRIES + 1):
+            try:
+                await asyncio.to_thread(self._write_batch, rows)
+                break
+            except Exception as e:
+                if attempt == settings.PERSISTENCE_MAX_RETRIES:
+                    self.stats["failed"] += len(rows)
+                    logger.error(f"Failed to persist {len(rows)} conversation rows: {str(e)}")
+                    return
+                self.stats["retries"] += 1
+                logger.warning(f"Retrying {len(rows)} conversation rows: {str(e)}")
+                await asyncio.sleep(settings.PERSISTENCE_RETRY_DELAY_MS / 1000.0 * (2 ** attempt))
+
+        self.stats["written"] += len(rows)
+        self.stats["batches"] += 1
+        self.stats["last_batch_size"] = len(rows)
+        self.stats["last_flush_seconds"] = time.monotonic() - start_time
+
+    def _write_batch(self, rows: List[Dict[str, Any]]):
+        activity: Dict[str, List[Any]] = {}
+        for row in rows:
+            count_and_last = activity.setdefault(row["session_id"], [0, row["created_at"]])
+            count_and_last[0] += 1
+            count_and_last[1] = max(count_and_last[1], row["created_at"])
+
+        # One upsert, so a batch racing another on a new session cannot
+        # fail on the primary key
+        upsert = (postgresql_insert if engine.dialect.name == "postgresql" else sqlite_insert)(UserSession)
+        upsert = upsert.values([
+            {"session_id": session_id, "message_count": count,
+             "created_at": last_active, "last_active": last_active}
+            for session_id, (count, last_active) in activity.items()
+        ])
+        upsert = upsert.on_conflict_do_update(
+            index_elements=[UserSession.session_id],
+            set_={
+                "message_count": UserSession.message_count + upsert.excluded.message_count,
+                "last_active": case(
+                    (upsert.excluded.last_active > UserSession.last_active, upsert.excluded.last_active),
+                    else_=UserSession.last_active
+                ),
+            }
+        )
+
+        with SessionLocal.begin() as session:
+            session.execute(insert(Conversation), rows)
+            session.execute(upsert)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "max_queue_size": self.max_queue_size,
+        }
+
+
+# Global writer instance
+conversation_writer = ConversationWriter()
+
+
+def conversation_row(session_id: str, user_message: str, bot_response: str,
+                     intent: Dict, entities: Dict, sentiment: Dict,
+                     response_time: float) -> Dict[str, Any]:
+    return {
+        "session_id": session_id,
+        "user_message": user_message,
+        "bot_response": bot_response,
+        "intent": intent.get("intent"),
+        "intent_confidence": intent.get("confidence"),
+        "entities": entities,
+        "sentiment_label": sentiment.get("label"),
+        "sentiment_score": sentiment.get("score"),
+        "response_time": response_time,
+        "created_at": datetime.utcnow(),
+    }